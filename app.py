@@ -1,33 +1,352 @@
-from flask_openapi3 import OpenAPI, Info, Tag
-from flask import redirect, jsonify, request, render_template
+from flask_openapi3 import OpenAPI, APIBlueprint, Info, Tag
+from flask import g, redirect, jsonify, request, render_template, Response, current_app, stream_with_context
 from urllib.parse import unquote
+from threading import Lock
+import os
+import click
 
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
-
-from model import Session, Equipamento, Tecnico, Manutencao
-from logger import logger
+from sqlalchemy.orm.exc import StaleDataError, ObjectDeletedError
+
+from model import Session, Equipamento, Tecnico, Manutencao, ManutencaoArquivo, \
+                  obtem_engine, engine_criada, quando_criar_engine, configura_banco, roteia_sessao, restaura_roteamento, \
+                  obtem_engine_leitura, engine_leitura_criada, estatisticas_leitura, cache_referencias, escrita_agrupada, \
+                  compacta_alteracoes, compactacao_alteracoes, estatisticas_pool, executa_escrita, leitura_consistente, \
+                  carrega_lote, remove_lote, altera_status_lote, arquiva_manutencoes, reconstroi_resumo, reconstroi_relatorios, reconstroi_indices_texto
+from logger import logger, amostra_requisicao, configura_logs
+from cache import CacheRespostas, cache_listagem
+from metricas import Metricas, Medidor, ContadorCalculado
+import consultas
 from schemas import *
 from flask_cors import CORS
 
 info = Info(title="Sistema de Gerenciamento Manutenção Empilhadeiras", version="1.0.0")
-app = OpenAPI(__name__, info=info)
-CORS(app)
+# as rotas ficam em um blueprint registrado pela fábrica create_app
+api = APIBlueprint("api", __name__, cli_group=None)
+
+# cache das respostas das listagens, invalidado a cada escrita na base. Os
+# arquivos do banco que compõem a versão dos dados são definidos em inicializa
+cache_respostas = CacheRespostas(max_itens=int(os.environ.get("RESPONSE_CACHE_SIZE", 256)))
+
+# métricas por rota e contagem dos comandos SQL executados em cada requisição
+metricas = Metricas()
+quando_criar_engine(metricas.instrumenta_engine)
+metricas.registra(Medidor("db_pool_checked_out", "Conexões do pool em uso",
+                          lambda: engine_criada().pool.checkedout() if engine_criada() else 0))
+metricas.registra(Medidor("db_pool_wait_seconds_max", "Maior espera por uma conexão do pool",
+                          lambda: estatisticas_pool.espera_maxima))
+metricas.registra(Medidor("db_read_pool_checked_out", "Conexões somente leitura em uso",
+                          lambda: engine_leitura_criada().pool.checkedout()
+                          if engine_leitura_criada() not in (None, engine_criada()) else 0))
+metricas.registra(Medidor("db_read_pool_wait_seconds_max", "Maior espera por uma conexão somente leitura",
+                          lambda: estatisticas_leitura.espera_maxima))
+metricas.registra(ContadorCalculado("reference_cache_hits", "Referências de manutenção validadas pelo cache",
+                                    lambda: cache_referencias.hits))
+metricas.registra(ContadorCalculado("reference_cache_misses", "Validações de referência que recarregaram o cache",
+                                    lambda: cache_referencias.misses))
+metricas.registra(ContadorCalculado("reference_cache_reloads", "Cargas de equipamentos e técnicos no cache de referências",
+                                    lambda: cache_referencias.recargas))
+metricas.registra(ContadorCalculado("group_commit_batches", "Transações da escrita agrupada",
+                                    lambda: escrita_agrupada.grupos))
+metricas.registra(ContadorCalculado("group_commit_rows", "Registros inseridos pela escrita agrupada",
+                                    lambda: escrita_agrupada.registros))
+metricas.registra(ContadorCalculado("response_cache_hits", "Respostas de listagem servidas pelo cache",
+                                    lambda: cache_respostas.hits))
+metricas.registra(ContadorCalculado("response_cache_misses", "Respostas de listagem calculadas no banco",
+                                    lambda: cache_respostas.misses))
 
 # definindo as tags
 home_tag = Tag(name="Documentação", description="Seleção de documentação: Swagger, Redoc ou RapiDoc")
 equipamento_tag = Tag(name="Equipamento", description="Adição, visualização e remoção de equipamentos a base")
 tecnico_tag = Tag(name="Tecnico", description="Adição, visualização e remoção de técnicos a base")
 manutencao_tag = Tag(name="Manutencao", desccription="Adição, visualização e remoção de equipamentos em manutencao a base")
+relatorio_tag = Tag(name="Relatórios", description="Indicadores de confiabilidade e carga de trabalho das manutenções")
+busca_tag = Tag(name="Busca", description="Busca textual em equipamentos e manutenções")
+sincronizacao_tag = Tag(name="Sincronização", description="Alterações recentes para sincronização incremental")
+monitoramento_tag = Tag(name="Monitoramento", description="Estatísticas de funcionamento da API")
+
+
+# opções de create_app repassadas à configuração dos logs e do banco
+OPCOES_LOG = {"LOG_PATH": "log_path", "LOG_LEVEL": "log_level", "LOG_MAX_BYTES": "log_max_bytes",
+              "LOG_BACKUP_COUNT": "log_backup_count", "LOG_QUEUE": "log_queue"}
+OPCOES_BANCO = {"DB_PATH": "db_path", "DB_URL": "db_url", "DB_SPLIT_READS": "separa_leitura",
+                "DB_POOL_SIZE": "pool_size", "DB_MAX_OVERFLOW": "max_overflow",
+                "DB_POOL_TIMEOUT": "pool_timeout", "DB_POOL_RECYCLE": "pool_recycle"}
+OPCOES_AGRUPAMENTO = {"GROUP_COMMIT": "ativa", "GROUP_COMMIT_WINDOW_MS": "janela_ms",
+                      "GROUP_COMMIT_MAX_BATCH": "tamanho", "GROUP_COMMIT_TIMEOUT_MS": "espera_ms"}
+OPCOES_COMPACTACAO = {"CHANGES_COMPACTION_INTERVAL": "intervalo"}
+
+
+inicializada = False
+_lock_inicializacao = Lock()
+
+
+def inicializa(app):
+    """Configura os logs e prepara o banco (engine, schema e migrações) com as
+    opções da aplicação e carrega o cache de referências. É chamada no primeiro
+    uso (primeira requisição ou comando do flask), e não na importação ou na
+    criação da aplicação, de modo que os workers iniciam rápido e o gunicorn
+    --preload não compartilha conexões nem threads entre processos"""
+    global inicializada
+    if not inicializada:
+        with _lock_inicializacao:
+            if not inicializada:
+                if engine_criada() is None:
+                    configura_logs(**{opcao: app.config[chave] for chave, opcao in OPCOES_LOG.items()
+                                      if chave in app.config})
+                    configura_banco(**{opcao: app.config[chave] for chave, opcao in OPCOES_BANCO.items()
+                                       if chave in app.config})
+                escrita_agrupada.configura(**{opcao: app.config[chave] for chave, opcao in OPCOES_AGRUPAMENTO.items()
+                                              if chave in app.config})
+                compactacao_alteracoes.configura(**{opcao: app.config[chave] for chave, opcao in OPCOES_COMPACTACAO.items()
+                                                    if chave in app.config})
+                engine = obtem_engine()
+                compactacao_alteracoes.inicia()
+                if engine.url.get_backend_name() == "sqlite" and engine.url.database:
+                    cache_respostas.arquivos = [engine.url.database, engine.url.database + "-wal"]
+                    cache_referencias.conecta(engine.url.database)
+                inicializada = True
+    return obtem_engine()
+
+
+@api.before_app_request
+def inicializa_no_primeiro_uso():
+    """Prepara logs, banco e cache de referências antes da primeira requisição
+    do worker
+    """
+    if not inicializada:
+        inicializa(current_app)
+
+
+@api.before_app_request
+def roteia_requisicao():
+    """Consultas (GET) usam o pool somente leitura; as demais requisições, a
+    conexão de escrita
+    """
+    g.roteamento = roteia_sessao(request.method in ("GET", "HEAD"))
+
+
+@api.before_app_request
+def sorteia_logs_debug():
+    """Define se os logs de DEBUG da requisição serão registrados (amostragem)
+    """
+    amostra_requisicao()
+
+
+@api.before_app_request
+def inicia_metricas():
+    """Marca o início da requisição para as métricas de latência e de SQL
+    """
+    metricas.inicia_requisicao()
+
+
+@api.teardown_app_request
+def encerra_sessao(exception=None):
+    """Finaliza a sessão da requisição, caso tenha sido aberta: efetiva as
+    alterações pendentes (ou desfaz, em caso de erro) e devolve a conexão ao pool.
+    """
+    if not Session.registry.has():
+        return
+    session = Session()
+    try:
+        if exception is None and (session.new or session.dirty or session.deleted):
+            session.commit()
+        else:
+            session.rollback()
+    except Exception as e:
+        session.rollback()
+        logger.error("Erro ao finalizar sessão da requisição: %s", e)
+    finally:
+        Session.remove()
+
+
+@api.teardown_app_request
+def restaura_roteamento_requisicao(exception=None):
+    """Desfaz o roteamento da requisição, para que o contexto não continue
+    direcionando novas sessões ao pool somente leitura
+    """
+    token = g.pop("roteamento", None)
+    if token is not None:
+        restaura_roteamento(token)
+
+
+@api.after_app_request
+def invalida_cache(response):
+    """Descarta as respostas de listagem em cache após qualquer rota de escrita
+    """
+    if request.method in ("POST", "PUT", "PATCH", "DELETE"):
+        cache_respostas.invalida()
+    return response
+
+
+@api.after_app_request
+def registra_metricas(response):
+    """Registra a latência, o status, o tamanho e os comandos SQL da requisição
+    """
+    rota = request.url_rule.rule if request.url_rule else "desconhecida"
+    metricas.finaliza_requisicao(request.method, rota, response.status_code, response.content_length)
+    return response
 
 
-@app.get('/', tags=[home_tag])
+def carga_em_lote(modelo, schema, chave=None, referencias=()):
+    """Lê, valida e insere em lote os registros enviados na requisição
+
+    Retorna o resumo da carga com o resultado de cada linha. Se a leitura do
+    corpo ou a gravação falhar no meio da carga, o resumo traz os resultados dos
+    lotes já efetivados, marcado como interrompido e com a primeira linha não
+    gravada, a partir da qual a carga pode ser reenviada"""
+    session = Session()
+    registros = valida_registros(le_registros(request), schema)
+    resultados, interrupcao = carrega_lote(session, modelo, registros, chave, referencias)
+    if modelo in (Equipamento, Tecnico):
+        cache_referencias.invalida()
+
+    inseridos = sum(1 for r in resultados if r["status"] == "inserido")
+    resumo = {"total": len(resultados), "inseridos": inseridos,
+              "rejeitados": len(resultados) - inseridos, "resultados": resultados}
+    if interrupcao is None:
+        logger.debug("Carga em lote de %s: %s/%s inseridos", modelo.__tablename__, inseridos, len(resultados))
+        return resumo, 200
+
+    session.rollback()
+    linha, e = interrupcao
+    if isinstance(e, ValueError):
+        # corpo malformado (ex.: fora do formato ou da codificação utf-8)
+        status, mensagem = 400, str(e)
+    else:
+        status, mensagem = 500, "Não foi possível concluir a carga em lote"
+    logger.error("Carga em lote de %s interrompida antes da linha %s (%s inseridos): %s",
+                 modelo.__tablename__, linha, inseridos, e)
+    return dict(resumo, interrompido=True, linha_interrompida=linha, mesage=mensagem), status
+
+
+def remocao_em_lote(modelo, chaves, vinculos=()):
+    """Remove em uma única transação os registros das chaves informadas
+
+    Retorna as chaves removidas, as inexistentes e as bloqueadas por vínculo"""
+    session = Session()
+    try:
+        resultado = remove_lote(session, modelo, chaves, vinculos)
+        if modelo in (Equipamento, Tecnico):
+            cache_referencias.invalida()
+    except Exception as e:
+        session.rollback()
+        logger.error("Erro inesperado na remoção em lote de %s: %s", modelo.__tablename__, e)
+        return {"mesage": "Não foi possível concluir a remoção em lote"}, 500
+
+    logger.debug("Remoção em lote de %s: %s removidos, %s inexistentes, %s bloqueados",
+                 modelo.__tablename__, len(resultado["removidos"]),
+                 len(resultado["inexistentes"]), len(resultado["bloqueados"]))
+    return resultado, 200
+
+
+def insere_registro(session, registro):
+    """Insere o registro e efetiva a inserção: pela escrita agrupada, quando
+    ativa (uma transação para as inserções simultâneas), ou em uma transação
+    própria, repetindo a escrita caso o banco esteja ocupado. Se a escrita
+    agrupada não chegar ao registro a tempo, ele é inserido na transação própria
+
+    Retorna o registro inserido; conflitos levantam IntegrityError"""
+    if escrita_agrupada.ativa:
+        inserido = escrita_agrupada.insere(registro)
+        if inserido is not None:
+            return inserido
+        logger.warning("Escrita agrupada sem resposta em %s ms, inserindo em transação própria",
+                       escrita_agrupada.espera * 1000)
+    executa_escrita(session, lambda s: s.add(registro))
+    return registro
+
+
+def executa_consulta(consulta, query=None):
+    """Executa na sessão da requisição a consulta da rota, compartilhada com o
+    modo assíncrono (ver consultas.py): parâmetros inválidos (ValueError)
+    respondem 400 e os demais erros, 500"""
+    try:
+        return consulta(Session(), query)
+    except ValueError as e:
+        return {"mesage": str(e)}, 400
+    except Exception as e:
+        logger.error("Erro na consulta de %s: %s", request.path, e)
+        return {"mesage": "Erro interno no servidor"}, 500
+
+
+# linhas lidas do cursor e enviadas por vez nas exportações
+tamanho_bloco_exportacao = int(os.environ.get("EXPORT_CHUNK_ROWS", 1000))
+
+
+def resposta_exportacao(comandos, campos, chave, formato: str, nome: str):
+    """Cria a resposta de exportação (csv ou ndjson) dos comandos, enviada em
+    blocos à medida que as linhas são lidas do banco
+
+    A consulta é feita em uma conexão própria do pool de leitura, em uma única
+    transação, de modo que a memória usada não depende do tamanho da tabela e
+    todos os comandos veem o mesmo estado do banco"""
+    def gera():
+        with obtem_engine_leitura().connect() as conexao:
+            conexao = conexao.execution_options(isolation_level="AUTOCOMMIT")
+            try:
+                # desfeita em caso de erro ou de desconexão do cliente (o
+                # gerador é fechado no meio do envio)
+                with leitura_consistente(conexao):
+                    blocos = blocos_consulta(conexao, comandos, chave, tamanho_bloco_exportacao)
+                    yield from exporta_blocos(blocos, campos, formato)
+            except Exception as e:
+                logger.error("Erro na exportação de %s: %s", nome, e)
+                raise
+
+    return Response(stream_with_context(gera()), mimetype=TIPOS_EXPORTACAO[formato],
+                    headers={"Content-Disposition": f'attachment; filename="{nome}.{formato}"'})
+
+
+def valida_referencias(nome_equipamento=None, matricula_tecnico=None):
+    """Confere no cache de referências se o equipamento e o técnico informados
+    estão cadastrados
+
+    Retorna a resposta de erro (422) da primeira referência inexistente, ou None"""
+    if not cache_referencias.ativo:
+        # sem cache (banco que não é SQLite em arquivo): vale a chave estrangeira
+        return None
+    if nome_equipamento is not None and cache_referencias.equipamento(nome_equipamento) is None:
+        return {"mesage": f"Equipamento '{nome_equipamento}' não encontrado"}, 422
+    if matricula_tecnico is not None and cache_referencias.tecnico(matricula_tecnico) is None:
+        return {"mesage": f"Técnico de matrícula '{matricula_tecnico}' não encontrado"}, 422
+    return None
+
+
+@api.get('/', tags=[home_tag])
 def home():
     """Redireciona para /openapi, tela que permite a escolha do estilo de documentação.
     """
     return redirect('/openapi')
 
 
-@app.post('/equipamento', tags=[equipamento_tag],
+@api.get('/pool', tags=[monitoramento_tag],
+         responses={"200": PoolViewSchema})
+def get_pool():
+    """Retorna as estatísticas do pool de conexões com o banco
+
+    Permite acompanhar checkouts, conexões em uso e tempo de espera por conexão
+    para dimensionar a quantidade de workers. Com a leitura separada, o pool
+    principal é o da conexão de escrita e leitura traz o das consultas"""
+    engine = inicializa(current_app)
+    resumo = estatisticas_pool.resumo(engine.pool)
+    if obtem_engine_leitura() is not engine:
+        resumo["leitura"] = estatisticas_leitura.resumo(obtem_engine_leitura().pool)
+    return resumo, 200
+
+
+@api.get('/metrics', tags=[monitoramento_tag])
+def get_metrics():
+    """Retorna as métricas da API no formato texto do Prometheus
+
+    Inclui, por rota, a quantidade de requisições por status, histogramas de
+    latência e de tamanho das respostas e a quantidade de comandos SQL e o tempo
+    gasto no banco em cada requisição"""
+    return Response(metricas.exporta(), mimetype="text/plain; version=0.0.4")
+
+
+@api.post('/equipamento', tags=[equipamento_tag],
           responses={"200":EquipamentoSchema, "409": ErrorSchema, "400": ErrorSchema})
 def add_equipamento(form: EquipamentoSchema):
     """Cadastra um novo Equipamento à base de dados
@@ -38,55 +357,63 @@ def add_equipamento(form: EquipamentoSchema):
         modelo=form.modelo,
         setor=form.setor,
         impacto=form.impacto)
-    logger.debug(f"Adicionando equipamento de nome:'{equipamento.nome}'")
+    logger.debug("Adicionando equipamento de nome:'%s'", equipamento.nome)
     try:
         # criando conexão com a base
         session = Session()
-        # adicionando equipamento
-        session.add(equipamento)
-        # efetivando o cadastro de um novo equipamento a tabela
-        session.commit()
-        logger.debug(f"Adicionado equipamento de nome:'{equipamento.nome}'")
+        # adicionando equipamento e efetivando o cadastro na tabela
+        equipamento = insere_registro(session, equipamento)
+        cache_referencias.invalida()
+        logger.debug("Adicionado equipamento de nome:'%s'", equipamento.nome)
         return apresenta_equipamento(equipamento), 200
     
     except IntegrityError as e:
         # como a duplicidade do nome é a provável razão do IntegrityError
         error_msg = "Equipamento de mesmo nome já salvo na base"
-        logger.warning(f"Erro ao adicionar equipamento '{equipamento.nome}', {error_msg}")
+        logger.warning("Erro ao adicionar equipamento '%s', %s", equipamento.nome, error_msg)
         return {"mesage": error_msg}, 409
     
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = "Não foi possível salvar cadastro do novo equipamento"
-        logger.warning(f"Erro ao cadastrar novo equipamento '{equipamento.nome}', {error_msg}")
+        logger.warning("Erro ao cadastrar novo equipamento '%s', %s", equipamento.nome, error_msg)
         return {"mesage": error_msg}, 400
 
 
-@app.get('/equipamentos', tags=[equipamento_tag],
-         responses={"200":ListagemEquipamentoSchema})
-def get_equipamentos():
-    """Faz a busca por todos os Equipamentos cadastrados
-    
-    Retorna uma representação em forma de lista de todos os equipamentos
-    cadastrados"""
+@api.post('/equipamentos/bulk', tags=[equipamento_tag],
+          responses={"200": CargaViewSchema, "400": CargaViewSchema, "500": CargaViewSchema})
+def add_equipamentos_bulk():
+    """Cadastra equipamentos em lote a partir de um array JSON, NDJSON ou CSV
 
-    logger.debug(f"Coletando equipamentos no banco")
-    # criando conexão com a base
-    session = Session()
-    # fazendo a busca
-    equipamentos = session.query(Equipamento).all()
+    Cada registro segue o EquipamentoSchema. Retorna o resultado de cada linha,
+    indicando os equipamentos inseridos, duplicados ou inválidos"""
+    return carga_em_lote(Equipamento, EquipamentoSchema, chave="nome")
 
-    if not equipamentos:
-        # se não há equipamentos cadastrados
-        return {"equipamentos":[]}, 200
-    else:
-        logger.debug(f"{len(equipamentos)} equipamentos encontrados")
-        # retorna a representação de equipamento
-        print(equipamentos)
-        return apresenta_equipamentos(equipamentos), 200
 
+@api.get('/equipamentos/export', tags=[equipamento_tag])
+def exporta_equipamentos(query: ExportacaoSchema):
+    """Exporta todos os equipamentos cadastrados, ordenados por nome, em csv ou
+    ndjson (format)
 
-@app.delete('/equipamento', tags=[equipamento_tag],
+    O arquivo é enviado em blocos, à medida que os equipamentos são lidos"""
+    logger.debug("Exportando equipamentos em %s", query.format)
+    consulta = select(*COLUNAS_EQUIPAMENTO).order_by(Equipamento.nome)
+    return resposta_exportacao([consulta], CAMPOS_EQUIPAMENTO, lambda e: e[0], query.format, "equipamentos")
+
+
+@api.get('/equipamentos', tags=[equipamento_tag],
+         responses={"200":ListagemEquipamentoSchema, "400": ErrorSchema})
+@cache_listagem(cache_respostas)
+def get_equipamentos(query: PaginacaoSchema):
+    """Faz a busca paginada pelos Equipamentos cadastrados, ordenados por nome
+    
+    Retorna uma representação em forma de lista dos equipamentos da página e
+    o cursor da próxima página"""
+    logger.debug("Coletando equipamentos no banco")
+    return executa_consulta(consultas.lista_equipamentos, query)
+
+
+@api.delete('/equipamento', tags=[equipamento_tag],
             responses={"200":EquipamentoDelSchema, "404":ErrorSchema})
 def del_equipamento(query:EquipamentoBuscaSchema):
     """Deleta o cadastro de um equipamento a partir do nome informado
@@ -94,42 +421,49 @@ def del_equipamento(query:EquipamentoBuscaSchema):
     Retorna uma mensagem de confirmação da remoção
     """
     equipamento_nome = unquote(unquote(query.nome))    
-    logger.debug(f"Deletando dados sobre o equipamento {equipamento_nome}")
+    logger.debug("Deletando dados sobre o equipamento %s", equipamento_nome)
     #criando conexão com o banco
     session=Session()
     
     try:
-        # Verifica se existe manutenção associada
-        manutencao = session.query(Manutencao).filter(Manutencao.nome_equipamento == equipamento_nome).first()
-        if manutencao:
-            error_msg = "Não foi possível deletar o equipamento, pois há manutenção vinculada."
-            logger.warning(f"Erro ao deletar equipamento '{equipamento_nome}': {error_msg}")
-            return {"mesage": error_msg}, 400
-
-        # Se não há manutenção, tenta deletar
-        count = session.query(Equipamento).filter(Equipamento.nome == equipamento_nome).delete()
-        session.commit()
+        # um único DELETE: a chave estrangeira de manutencao impede a remoção
+        # de equipamento com manutenção vinculada (IntegrityError)
+        count = executa_escrita(session, lambda s: s.query(Equipamento).filter(
+            Equipamento.nome == equipamento_nome).delete())
 
         if count:
-            logger.debug(f"Deletado equipamento {equipamento_nome}")
+            cache_referencias.invalida()
+            logger.debug("Deletado equipamento %s", equipamento_nome)
             return {"mesage": "Equipamento removido", "nome": equipamento_nome}, 200
         else:
             error_msg = "Equipamento não encontrado na base"
-            logger.warning(f"Erro ao deletar equipamento '{equipamento_nome}': {error_msg}")
+            logger.warning("Erro ao deletar equipamento '%s': %s", equipamento_nome, error_msg)
             return {"mesage": error_msg}, 404
 
     except IntegrityError as e:
         session.rollback()
-        logger.error(f"Erro de integridade ao deletar '{equipamento_nome}': {str(e)}")
-        return {"mesage": "Erro de integridade. Possível vínculo com outros registros."}, 400
+        error_msg = "Não foi possível deletar o equipamento, pois há manutenção vinculada."
+        logger.warning("Erro ao deletar equipamento '%s': %s", equipamento_nome, error_msg)
+        return {"mesage": error_msg}, 400
 
     except Exception as e:
         session.rollback()
-        logger.error(f"Erro inesperado ao deletar '{equipamento_nome}': {str(e)}")
+        logger.error("Erro inesperado ao deletar '%s': %s", equipamento_nome, e)
         return {"mesage": "Erro interno do servidor."}, 500
 
 
-@app.post('/tecnico', tags=[tecnico_tag],
+
+@api.delete('/equipamentos', tags=[equipamento_tag],
+            responses={"200": RemocaoLoteViewSchema, "500": ErrorSchema})
+def del_equipamentos(body: EquipamentoLoteDelSchema):
+    """Deleta em lote os equipamentos dos nomes informados
+
+    Equipamentos com manutenção vinculada não são removidos. Retorna os nomes
+    removidos, os não encontrados e os bloqueados por vínculo"""
+    return remocao_em_lote(Equipamento, body.nomes, vinculos=(Manutencao.nome_equipamento,
+                                                                    ManutencaoArquivo.nome_equipamento))
+
+@api.post('/tecnico', tags=[tecnico_tag],
           responses={"200":TecnicoViewSchema, "409": ErrorSchema, "400": ErrorSchema})
 def add_tecnico(form: TecnicoSchema):
     """Cadastra um novo Técnico à base de dados
@@ -139,55 +473,52 @@ def add_tecnico(form: TecnicoSchema):
         nome=form.nome,
         matricula=form.matricula,
         turno=form.turno)
-    logger.debug(f"Adicionando técnico de nome:'{tecnico.nome}' e matrícula '{tecnico.matricula}'")
+    logger.debug("Adicionando técnico de nome:'%s' e matrícula '%s'", tecnico.nome, tecnico.matricula)
     try:
         # criando conexão com a base
         session = Session()
-        # adicionando tecnico
-        session.add(tecnico)
-        # efetivando o cadastro do tecnico a tabela
-        session.commit()
-        logger.debug(f"Adicionado tecnico de nome:'{tecnico.nome}' e matricula '{tecnico.matricula}'")
+        # adicionando tecnico e efetivando o cadastro na tabela
+        tecnico = insere_registro(session, tecnico)
+        cache_referencias.invalida()
+        logger.debug("Adicionado tecnico de nome:'%s' e matricula '%s'", tecnico.nome, tecnico.matricula)
         return apresenta_tecnico(tecnico), 200
     
     except IntegrityError as e:
         # como a duplicidade de matricula é a provável razão do IntegrityError
         error_msg = "Técnico de mesma matricula já salvo na base"
-        logger.warning(f"Erro ao adicionar técnico de matriula '{tecnico.matricula}', {error_msg}")
+        logger.warning("Erro ao adicionar técnico de matriula '%s', %s", tecnico.matricula, error_msg)
         return {"mesage": error_msg}, 409
     
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = "Não foi possível salvar cadastro do novo técnico"
-        logger.warning(f"Erro ao cadastrar novo técnico de matricula '{tecnico.matricula}', {error_msg}")
+        logger.warning("Erro ao cadastrar novo técnico de matricula '%s', %s", tecnico.matricula, error_msg)
         return {"mesage": error_msg}, 400
 
 
-@app.get('/tecnicos', tags=[tecnico_tag],
-         responses={"200":ListagemTecnicoSchema})
-def get_tecnicos():
-    """Faz a busca por todos os Tecnicos cadastrados
-    
-    Retorna uma representação em forma de lista de todos os tecnicos
-    cadastrados"""
+@api.post('/tecnicos/bulk', tags=[tecnico_tag],
+          responses={"200": CargaViewSchema, "400": CargaViewSchema, "500": CargaViewSchema})
+def add_tecnicos_bulk():
+    """Cadastra técnicos em lote a partir de um array JSON, NDJSON ou CSV
 
-    logger.debug(f"Coletando tecnicos no banco")
-    # criando conexão com a base
-    session = Session()
-    # fazendo a busca
-    tecnicos = session.query(Tecnico).all()
+    Cada registro segue o TecnicoSchema. Retorna o resultado de cada linha,
+    indicando os técnicos inseridos, duplicados ou inválidos"""
+    return carga_em_lote(Tecnico, TecnicoSchema, chave="matricula")
 
-    if not tecnicos:
-        # se não há tecnicos cadastrados
-        return {"tecnicos":[]}, 200
-    else:
-        logger.debug(f"{len(tecnicos)} tecnicos encontrados")
-        # retorna a representação de tecnico
-        print(tecnicos)
-        return apresenta_tecnicos(tecnicos), 200
+
+@api.get('/tecnicos', tags=[tecnico_tag],
+         responses={"200":ListagemTecnicoSchema, "400": ErrorSchema})
+@cache_listagem(cache_respostas)
+def get_tecnicos(query: PaginacaoSchema):
+    """Faz a busca paginada pelos Tecnicos cadastrados, ordenados por matrícula
+    
+    Retorna uma representação em forma de lista dos tecnicos da página e o
+    cursor da próxima página"""
+    logger.debug("Coletando tecnicos no banco")
+    return executa_consulta(consultas.lista_tecnicos, query)
 
 
-@app.delete('/tecnico', tags=[tecnico_tag],
+@api.delete('/tecnico', tags=[tecnico_tag],
             responses={"200":TecnicoDelSchema, "404":ErrorSchema})
 def del_tecnico(query:TecnicoBuscaSchema):
     """Deleta o cadastro de um técnico a partir da matrícula informada
@@ -195,103 +526,248 @@ def del_tecnico(query:TecnicoBuscaSchema):
     Retorna uma mensagem de confirmação da remoção
     """
     tecnico_matricula = unquote(unquote(query.matricula))    
-    logger.debug(f"Deletando dados sobre o técnico {tecnico_matricula}")
+    logger.debug("Deletando dados sobre o técnico %s", tecnico_matricula)
     #criando conexão com o banco
     session=Session()
 
     try:
-        # Verifica se existe manutenção associada
-        manutencao = session.query(Manutencao).filter(Manutencao.matricula_tecnico == tecnico_matricula).first()
-        if manutencao:
-            error_msg = "Não foi possível deletar o técnico, pois há manutenção vinculada."
-            logger.warning(f"Erro ao deletar técnico '{tecnico_matricula}': {error_msg}")
-            return {"mesage": error_msg}, 400
-
-        # Se não há manutenção, tenta deletar
-        count = session.query(Tecnico).filter(Tecnico.matricula == tecnico_matricula).delete()
-        session.commit()
+        # um único DELETE: a chave estrangeira de manutencao impede a remoção
+        # de técnico com manutenção vinculada (IntegrityError)
+        count = executa_escrita(session, lambda s: s.query(Tecnico).filter(
+            Tecnico.matricula == tecnico_matricula).delete())
 
         if count:
+            cache_referencias.invalida()
         # retorna a representação da mensagem de confirmação
-            logger.debug(f"Deletado técnico {tecnico_matricula}")
+            logger.debug("Deletado técnico %s", tecnico_matricula)
             return {"mesage": "Técnico removido", "nome": tecnico_matricula}, 200
         else:
         #se o técnico não foi encontrado
             error_msg = "Técnico não encontrado na base"
-            logger.warning(f"Erro ao deletar técnico '{tecnico_matricula}', {error_msg}")
+            logger.warning("Erro ao deletar técnico '%s', %s", tecnico_matricula, error_msg)
             return {"mesage": error_msg}, 404
 
     except IntegrityError as e:
         session.rollback()
-        logger.error(f"Erro de integridade ao deletar '{tecnico_matricula}': {str(e)}")
-        return {"mesage": "Erro de integridade. Possível vínculo com outros registros."}, 400
+        error_msg = "Não foi possível deletar o técnico, pois há manutenção vinculada."
+        logger.warning("Erro ao deletar técnico '%s': %s", tecnico_matricula, error_msg)
+        return {"mesage": error_msg}, 400
 
     except Exception as e:
         session.rollback()
-        logger.error(f"Erro inesperado ao deletar '{tecnico_matricula}': {str(e)}")
+        logger.error("Erro inesperado ao deletar '%s': %s", tecnico_matricula, e)
         return {"mesage": "Erro interno do servidor."}, 500
    
 
-@app.get('/manutencoes/status', tags=[manutencao_tag],
-         responses={"200":ListagemManutencaoSchema, "404":ErrorSchema})
-def get_manutencoes(query: ManutencaoStatusSchema):
-    """Faz a busca por todos as Manutencoes cadastrados com o status informado
-    
-    Retorna uma representação em forma de lista de todas as manutencoes do status
-    buscado cadastradas"""
-    manutencao_status = unquote(unquote(query.status))
-    try:
-        logger.debug(f"Buscando manutenções com status: {manutencao_status}")
-        # criando conexão com a base
-        session = Session()
-        # fazendo a busca
-        manutencoes = session.query(Manutencao).filter(Manutencao.status == manutencao_status).all()
 
-        if not manutencoes:
-            #logger.debug(f"Nenhuma manutenção encontrada com status: {manutencao_status}")
-            return {"manutenções":[]}, 200  # Retorna lista vazia no formato esperado
-        else:
-            #logger.debug(f"Encontradas {len(manutencoes)} manutenções com status: {manutencao_status}")
-            # retorna a representação das manutencoes em lista
-            #print(manutencoes)
-            return apresenta_manutencoes(manutencoes), 200
-    except Exception as e:
-        logger.error(f"Erro ao buscar manutenções: {str(e)}")
-        return {"error": "Erro interno no servidor", "details": str(e)}, 500
+@api.delete('/tecnicos', tags=[tecnico_tag],
+            responses={"200": RemocaoLoteViewSchema, "500": ErrorSchema})
+def del_tecnicos(body: TecnicoLoteDelSchema):
+    """Deleta em lote os técnicos das matrículas informadas
 
+    Técnicos com manutenção vinculada não são removidos. Retorna as matrículas
+    removidas, as não encontradas e as bloqueadas por vínculo"""
+    return remocao_em_lote(Tecnico, body.matriculas, vinculos=(Manutencao.matricula_tecnico,
+                                                                    ManutencaoArquivo.matricula_tecnico))
 
-@app.get('/manutencoes', tags=[manutencao_tag],
-         responses={"200":ListagemManutencaoSchema, "404":ErrorSchema})
-def get_manutencoes_all():
-    """Faz a busca por todos as Manutencoes cadastradas
+@api.get('/manutencoes/status', tags=[manutencao_tag],
+         responses={"200":ListagemManutencaoSchema, "400":ErrorSchema, "404":ErrorSchema})
+@cache_listagem(cache_respostas)
+def get_manutencoes(query: ManutencaoStatusPaginadoSchema):
+    """Faz a busca paginada pelas Manutencoes cadastradas com o status informado
     
-    Retorna uma representação em forma de lista de todas as manutencoes cadastradas"""
-    try:
-        logger.debug(f"Buscando manutenções")
-        # criando conexão com a base
-        session = Session()
-        # fazendo a busca
-        manutencoes = session.query(Manutencao).all()
-
-        if not manutencoes:
-            #logger.debug(f"Nenhuma manutenção encontrada com status: {manutencao_status}")
-            return {"manutenções":[]}, 200  # Retorna lista vazia no formato esperado
-        else:
-            #logger.debug(f"Encontradas {len(manutencoes)} manutenções com status: {manutencao_status}")
-            # retorna a representação das manutencoes em lista
-            #print(manutencoes)
-            return apresenta_manutencoes(manutencoes), 200
-    except Exception as e:
-        logger.error(f"Erro ao buscar manutenções: {str(e)}")
-        return {"error": "Erro interno no servidor", "details": str(e)}, 500
+    Retorna uma representação em forma de lista das manutencoes da página, do status
+    buscado, e o cursor da próxima página. Com expand=equipamento,tecnico cada item
+    inclui os dados do equipamento e do técnico e com include_archived=true são
+    incluídas as manutenções arquivadas"""
+    logger.debug("Buscando manutenções com status: %s", unquote(unquote(query.status)))
+    return executa_consulta(consultas.lista_manutencoes_status, query)
+
+
+@api.get('/manutencoes/busca', tags=[manutencao_tag],
+         responses={"200":ListagemManutencaoSchema, "400":ErrorSchema})
+@cache_listagem(cache_respostas)
+def busca_manutencoes(query: ManutencaoBuscaSchema):
+    """Faz a busca paginada de Manutencoes combinando equipamento, técnico, status,
+    tipo de manutenção, setor e intervalo da previsão de conclusão
+
+    Retorna uma representação em forma de lista das manutencoes encontradas,
+    ordenadas conforme o parâmetro ordem, e o cursor da próxima página. Com
+    include_archived=true a busca também considera as manutenções arquivadas"""
+    logger.debug("Buscando manutenções com filtros: %s", query)
+    return executa_consulta(consultas.busca_manutencoes, query)
+
+
+@api.get('/manutencoes/resumo', tags=[manutencao_tag],
+         responses={"200": ResumoManutencaoViewSchema})
+@cache_listagem(cache_respostas)
+def get_resumo_manutencoes():
+    """Faz a contagem das manutenções por status, tipo de manutenção e impacto
+    do equipamento
+
+    Os contadores são mantidos a cada cadastro, alteração e remoção de manutenção,
+    sem percorrer a tabela de manutenções"""
+    logger.debug("Buscando resumo das manutenções")
+    return executa_consulta(consultas.resumo_manutencoes)
+
+
+@api.cli.command("reconstroi-resumo")
+def reconstroi_resumo_comando():
+    """Recalcula os contadores do resumo das manutenções a partir da base."""
+    with inicializa(current_app).begin() as conn:
+        reconstroi_resumo(conn)
+    logger.info("Contadores do resumo das manutenções recalculados")
+
+
+@api.get('/relatorios/mttr', tags=[relatorio_tag],
+         responses={"200": RelatorioMttrViewSchema, "400": ErrorSchema})
+@cache_listagem(cache_respostas, por_dia=True)
+def get_relatorio_mttr(query: RelatorioPeriodoSchema):
+    """Faz o cálculo do tempo médio de reparo (MTTR) das manutenções concluídas
+    no período, no geral e por equipamento
+
+    O tempo de reparo vai da abertura da manutenção até a sua mudança para o
+    status Pronto. Por padrão o período são os últimos 30 dias"""
+    logger.debug("Buscando relatório de MTTR")
+    return executa_consulta(consultas.relatorio_mttr, query)
+
+
+@api.get('/relatorios/abertas', tags=[relatorio_tag],
+         responses={"200": RelatorioAbertasViewSchema})
+@cache_listagem(cache_respostas, por_dia=True)
+def get_relatorio_abertas(query: RelatorioAbertasSchema):
+    """Faz a contagem das manutenções abertas por faixa de idade (dias desde a
+    abertura), de todos os setores ou do setor informado"""
+    logger.debug("Buscando relatório de idade das manutenções abertas")
+    return executa_consulta(consultas.relatorio_abertas, query)
+
+
+@api.get('/relatorios/backlog', tags=[relatorio_tag],
+         responses={"200": RelatorioBacklogViewSchema})
+@cache_listagem(cache_respostas, por_dia=True)
+def get_relatorio_backlog():
+    """Faz a contagem das manutenções abertas por setor do equipamento, com a
+    idade média de cada setor"""
+    logger.debug("Buscando relatório de backlog por setor")
+    return executa_consulta(consultas.relatorio_backlog)
+
+
+@api.get('/relatorios/carga-tecnicos', tags=[relatorio_tag],
+         responses={"200": RelatorioCargaViewSchema, "400": ErrorSchema})
+@cache_listagem(cache_respostas, por_dia=True)
+def get_relatorio_carga_tecnicos(query: RelatorioPeriodoSchema):
+    """Faz o levantamento da carga de trabalho dos técnicos por turno
+
+    Retorna, para cada técnico, as manutenções abertas atribuídas a ele e as
+    concluídas no período (por padrão, os últimos 30 dias), com as horas de
+    reparo"""
+    logger.debug("Buscando relatório de carga dos técnicos")
+    return executa_consulta(consultas.relatorio_carga_tecnicos, query)
+
+
+@api.cli.command("reconstroi-relatorios")
+def reconstroi_relatorios_comando():
+    """Recalcula as linhas diárias dos relatórios a partir da base."""
+    with inicializa(current_app).begin() as conn:
+        reconstroi_relatorios(conn)
+    logger.info("Linhas diárias dos relatórios recalculadas")
+
+
+@api.get('/busca', tags=[busca_tag],
+         responses={"200":BuscaTextoViewSchema, "400":ErrorSchema})
+@cache_listagem(cache_respostas)
+def busca_texto(query: BuscaTextoSchema):
+    """Faz a busca textual por nome e modelo dos equipamentos e por comentário e
+    tipo das manutenções
+
+    Cada palavra informada é buscada como prefixo, sem diferenciar acentos.
+    Retorna os equipamentos e as manutenções encontrados, dos mais relevantes
+    aos menos relevantes"""
+    logger.debug("Busca textual por: %s", query.q)
+    return executa_consulta(consultas.busca_texto, query)
+
+
+@api.cli.command("reconstroi-busca")
+def reconstroi_busca_comando():
+    """Recria os índices da busca textual a partir da base."""
+    with inicializa(current_app).begin() as conn:
+        reconstroi_indices_texto(conn)
+    logger.info("Índices da busca textual recriados")
+
+
+@api.get('/changes', tags=[sincronizacao_tag],
+         responses={"200":ListagemAlteracoesSchema, "410":ErrorSchema})
+@cache_listagem(cache_respostas)
+def get_changes(query: AlteracoesBuscaSchema):
+    """Retorna as inserções, alterações e remoções de equipamentos, técnicos e
+    manutenções posteriores ao seq informado em since
+
+    Cada registro alterado vem com o seu estado atual; registros removidos vêm
+    sem dados (tombstone). Se as remoções posteriores a since já foram
+    descartadas pela compactação, retorna 410 e o cliente deve recarregar as
+    listagens e sincronizar a partir do next_since informado"""
+    logger.debug("Buscando alterações desde %s", query.since)
+    return executa_consulta(consultas.lista_alteracoes, query)
+
+
+@api.cli.command("compacta-alteracoes")
+@click.option("--dias", type=int, default=None, help="dias de retenção das remoções")
+def compacta_alteracoes_comando(dias):
+    """Compacta o log de alterações."""
+    with inicializa(current_app).begin() as conn:
+        descartadas = compacta_alteracoes(conn, dias)
+    logger.info("Log de alterações compactado: %s entradas descartadas", descartadas)
+
+
+@api.cli.command("arquiva-manutencoes")
+@click.option("--dias", type=int, default=None, help="idade mínima (previsão de conclusão) das manutenções prontas")
+@click.option("--lote", type=int, default=None, help="manutenções movidas por transação")
+def arquiva_manutencoes_comando(dias, lote):
+    """Move as manutenções prontas antigas para o arquivo."""
+    inicializa(current_app)
+    arquivadas = arquiva_manutencoes(Session(), dias, lote)
+    Session.remove()
+    logger.info("Manutenções arquivadas: %s", arquivadas)
+
+
+@api.get('/manutencoes/export', tags=[manutencao_tag])
+def exporta_manutencoes(query: ExportacaoManutencaoSchema):
+    """Exporta todas as manutenções, ordenadas por id, em csv ou ndjson (format)
+
+    O arquivo é enviado em blocos, à medida que as manutenções são lidas. Com
+    include_archived=true são incluídas as manutenções arquivadas"""
+    logger.debug("Exportando manutenções em %s", query.format)
+    consulta = select(*COLUNAS_MANUTENCAO).order_by(Manutencao.id)
+    comandos = [consulta] + [variante(consulta) for variante in consultas.variantes_arquivo(query)]
+    return resposta_exportacao(comandos, CAMPOS_MANUTENCAO, lambda m: m[0], query.format, "manutencoes")
+
+
+@api.get('/manutencoes', tags=[manutencao_tag],
+         responses={"200":ListagemManutencaoSchema, "400":ErrorSchema, "404":ErrorSchema})
+@cache_listagem(cache_respostas)
+def get_manutencoes_all(query: ManutencaoPaginadoSchema):
+    """Faz a busca paginada pelas Manutencoes cadastradas, ordenadas por id
+    
+    Retorna uma representação em forma de lista das manutencoes da página e o
+    cursor da próxima página. Com expand=equipamento,tecnico cada item inclui os
+    dados do equipamento e do técnico e com include_archived=true a listagem
+    inclui as manutenções concluídas arquivadas"""
+    logger.debug("Buscando manutenções")
+    return executa_consulta(consultas.lista_manutencoes, query)
 
 
-@app.post('/manutencao', tags=[manutencao_tag],
-          responses={"200": ManutencaoViewSchema, "404":ErrorSchema})
+@api.post('/manutencao', tags=[manutencao_tag],
+          responses={"200": ManutencaoViewSchema, "400":ErrorSchema, "422":ErrorSchema})
 def add_manutencao(form: ManutencaoSchema):
     """Cadastro de uma nova manutencao à base de dados
-    
+
+    O equipamento e o técnico informados são conferidos no cache de referências:
+    se algum não estiver cadastrado é retornado 422, sem acesso ao banco.
     Retorna uma representação da Manutencao cadastrada"""
+    erro = valida_referencias(form.nome_equipamento, form.matricula_tecnico)
+    if erro:
+        logger.warning("Erro ao adicionar manutencao da máquina '%s', %s", form.nome_equipamento, erro[0]["mesage"])
+        return erro
     manutencao = Manutencao(
         nome_equipamento= form.nome_equipamento,
         matricula_tecnico= form.matricula_tecnico,
@@ -300,38 +776,81 @@ def add_manutencao(form: ManutencaoSchema):
         comentario= form.comentario,
         previsao_conclusao= form.previsao_conclusao
     )
-    logger.debug(f"Adicionando manutencao")
+    logger.debug("Adicionando manutencao")
     try:
         #criando conexão com a base
         session = Session()
-        #adicionando manutencao
-        session.add(manutencao)
-        #efetivando o cadastro do tecnico a tabela
-        session.commit()
-        logger.debug(f"Adicionada manutencao")
+        #adicionando manutencao e efetivando o cadastro na tabela
+        manutencao = insere_registro(session, manutencao)
+        logger.debug("Adicionada manutencao")
         return apresenta_manutencao(manutencao)
     
     except IntegrityError as e:
-        # como a duplicidade de matricula é a provável razão do IntegrityError
-        error_msg = "Máquina já está em manutenção"
-        logger.warning(f"Erro ao adicionar manutencao da máquina '{manutencao.nome_equipamento}', {error_msg}")
-        return {"mesage": error_msg}, 409
+        # a chave estrangeira recusou a referência: equipamento ou técnico
+        # removido depois da validação pelo cache
+        cache_referencias.invalida()
+        error_msg = "Equipamento ou técnico da manutenção não encontrado"
+        logger.warning("Erro ao adicionar manutencao da máquina '%s', %s", manutencao.nome_equipamento, error_msg)
+        return {"mesage": error_msg}, 422
     
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = "Não foi possível salvar manutencao"
-        logger.warning(f"Erro ao cadastrar manutencao da máquina '{manutencao.nome_equipamento}', {error_msg}")
+        logger.warning("Erro ao cadastrar manutencao da máquina '%s', %s", manutencao.nome_equipamento, error_msg)
         return {"mesage": error_msg}, 400
     
-@app.patch('/manutencao/<int:id>', tags=[manutencao_tag],
-          responses={"200": ManutencaoViewSchema, "404":ErrorSchema} )
+
+@api.post('/manutencoes/bulk', tags=[manutencao_tag],
+          responses={"200": CargaViewSchema, "400": CargaViewSchema, "500": CargaViewSchema})
+def add_manutencoes_bulk():
+    """Cadastra manutenções em lote a partir de um array JSON, NDJSON ou CSV
+
+    Cada registro segue o ManutencaoSchema. Retorna o resultado de cada linha,
+    com o id das manutenções inseridas e as rejeitadas por dados inválidos ou
+    equipamento/técnico inexistente"""
+    return carga_em_lote(Manutencao, ManutencaoSchema,
+                         referencias=[("nome_equipamento", Equipamento.nome),
+                                      ("matricula_tecnico", Tecnico.matricula)])
+
+
+def versao_esperada(form):
+    """Retorna a versão esperada pelo cliente, informada no cabeçalho If-Match
+    (ex.: "3" ou W/"3") ou no campo versao do formulário, ou None se ausente
+
+    Levanta ValueError se a versão informada não for um número"""
+    valor = request.headers.get("If-Match", "").strip()
+    if not valor or valor == "*":
+        return form.versao
+    return int(valor.removeprefix("W/").strip('"'))
+
+
+@api.patch('/manutencao/<int:id>', tags=[manutencao_tag],
+          responses={"200": ManutencaoViewSchema, "400":ErrorSchema, "404":ErrorSchema,
+                     "409":ErrorSchema, "412":ErrorSchema, "422":ErrorSchema} )
 def patch_manutencao(path: ManutencaoPath, form:ManutencaoStatusSchema):
     """Atualiza parcialmente uma manutenção existente com dados de um formulário.
 
-    Apenas os campos enviados no formulário serão alterados.
+    Apenas os campos enviados no formulário serão alterados. Se a versão esperada
+    for informada (If-Match ou campo versao) e a manutenção estiver em outra
+    versão, nada é alterado e é retornado 412. Um novo equipamento ou técnico
+    não cadastrado retorna 422. A versão atual é retornada no corpo e no
+    cabeçalho ETag.
     """
     id = path.id
-    logger.debug(f"Buscando manutenção com ID {id} para atualização parcial")
+    logger.debug("Buscando manutenção com ID %s para atualização parcial", id)
+
+    try:
+        esperada = versao_esperada(form)
+    except ValueError:
+        return {"mesage": "Versão inválida no cabeçalho If-Match"}, 400
+
+    # Como apenas alguns dados serão enviados não será usado um Schema
+    # e sim os dados do formulário enviado na requisição
+    data = request.form
+    erro = valida_referencias(data.get("nome_equipamento"), data.get("matricula_tecnico"))
+    if erro:
+        logger.warning("Erro ao atualizar manutenção ID %s: %s", id, erro[0]["mesage"])
+        return erro
 
     try:
         session = Session()
@@ -339,44 +858,96 @@ def patch_manutencao(path: ManutencaoPath, form:ManutencaoStatusSchema):
 
         if not manutencao:
             error_msg = "Manutenção não encontrada"
-            logger.warning(f"Erro ao atualizar manutenção ID {id}: {error_msg}")
+            logger.warning("Erro ao atualizar manutenção ID %s: %s", id, error_msg)
             return {"message": error_msg}, 404
 
-        # Como apenas alguns dados serão enviados não será usado um Schema
-        # e sim os dados do formulário enviado na requisição
-        
-        data = request.form
-
-        # Atualiza apenas os campos informados no form
-        if "nome_equipamento" in data:
-            manutencao.nome_equipamento = data["nome_equipamento"]
-        if "matricula_tecnico" in data:
-            manutencao.matricula_tecnico = data["matricula_tecnico"]
-        if "status" in data:
-            manutencao.status = data["status"]
-        if "tipo_manutencao" in data:
-            manutencao.tipo_manutencao = data["tipo_manutencao"]
-        if "comentario" in data:
-            manutencao.comentario = data["comentario"]
-        if "previsao_conclusao" in data:
-            manutencao.previsao_conclusao = data["previsao_conclusao"]
-                    
-        session.commit()
-
-        logger.debug(f"Manutenção ID {id} atualizada parcialmente com sucesso")
-        return apresenta_manutencao(manutencao), 200
+        def atualiza(s):
+            # a cada tentativa a manutenção é recarregada (a transação anterior
+            # foi desfeita): a versão esperada é comparada com a atual, e o
+            # UPDATE do ORM só altera a linha se ela ainda estiver nessa versão
+            if esperada is not None and esperada != manutencao.versao:
+                return False
+            # Atualiza apenas os campos informados no form
+            if "nome_equipamento" in data:
+                manutencao.nome_equipamento = data["nome_equipamento"]
+            if "matricula_tecnico" in data:
+                manutencao.matricula_tecnico = data["matricula_tecnico"]
+            if "status" in data:
+                manutencao.status = data["status"]
+            if "tipo_manutencao" in data:
+                manutencao.tipo_manutencao = data["tipo_manutencao"]
+            if "comentario" in data:
+                manutencao.comentario = data["comentario"]
+            if "previsao_conclusao" in data:
+                manutencao.previsao_conclusao = data["previsao_conclusao"]
+            return True
+
+        if not executa_escrita(session, atualiza):
+            error_msg = "A manutenção foi alterada por outra requisição"
+            logger.warning("Erro ao atualizar manutenção ID %s: versão %s, esperada %s",
+                           id, manutencao.versao, esperada)
+            return {"mesage": error_msg, "versao": manutencao.versao}, 412, \
+                   {"ETag": '"%d"' % manutencao.versao}
+
+        logger.debug("Manutenção ID %s atualizada parcialmente com sucesso", id)
+        return apresenta_manutencao(manutencao), 200, {"ETag": '"%d"' % manutencao.versao}
+
+    except StaleDataError:
+        # alterada por outro worker entre a leitura e o UPDATE: com versão
+        # esperada é uma pré-condição que falhou
+        session.rollback()
+        error_msg = "A manutenção foi alterada por outra requisição"
+        logger.warning("Erro ao atualizar manutenção ID %s: %s", id, error_msg)
+        return {"mesage": error_msg}, 412 if esperada is not None else 409
+
+    except ObjectDeletedError:
+        # removida por outro worker antes de uma nova tentativa da escrita
+        session.rollback()
+        error_msg = "Manutenção não encontrada"
+        logger.warning("Erro ao atualizar manutenção ID %s: %s", id, error_msg)
+        return {"message": error_msg}, 404
+
+    except IntegrityError:
+        # equipamento ou técnico removido depois da validação pelo cache
+        session.rollback()
+        cache_referencias.invalida()
+        error_msg = "Equipamento ou técnico da manutenção não encontrado"
+        logger.warning("Erro ao atualizar manutenção ID %s: %s", id, error_msg)
+        return {"mesage": error_msg}, 422
 
     except Exception as e:
         session.rollback()
         error_msg = f"Erro ao atualizar parcialmente a manutenção: {str(e)}"
-        logger.error(f"Erro inesperado ao atualizar manutenção ID {id}: {error_msg}")
+        logger.error("Erro inesperado ao atualizar manutenção ID %s: %s", id, error_msg)
         return {"message": error_msg}, 500
 
     finally:
         session.close()
 
 
-@app.delete('/manutencao', tags=[manutencao_tag],
+
+@api.patch('/manutencoes/status', tags=[manutencao_tag],
+           responses={"200": ManutencaoStatusLoteViewSchema, "500": ErrorSchema})
+def patch_manutencoes_status(body: ManutencaoStatusLoteSchema):
+    """Altera de uma só vez o status das manutenções dos ids informados
+
+    Com status_atual, só são alteradas as manutenções nesse status; com versoes,
+    só as que ainda estão na versão esperada. Retorna os ids alterados com a nova
+    versão, os ids em conflito com a versão e o status atuais e os inexistentes"""
+    logger.debug("Alterando o status de %s manutenções para %s", len(body.ids), body.status)
+    session = Session()
+    try:
+        resultado = altera_status_lote(session, body.ids, body.status, body.status_atual, body.versoes)
+    except Exception as e:
+        session.rollback()
+        logger.error("Erro inesperado ao alterar o status das manutenções: %s", e)
+        return {"mesage": "Não foi possível alterar o status das manutenções"}, 500
+
+    logger.debug("Status alterado: %s alteradas, %s em conflito, %s inexistentes",
+                 len(resultado["alterados"]), len(resultado["conflitos"]), len(resultado["inexistentes"]))
+    return resultado, 200
+
+@api.delete('/manutencao', tags=[manutencao_tag],
             responses={"200":ManutencaoDelSchema, "404":ErrorSchema})
 def del_manutencao(query:ManutencaoIdSchema):
     """Deleta o cadastro de uma manutencao a partir do id informado
@@ -384,21 +955,53 @@ def del_manutencao(query:ManutencaoIdSchema):
     Retorna uma mensagem de confirmação da remoção
     """
     id_manutencao = query.id
-    print(id_manutencao)
-    logger.debug(f"Deletando dados sobre o técnico {id_manutencao}")
+    logger.debug("Deletando dados sobre a manutenção %s", id_manutencao)
     #criando conexão com o banco
     session=Session()
     #fazendo a remoção
-    count = session.query(Manutencao).filter(Manutencao.id == id_manutencao).delete()
-    session.commit()
+    count = executa_escrita(session, lambda s: s.query(Manutencao).filter(
+        Manutencao.id == id_manutencao).delete())
 
     if count:
         # retorna a representação da mensagem de confirmação
-        logger.debug(f"Deletado manutenção {id_manutencao}")
+        logger.debug("Deletado manutenção %s", id_manutencao)
         return {"mesage": "Manutenção removida", "ID": id_manutencao}, 200
     else:
         #se o equipamento não foi encontrado
         error_msg = "Manutenção não encontrada na base"
-        logger.warning(f"Erro ao deletar manutenção '{id_manutencao}', {error_msg}")
+        logger.warning("Erro ao deletar manutenção '%s', %s", id_manutencao, error_msg)
         return {"mesage": error_msg}, 404
 
+
+@api.delete('/manutencoes', tags=[manutencao_tag],
+            responses={"200": RemocaoLoteViewSchema, "500": ErrorSchema})
+def del_manutencoes(body: ManutencaoLoteDelSchema):
+    """Deleta em lote as manutenções dos ids informados
+
+    Retorna os ids removidos e os não encontrados"""
+    return remocao_em_lote(Manutencao, body.ids)
+
+
+def create_app(config=None):
+    """Cria a aplicação com as rotas da API
+
+    config (opcional) é um dicionário de configurações do Flask e das opções
+    da API: DB_PATH e DB_POOL_* para o banco, LOG_PATH, LOG_LEVEL,
+    LOG_MAX_BYTES, LOG_BACKUP_COUNT e LOG_QUEUE para os logs,
+    RESPONSE_CACHE_SIZE para o cache de respostas e
+    CHANGES_COMPACTION_INTERVAL para a compactação do log de alterações
+    (thread iniciada com o worker). Sem config valem as
+    variáveis de ambiente de mesmo nome. Nenhum arquivo, conexão ou thread é
+    criado aqui: logs e banco são preparados no primeiro uso"""
+    app = OpenAPI(__name__, info=info)
+    app.config.from_mapping(config or {})
+    if "RESPONSE_CACHE_SIZE" in app.config:
+        cache_respostas.max_itens = int(app.config["RESPONSE_CACHE_SIZE"])
+    CORS(app)
+    app.register_api(api)
+    return app
+
+
+# aplicação padrão, usada por "flask run" e "gunicorn app:app". Para outra
+# configuração use a fábrica: gunicorn --preload "app:create_app()"
+app = create_app()
@@ -0,0 +1,136 @@
+"""Modo de execução assíncrono (ASGI) da API.
+
+As rotas de consulta são atendidas por handlers assíncronos sobre uma engine
+SQLAlchemy assíncrona (driver aiosqlite), que executam as mesmas consultas da
+aplicação Flask (consultas.py), com os schemas de schemas/. As demais rotas (escritas,
+cargas em lote, monitoramento e a documentação OpenAPI) são repassadas à
+aplicação Flask de app.py, de modo que a superfície da API é a mesma nos dois
+modos. Para executar:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+"""
+from contextlib import asynccontextmanager
+from email.utils import format_datetime, parsedate_to_datetime
+
+from a2wsgi import WSGIMiddleware
+from pydantic import ValidationError
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+from app import app as app_sync, cache_respostas, metricas, inicializa
+from logger import logger, amostra_requisicao
+from model import obtem_engine_leitura
+from model.assincrono import cria_engine_assincrona
+from schemas import *
+import consultas
+
+
+# criados no início do ciclo de vida de cada worker (ver ciclo_de_vida)
+engine_assincrona = SessionAssincrona = None
+
+
+def _json(corpo, status: int) -> Response:
+    # serializa como a aplicação Flask (chaves ordenadas, formato compacto)
+    return Response(app_sync.json.dumps(corpo, separators=(",", ":")) + "\n", status,
+                    media_type="application/json")
+
+
+def _nao_modificado(request, item) -> bool:
+    """ Verifica as pré-condições If-None-Match / If-Modified-Since da requisição.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        etags = {etag.strip().removeprefix("W/").strip('"') for etag in if_none_match.split(",")}
+        return "*" in etags or item["etag"] in etags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return item["last_modified"] <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _resposta(request, item) -> Response:
+    status = 304 if _nao_modificado(request, item) else 200
+    return Response(item["corpo"] if status == 200 else b"", status, media_type=item["mimetype"],
+                    headers={"ETag": '"%s"' % item["etag"],
+                             "Last-Modified": format_datetime(item["last_modified"], usegmt=True),
+                             "Cache-Control": "no-cache"})
+
+
+def rota_consulta(regra: str, schema, consulta, por_dia: bool = False):
+    """Cria a rota GET assíncrona que valida a query string com o schema,
+    executa a consulta (função síncrona que recebe a sessão e os parâmetros) na
+    sessão assíncrona e responde a partir do cache de respostas compartilhado
+    com a aplicação Flask (por_dia: ver cache_listagem)"""
+    async def endpoint(request):
+        amostra_requisicao()
+        metricas.inicia_requisicao()
+        resposta = await _executa(request, schema, consulta)
+        metricas.finaliza_requisicao("GET", regra, resposta.status_code, len(resposta.body))
+        return resposta
+
+    async def _executa(request, schema, consulta):
+        try:
+            query = schema.model_validate(dict(request.query_params)) if schema else None
+        except ValidationError as e:
+            return Response(e.json(), 422, media_type="application/json")
+
+        chave = "%s?%s" % (request.url.path, request.url.query)
+        versao = cache_respostas.versao(por_dia)
+        item = cache_respostas.busca(chave, versao)
+        if item is None:
+            try:
+                async with SessionAssincrona() as session:
+                    corpo, status = await session.run_sync(consulta, query)
+            except ValueError as e:
+                return _json({"mesage": str(e)}, 400)
+            except Exception as e:
+                logger.error("Erro na rota assíncrona %s: %s", regra, e)
+                return _json({"mesage": "Erro interno no servidor"}, 500)
+            if status != 200:
+                return _json(corpo, status)
+            resposta = _json(corpo, status)
+            item = cache_respostas.guarda(chave, versao, resposta.body, "application/json")
+        return _resposta(request, item)
+
+    return Route(regra, endpoint, methods=["GET"])
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    # logs, schema e migrações pela engine síncrona, já no processo do worker;
+    # as rotas assíncronas só consultam, pelas conexões somente leitura
+    global engine_assincrona, SessionAssincrona
+    inicializa(app_sync)
+    engine_assincrona, SessionAssincrona = cria_engine_assincrona(obtem_engine_leitura())
+    # comandos SQL das rotas assíncronas também entram nas métricas por requisição
+    metricas.instrumenta_engine(engine_assincrona.sync_engine)
+    yield
+    await engine_assincrona.dispose()
+
+
+app = Starlette(
+    routes=[
+        rota_consulta("/equipamentos", PaginacaoSchema, consultas.lista_equipamentos),
+        rota_consulta("/tecnicos", PaginacaoSchema, consultas.lista_tecnicos),
+        rota_consulta("/manutencoes", ManutencaoPaginadoSchema, consultas.lista_manutencoes),
+        rota_consulta("/manutencoes/status", ManutencaoStatusPaginadoSchema, consultas.lista_manutencoes_status),
+        rota_consulta("/manutencoes/busca", ManutencaoBuscaSchema, consultas.busca_manutencoes),
+        rota_consulta("/manutencoes/resumo", None, consultas.resumo_manutencoes),
+        rota_consulta("/relatorios/mttr", RelatorioPeriodoSchema, consultas.relatorio_mttr, por_dia=True),
+        rota_consulta("/relatorios/abertas", RelatorioAbertasSchema, consultas.relatorio_abertas, por_dia=True),
+        rota_consulta("/relatorios/backlog", None, consultas.relatorio_backlog, por_dia=True),
+        rota_consulta("/relatorios/carga-tecnicos", RelatorioPeriodoSchema, consultas.relatorio_carga_tecnicos, por_dia=True),
+        rota_consulta("/busca", BuscaTextoSchema, consultas.busca_texto),
+        rota_consulta("/changes", AlteracoesBuscaSchema, consultas.lista_alteracoes),
+        # demais métodos e rotas: aplicação Flask, executada em threads
+        Mount("/", app=WSGIMiddleware(app_sync)),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=ciclo_de_vida,
+)
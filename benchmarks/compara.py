@@ -0,0 +1,45 @@
+""" Compara dois relatórios gerados por benchmarks/executa.py (ou por
+benchmarks/inicializacao.py).
+
+Exemplo:
+    python -m benchmarks.compara antes.json depois.json
+"""
+import json
+import sys
+
+
+METRICAS = ("vazao_rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def compara(antes: dict, depois: dict):
+    """ Retorna, por cenário, a variação percentual de cada métrica.
+    """
+    resultado = {}
+    for nome, atual in depois["cenarios"].items():
+        anterior = antes["cenarios"].get(nome)
+        if not anterior:
+            continue
+        # relatórios de benchmarks/inicializacao.py não têm vazão
+        resultado[nome] = {
+            metrica: round((atual[metrica] - anterior[metrica]) / anterior[metrica] * 100, 1)
+            if anterior.get(metrica) and metrica in atual else None
+            for metrica in METRICAS}
+    return resultado
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    if len(argv) != 2:
+        print(__doc__, file=sys.stderr)
+        return 2
+    with open(argv[0]) as a, open(argv[1]) as b:
+        variacoes = compara(json.load(a), json.load(b))
+    print(f"{'cenário':32s}" + "".join(f"{m:>12s}" for m in METRICAS))
+    for nome, valores in sorted(variacoes.items()):
+        print(f"{nome:32s}" + "".join(
+            f"{'-' if v is None else f'{v:+.1f}%':>12s}" for v in valores.values()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+""" Gerador de dados sintéticos para os benchmarks.
+
+Popula um banco SQLite descartável com volumes configuráveis de equipamentos,
+técnicos e manutenções, com distribuições de status, tipos e datas próximas às
+observadas em produção. A geração é determinística para uma mesma semente.
+"""
+from datetime import datetime, timedelta
+import random
+import sqlite3
+
+
+SETORES = ["EXD", "TCA", "MNT", "EXP", "LOG", "ARM", "PRD", "QLD", "EMB", "REC"]
+IMPACTOS = (["Alto", "Medio", "Baixo"], [0.2, 0.5, 0.3])
+TURNOS = (["A", "B", "C"], [0.4, 0.4, 0.2])
+MODELOS = ["EGV", "EGU", "ETV", "RX20", "RX60", "FM-X", "ECE", "EJC"]
+STATUS = (["Pronto", "Em manutenção", "Fila de espera", "Aguardando peças"],
+          [0.82, 0.06, 0.07, 0.05])
+TIPOS = (["Corretiva", "Preventiva", "Preditiva"], [0.6, 0.35, 0.05])
+COMENTARIOS = ["Troca de roda", "Rolamento da roda", "Aguardando peça do fornecedor",
+               "Vazamento hidráulico", "Revisão periódica", "Bateria não carrega",
+               "Garfo empenado", "Freio com ruído", ""]
+
+# histórico coberto pelas datas de previsão de conclusão
+DIAS_HISTORICO = 3 * 365
+TAMANHO_LOTE = 10000
+
+
+def nome_equipamento(indice: int) -> str:
+    return f"EQ-{indice:05d}"
+
+
+def matricula_tecnico(indice: int) -> str:
+    return f"{100000 + indice}"
+
+
+def _escolhe(rng, opcoes):
+    valores, pesos = opcoes
+    return rng.choices(valores, pesos)[0]
+
+
+def _manutencoes(rng, quantidade, equipamentos, tecnicos, agora):
+    inicio = agora - timedelta(days=DIAS_HISTORICO)
+    for _ in range(quantidade):
+        status = _escolhe(rng, STATUS)
+        if status == "Pronto":
+            # manutenções concluídas ficam espalhadas pelo histórico
+            previsao = inicio + timedelta(seconds=rng.randrange(DIAS_HISTORICO * 86400))
+        else:
+            # manutenções abertas têm previsão próxima, algumas já atrasadas
+            previsao = agora + timedelta(hours=rng.randint(-72, 240))
+        yield (nome_equipamento(rng.randrange(equipamentos)),
+               matricula_tecnico(rng.randrange(tecnicos)),
+               status,
+               _escolhe(rng, TIPOS),
+               rng.choice(COMENTARIOS),
+               previsao.strftime("%Y-%m-%d %H:%M:%S.000000"))
+
+
+def popula(caminho: str, equipamentos: int = 1000, tecnicos: int = 500,
+           manutencoes: int = 100000, semente: int = 42):
+    """ Insere os volumes informados no banco já criado em caminho. As linhas
+        diárias dos relatórios devem ser recalculadas em seguida.
+    """
+    rng = random.Random(semente)
+    agora = datetime(2026, 1, 1)
+    conn = sqlite3.connect(caminho)
+    with conn:
+        conn.executemany(
+            "INSERT INTO equipamentos (pk_nome, modelo, setor, impacto, data_insercao) VALUES (?, ?, ?, ?, ?)",
+            ((nome_equipamento(i), rng.choice(MODELOS), rng.choice(SETORES), _escolhe(rng, IMPACTOS),
+              agora.strftime("%Y-%m-%d %H:%M:%S.000000")) for i in range(equipamentos)))
+        conn.executemany(
+            "INSERT INTO tecnicos (nome, pk_matricula, turno) VALUES (?, ?, ?)",
+            ((f"Tecnico {i}", matricula_tecnico(i), _escolhe(rng, TURNOS)) for i in range(tecnicos)))
+    linhas = _manutencoes(rng, manutencoes, equipamentos, tecnicos, agora)
+    while True:
+        lote = [linha for _, linha in zip(range(TAMANHO_LOTE), linhas)]
+        if not lote:
+            break
+        with conn:
+            conn.executemany(
+                "INSERT INTO manutencao (nome_equipamento, matricula_tecnico, status, tipo_manutencao, "
+                "comentario, previsao_conclusao) VALUES (?, ?, ?, ?, ?, ?)", lote)
+    with conn:
+        # abertura até 10 dias antes da previsão nas concluídas (concluídas na
+        # previsão) e até 120 dias antes nas abertas, para que os relatórios
+        # diários tenham o volume de um histórico real
+        conn.execute(
+            "UPDATE ciclo_manutencao AS c SET "
+            "aberta_em = strftime('%Y-%m-%d %H:%M:%S.000000', m.previsao_conclusao, '-' || "
+            "(CASE WHEN m.status = 'Pronto' THEN m.pk_id * 7919 % 240 ELSE m.pk_id * 7919 % 2880 END) || ' hours'), "
+            "concluida_em = CASE WHEN m.status = 'Pronto' THEN m.previsao_conclusao END "
+            "FROM manutencao AS m WHERE m.pk_id = c.pk_id")
+    conn.execute("ANALYZE")
+    conn.close()
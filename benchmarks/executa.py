@@ -0,0 +1,355 @@
+""" Suíte de benchmark da API.
+
+Cria um banco SQLite descartável em um diretório temporário, popula-o com
+benchmarks/dados.py e exercita todas as rotas de app.py pelo test client do
+Flask (ou, com --asgi, pelo modo assíncrono de asgi.py), em modo sequencial
+ou com várias threads. O resultado é um relatório
+JSON (vazão e latências p50/p95/p99 por rota) que pode ser comparado entre
+execuções com benchmarks/compara.py.
+
+Exemplo:
+    python -m benchmarks.executa --manutencoes 1000000 --threads 8 --saida bench.json
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import count
+from threading import Lock, local
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Cenario:
+    """ Define como uma rota é exercitada: requisicao(i) retorna o método, a url
+        e os argumentos do test client da i-ésima requisição.
+    """
+
+    def __init__(self, nome, rota, requisicao, prepara=None):
+        self.nome = nome
+        self.rota = rota
+        self.requisicao = requisicao
+        self.prepara = prepara
+
+
+def percentil(valores, p):
+    """ Percentil pelo método nearest-rank sobre a lista já ordenada.
+    """
+    if not valores:
+        return 0.0
+    posicao = max(int(round(p / 100 * len(valores) + 0.5)) - 1, 0)
+    return valores[min(posicao, len(valores) - 1)]
+
+
+def cenarios(banco, volumes):
+    """ Retorna os cenários que cobrem as rotas da API.
+    """
+    from schemas.paginacao import codifica_cursor
+    from benchmarks.dados import nome_equipamento, matricula_tecnico
+
+    sequencia = count()
+    criados = {"equipamentos": [], "tecnicos": [], "manutencoes": []}
+    lock = Lock()
+
+    def unico():
+        with lock:
+            return next(sequencia)
+
+    def equipamento(i):
+        return {"nome": f"BENCH-{unico()}", "modelo": "EGV", "setor": "EXD", "impacto": "Medio"}
+
+    def tecnico(i):
+        return {"nome": "Bench", "matricula": f"B{unico()}", "turno": "A"}
+
+    def manutencao(i):
+        return {"nome_equipamento": nome_equipamento(i % volumes["equipamentos"]),
+                "matricula_tecnico": matricula_tecnico(i % volumes["tecnicos"]),
+                "status": "Fila de espera", "tipo_manutencao": "Corretiva",
+                "comentario": "benchmark", "previsao_conclusao": "2026-02-01T10:00:00"}
+
+    def post_equipamento(i):
+        dados = equipamento(i)
+        with lock:
+            criados["equipamentos"].append(dados["nome"])
+        return "post", "/equipamento", {"data": dados}
+
+    def post_tecnico(i):
+        dados = tecnico(i)
+        with lock:
+            criados["tecnicos"].append(dados["matricula"])
+        return "post", "/tecnico", {"data": dados}
+
+    def retira(chave):
+        with lock:
+            return criados[chave].pop() if criados[chave] else "inexistente"
+
+    def carrega_criadas():
+        conn = sqlite3.connect(banco)
+        criados["manutencoes"] = [linha[0] for linha in conn.execute(
+            "SELECT pk_id FROM manutencao WHERE comentario = 'benchmark'")]
+        conn.close()
+
+    meio = codifica_cursor(volumes["manutencoes"] // 2)
+    fim = codifica_cursor(max(volumes["manutencoes"] - 200, 0))
+
+    return [
+        Cenario("home", "GET /", lambda i: ("get", "/", {})),
+        Cenario("pool", "GET /pool", lambda i: ("get", "/pool", {})),
+        Cenario("metrics", "GET /metrics", lambda i: ("get", "/metrics", {})),
+        Cenario("get_equipamentos", "GET /equipamentos",
+                lambda i: ("get", "/equipamentos?limit=100", {})),
+        Cenario("get_tecnicos", "GET /tecnicos", lambda i: ("get", "/tecnicos?limit=100", {})),
+        Cenario("get_manutencoes", "GET /manutencoes", lambda i: ("get", "/manutencoes?limit=100", {})),
+        Cenario("get_manutencoes_pagina_meio", "GET /manutencoes",
+                lambda i: ("get", f"/manutencoes?limit=100&cursor={meio}", {})),
+        Cenario("get_manutencoes_pagina_fim", "GET /manutencoes",
+                lambda i: ("get", f"/manutencoes?limit=100&cursor={fim}", {})),
+        Cenario("get_manutencoes_expand", "GET /manutencoes",
+                lambda i: ("get", "/manutencoes?limit=100&expand=equipamento,tecnico", {})),
+        Cenario("get_equipamentos_export", "GET /equipamentos/export",
+                lambda i: ("get", "/equipamentos/export?format=ndjson", {})),
+        Cenario("get_manutencoes_export", "GET /manutencoes/export",
+                lambda i: ("get", "/manutencoes/export", {})),
+        Cenario("get_manutencoes_arquivadas", "GET /manutencoes",
+                lambda i: ("get", "/manutencoes?limit=100&include_archived=true", {})),
+        Cenario("get_manutencoes_status", "GET /manutencoes/status",
+                lambda i: ("get", "/manutencoes/status?status=Fila%20de%20espera&limit=100", {})),
+        Cenario("get_manutencoes_busca", "GET /manutencoes/busca",
+                lambda i: ("get", "/manutencoes/busca?setor=EXD&status=Fila%20de%20espera,Em%20manuten%C3%A7%C3%A3o"
+                                  "&ordem=previsao_conclusao&limit=100", {})),
+        Cenario("get_manutencoes_busca_equipamento", "GET /manutencoes/busca",
+                lambda i: ("get", "/manutencoes/busca?nome_equipamento=%s&limit=100"
+                           % nome_equipamento(i % volumes["equipamentos"]), {})),
+        Cenario("get_relatorio_mttr", "GET /relatorios/mttr",
+                lambda i: ("get", "/relatorios/mttr?de=2025-12-01&ate=2025-12-31", {})),
+        Cenario("get_relatorio_abertas", "GET /relatorios/abertas",
+                lambda i: ("get", "/relatorios/abertas", {})),
+        Cenario("get_relatorio_backlog", "GET /relatorios/backlog",
+                lambda i: ("get", "/relatorios/backlog", {})),
+        Cenario("get_relatorio_carga_tecnicos", "GET /relatorios/carga-tecnicos",
+                lambda i: ("get", "/relatorios/carga-tecnicos?de=2025-12-01&ate=2025-12-31", {})),
+        Cenario("get_manutencoes_resumo", "GET /manutencoes/resumo",
+                lambda i: ("get", "/manutencoes/resumo", {})),
+        Cenario("get_changes", "GET /changes",
+                lambda i: ("get", "/changes?since=%d&limit=500" % (i * 500 % volumes["manutencoes"]), {})),
+        Cenario("busca_texto", "GET /busca",
+                lambda i: ("get", "/busca?q=aguardando%20pe%C3%A7a&limit=20", {})),
+        Cenario("post_equipamento", "POST /equipamento", post_equipamento),
+        Cenario("post_equipamentos_bulk", "POST /equipamentos/bulk",
+                lambda i: ("post", "/equipamentos/bulk", {"json": [equipamento(i) for _ in range(100)]})),
+        Cenario("delete_equipamento", "DELETE /equipamento",
+                lambda i: ("delete", f"/equipamento?nome={retira('equipamentos')}", {})),
+        Cenario("delete_equipamentos_lote", "DELETE /equipamentos",
+                lambda i: ("delete", "/equipamentos",
+                           {"json": {"nomes": [retira("equipamentos") for _ in range(10)]}})),
+        Cenario("post_tecnico", "POST /tecnico", post_tecnico),
+        Cenario("post_tecnicos_bulk", "POST /tecnicos/bulk",
+                lambda i: ("post", "/tecnicos/bulk", {"json": [tecnico(i) for _ in range(100)]})),
+        Cenario("delete_tecnico", "DELETE /tecnico",
+                lambda i: ("delete", f"/tecnico?matricula={retira('tecnicos')}", {})),
+        Cenario("delete_tecnicos_lote", "DELETE /tecnicos",
+                lambda i: ("delete", "/tecnicos",
+                           {"json": {"matriculas": [retira("tecnicos") for _ in range(10)]}})),
+        Cenario("post_manutencao", "POST /manutencao",
+                lambda i: ("post", "/manutencao", {"data": manutencao(i)})),
+        Cenario("post_manutencoes_bulk", "POST /manutencoes/bulk",
+                lambda i: ("post", "/manutencoes/bulk", {"json": [manutencao(i + j) for j in range(100)]})),
+        Cenario("patch_manutencao", "PATCH /manutencao/<int:id>",
+                lambda i: ("patch", f"/manutencao/{1 + i % volumes['manutencoes']}",
+                           {"data": {"status": "Em manutenção"}})),
+        Cenario("patch_manutencoes_status", "PATCH /manutencoes/status",
+                lambda i: ("patch", "/manutencoes/status",
+                           {"json": {"ids": [1 + (i * 50 + j) % volumes["manutencoes"] for j in range(50)],
+                                     "status": "Em manutenção"}})),
+        Cenario("delete_manutencao", "DELETE /manutencao",
+                lambda i: ("delete", f"/manutencao?id={retira('manutencoes')}", {}),
+                prepara=carrega_criadas),
+        Cenario("delete_manutencoes_lote", "DELETE /manutencoes",
+                lambda i: ("delete", "/manutencoes",
+                           {"json": {"ids": [retira("manutencoes") for _ in range(10)]}}),
+                prepara=carrega_criadas),
+    ]
+
+
+def cliente_flask(app):
+    """ Retorna a função que envia uma requisição pelo test client do Flask (um
+        por thread) e devolve o status da resposta.
+    """
+    locais = local()
+
+    def envia(metodo, url, argumentos):
+        if not hasattr(locais, "cliente"):
+            locais.cliente = app.test_client()
+        resposta = getattr(locais.cliente, metodo)(url, **argumentos)
+        resposta.get_data()
+        return resposta.status_code
+    return envia
+
+
+def cliente_asgi(cliente):
+    """ Retorna a função que envia uma requisição pelo TestClient do Starlette
+        (compartilhado pelas threads, com um único event loop) e devolve o
+        status da resposta.
+    """
+    def envia(metodo, url, argumentos):
+        return cliente.request(metodo.upper(), url, **argumentos).status_code
+    return envia
+
+
+def mede(envia, cenario, requisicoes, threads):
+    """ Executa o cenário e retorna as métricas de vazão e latência.
+    """
+    if cenario.prepara:
+        cenario.prepara()
+    contador = count()
+    latencias = []
+    erros = 0
+    lock = Lock()
+
+    def trabalhador(quantidade):
+        nonlocal erros
+        locais = []
+        falhas = 0
+        for _ in range(quantidade):
+            metodo, url, argumentos = cenario.requisicao(next(contador))
+            inicio = time.perf_counter()
+            status = envia(metodo, url, argumentos)
+            locais.append(time.perf_counter() - inicio)
+            if status >= 500:
+                falhas += 1
+        with lock:
+            latencias.extend(locais)
+            erros += falhas
+
+    partes = [requisicoes // threads + (1 if t < requisicoes % threads else 0) for t in range(threads)]
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(trabalhador, partes))
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "rota": cenario.rota,
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "vazao_rps": round(len(latencias) / duracao, 2) if duracao else 0.0,
+        "media_ms": round(sum(latencias) / len(latencias) * 1000, 3) if latencias else 0.0,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 3),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 3),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--equipamentos", type=int, default=1000)
+    parser.add_argument("--tecnicos", type=int, default=500)
+    parser.add_argument("--manutencoes", type=int, default=100000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--requisicoes", type=int, default=200, help="requisições por cenário")
+    parser.add_argument("--threads", type=int, default=1, help="threads simultâneas (modo de carga)")
+    parser.add_argument("--cenarios", nargs="*", help="executa apenas os cenários informados")
+    parser.add_argument("--sem-cache", action="store_true", help="desativa o cache de respostas")
+    parser.add_argument("--asgi", action="store_true", help="mede o modo assíncrono (asgi.py)")
+    parser.add_argument("--group-commit", action="store_true", help="agrupa as inserções simultâneas em uma transação")
+    parser.add_argument("--saida", help="arquivo do relatório JSON (padrão: stdout)")
+    parser.add_argument("--manter-banco", action="store_true", help="não remove o banco gerado ao final")
+    args = parser.parse_args(argv)
+
+    volumes = {"equipamentos": args.equipamentos, "tecnicos": args.tecnicos,
+               "manutencoes": args.manutencoes}
+    origem = os.getcwd()
+    diretorio = tempfile.mkdtemp(prefix="bench-api-")
+    # a aplicação cria database/ e log/ no diretório corrente
+    os.chdir(diretorio)
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    if args.sem_cache:
+        os.environ["RESPONSE_CACHE_SIZE"] = "0"
+    if args.group_commit:
+        os.environ["GROUP_COMMIT"] = "1"
+    sys.path.insert(0, RAIZ)
+
+    import model
+    from benchmarks.dados import popula
+    banco = model.obtem_engine().url.database
+    inicio = time.perf_counter()
+    popula(banco, semente=args.semente, **volumes)
+    with model.obtem_engine().begin() as conn:
+        model.reconstroi_relatorios(conn)
+    geracao = time.perf_counter() - inicio
+    from app import app
+
+    selecionados = [c for c in cenarios(banco, volumes) if not args.cenarios or c.nome in args.cenarios]
+    cobertas = {c.rota for c in selecionados}
+    rotas = {f"{metodo} {regra.rule}" for regra in app.url_map.iter_rules()
+             for metodo in regra.methods - {"HEAD", "OPTIONS"}
+             if not regra.rule.startswith(("/openapi", "/static"))}
+
+    if args.asgi:
+        from starlette.testclient import TestClient
+        from asgi import app as app_asgi
+        cliente = TestClient(app_asgi)
+        cliente.__enter__()
+        envia = cliente_asgi(cliente)
+    else:
+        envia = cliente_flask(app)
+
+    resultados = {}
+    for cenario in selecionados:
+        resultados[cenario.nome] = mede(envia, cenario, args.requisicoes, args.threads)
+        print(f"{cenario.nome:32s} {resultados[cenario.nome]['vazao_rps']:>10.1f} req/s "
+              f"p50={resultados[cenario.nome]['p50_ms']}ms p99={resultados[cenario.nome]['p99_ms']}ms",
+              file=sys.stderr)
+
+    relatorio = {
+        "meta": {
+            "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "volumes": volumes,
+            "semente": args.semente,
+            "requisicoes": args.requisicoes,
+            "threads": args.threads,
+            "cache": not args.sem_cache,
+            "modo": "asgi" if args.asgi else "wsgi",
+            "group_commit": os.environ.get("GROUP_COMMIT", "0") != "0",
+            "geracao_dados_s": round(geracao, 2),
+            "rotas_sem_cenario": sorted(rotas - cobertas) if not args.cenarios else [],
+        },
+        "cenarios": resultados,
+    }
+    if args.asgi:
+        cliente.__exit__(None, None, None)
+    os.chdir(origem)
+    if args.manter_banco:
+        print(f"Banco mantido em {banco}", file=sys.stderr)
+    else:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    texto = json.dumps(relatorio, indent=2, sort_keys=True, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            arquivo.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+""" Mede o tempo de inicialização de um worker da API.
+
+Cada repetição executa um processo Python novo, em um diretório temporário, e
+mede as etapas da partida a frio: a importação de app.py, a criação de uma
+aplicação com create_app e a primeira requisição, tanto com o banco ainda
+inexistente (criação do schema e migrações) quanto com o banco já criado. O
+relatório JSON tem o mesmo formato de benchmarks/executa.py e pode ser
+comparado com benchmarks/compara.py (apenas as latências são informadas).
+
+Exemplo:
+    python -m benchmarks.inicializacao --repeticoes 10 --saida inicio.json
+"""
+from datetime import datetime, timezone
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.executa import RAIZ, percentil, _commit
+
+
+# executado em cada processo: imprime a duração (ms) de cada etapa
+PROGRAMA = """
+import json, sys, time
+inicio = time.perf_counter()
+import app
+importacao = time.perf_counter()
+aplicacao = app.create_app()
+criacao = time.perf_counter()
+resposta = aplicacao.test_client().get("/equipamentos?limit=1")
+requisicao = time.perf_counter()
+assert resposta.status_code == 200, resposta.status_code
+print(json.dumps({
+    "importa_app": (importacao - inicio) * 1000,
+    "create_app": (criacao - importacao) * 1000,
+    "primeira_requisicao": (requisicao - criacao) * 1000,
+    "total": (requisicao - inicio) * 1000,
+}))
+"""
+
+
+def executa_processo(diretorio: str, banco: str) -> dict:
+    """ Executa PROGRAMA em um processo novo com o banco em banco e retorna as
+        durações das etapas.
+    """
+    ambiente = dict(os.environ, DB_PATH=banco, LOG_PATH=os.path.join(diretorio, "log"),
+                    LOG_LEVEL="ERROR", PYTHONPATH=RAIZ)
+    saida = subprocess.run([sys.executable, "-c", PROGRAMA], cwd=diretorio, env=ambiente,
+                           capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout.splitlines()[-1])
+
+
+def modulos_mais_lentos(diretorio: str, quantidade: int = 10):
+    """ Retorna os módulos importados diretamente por app.py com maior tempo
+        acumulado de importação (ms), segundo python -X importtime.
+    """
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ, LOG_PATH=os.path.join(diretorio, "log"))
+    saida = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=diretorio,
+                           env=ambiente, capture_output=True, text=True, check=True)
+    # cada módulo aparece após os que ele importa, indentado pela profundidade
+    filhos, modulos = [], []
+    for linha in saida.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, acumulado, nome = linha[len("import time:"):].split("|")
+        profundidade = (len(nome) - len(nome.lstrip())) // 2
+        if profundidade == 1:
+            filhos.append((nome.strip(), round(int(acumulado) / 1000, 1)))
+        elif profundidade == 0:
+            if nome.strip() == "app":
+                modulos = filhos
+            filhos = []
+    return dict(sorted(modulos, key=lambda m: m[1], reverse=True)[:quantidade])
+
+
+def resume(duracoes):
+    duracoes = sorted(duracoes)
+    return {
+        "p50_ms": round(percentil(duracoes, 50), 1),
+        "p95_ms": round(percentil(duracoes, 95), 1),
+        "p99_ms": round(percentil(duracoes, 99), 1),
+        "medidas": len(duracoes),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=5, help="processos medidos por situação")
+    parser.add_argument("--saida", help="arquivo do relatório JSON (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    diretorio = tempfile.mkdtemp(prefix="bench-inicio-")
+    medidas = {}
+    try:
+        for repeticao in range(args.repeticoes):
+            banco = os.path.join(diretorio, f"banco-{repeticao}")
+            # no primeiro processo o banco não existe: a primeira requisição cria
+            # o schema e aplica as migrações; o segundo reaproveita o mesmo banco
+            for situacao in ("banco_novo", "banco_existente"):
+                for etapa, duracao in executa_processo(diretorio, banco).items():
+                    medidas.setdefault(f"{situacao}/{etapa}", []).append(duracao)
+        modulos = modulos_mais_lentos(diretorio)
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    resultados = {nome: resume(duracoes) for nome, duracoes in medidas.items()}
+    for nome, resultado in sorted(resultados.items()):
+        print(f"{nome:40s} p50={resultado['p50_ms']}ms p95={resultado['p95_ms']}ms", file=sys.stderr)
+
+    relatorio = {
+        "meta": {
+            "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "repeticoes": args.repeticoes,
+            "importacao_por_modulo_ms": modulos,
+        },
+        "cenarios": resultados,
+    }
+    texto = json.dumps(relatorio, indent=2, sort_keys=True, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            arquivo.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
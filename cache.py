@@ -0,0 +1,124 @@
+from collections import OrderedDict
+from email.utils import format_datetime
+from datetime import date, datetime, timezone
+from functools import wraps
+from threading import Lock
+import hashlib
+import os
+
+from flask import request, make_response
+
+
+class CacheRespostas:
+    """ Cache em memória das respostas das rotas de listagem, indexado por rota
+        e query string.
+
+    As entradas ficam válidas enquanto a versão dos dados não mudar. A versão é
+    composta por um contador local, incrementado pelas rotas de escrita através
+    de invalida(), e pela assinatura (mtime e tamanho) dos arquivos do banco,
+    que muda quando outro worker efetiva uma escrita. As respostas que dependem
+    da data corrente usam a versão do dia (versao(por_dia=True)), que também
+    muda à meia-noite.
+    """
+
+    def __init__(self, max_itens: int = 256, arquivos=()):
+        self.max_itens = max_itens
+        self.arquivos = list(arquivos)
+        self._itens = OrderedDict()
+        self._lock = Lock()
+        self._geracao = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _assinatura(self):
+        assinatura = []
+        for arquivo in self.arquivos:
+            try:
+                info = os.stat(arquivo)
+                assinatura.append((info.st_mtime_ns, info.st_size))
+            except FileNotFoundError:
+                assinatura.append(None)
+        return tuple(assinatura)
+
+    def versao(self, por_dia: bool = False):
+        versao = (self._geracao, self._assinatura())
+        return versao + (date.today(),) if por_dia else versao
+
+    def invalida(self):
+        """ Descarta todas as respostas armazenadas.
+        """
+        with self._lock:
+            self._geracao += 1
+            self._itens.clear()
+
+    def busca(self, chave, versao):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None or item["versao"] != versao:
+                self.misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return item
+
+    def guarda(self, chave, versao, corpo: bytes, mimetype: str):
+        item = {
+            "versao": versao,
+            "corpo": corpo,
+            "mimetype": mimetype,
+            "etag": hashlib.blake2b(corpo, digest_size=16).hexdigest(),
+            "last_modified": datetime.now(timezone.utc).replace(microsecond=0),
+        }
+        with self._lock:
+            self._itens[chave] = item
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+        return item
+
+    def resumo(self) -> dict:
+        with self._lock:
+            return {"itens": len(self._itens), "hits": self.hits, "misses": self.misses}
+
+
+def _nao_modificado(item) -> bool:
+    """ Verifica as pré-condições If-None-Match / If-Modified-Since da requisição.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains(item["etag"])
+    if request.if_modified_since:
+        return item["last_modified"] <= request.if_modified_since
+    return False
+
+
+def _resposta(item, status):
+    resposta = make_response(item["corpo"] if status == 200 else b"", status)
+    resposta.mimetype = item["mimetype"]
+    resposta.set_etag(item["etag"])
+    resposta.headers["Last-Modified"] = format_datetime(item["last_modified"], usegmt=True)
+    resposta.headers["Cache-Control"] = "no-cache"
+    return resposta
+
+
+def cache_listagem(cache: CacheRespostas, por_dia: bool = False):
+    """ Decorador das rotas GET de listagem: responde a partir do cache quando os
+        dados não mudaram e devolve 304 Not Modified quando o cliente já possui
+        a versão atual (ETag / Last-Modified), sem acessar o banco.
+
+    Com por_dia, a resposta armazenada vale apenas no dia em que foi gerada
+    (rotas cujo resultado depende da data corrente, como os relatórios).
+    """
+    def decorador(funcao):
+        @wraps(funcao)
+        def rota(*args, **kwargs):
+            chave = request.full_path
+            versao = cache.versao(por_dia)
+            item = cache.busca(chave, versao)
+            if item is None:
+                resposta = make_response(funcao(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+                item = cache.guarda(chave, versao, resposta.get_data(), resposta.mimetype)
+            return _resposta(item, 304 if _nao_modificado(item) else 200)
+        return rota
+    return decorador
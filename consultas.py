@@ -0,0 +1,167 @@
+"""Consultas das rotas GET, compartilhadas pela aplicação Flask (app.py) e pelo
+modo assíncrono (asgi.py).
+
+Cada consulta recebe a sessão (síncrona, ou a da engine assíncrona por
+run_sync) e os parâmetros já validados pelo schema da rota e retorna a tupla
+(corpo, status) da resposta. Parâmetros inválidos (ex.: cursor malformado)
+levantam ValueError, respondido com 400 por cada modo.
+"""
+from datetime import datetime
+from urllib.parse import unquote
+
+from sqlalchemy import func, select
+
+from logger import logger
+from model import Equipamento, Tecnico, Manutencao, Alteracao, ResumoManutencao, no_arquivo, \
+                  filtra_manutencoes, expressao_texto, horizonte_alteracoes, leitura_consistente
+from schemas import *
+
+
+def variantes_arquivo(query):
+    """Tabelas consultadas além da manutencao: o arquivo, com include_archived"""
+    return (no_arquivo,) if query.include_archived else ()
+
+
+def lista_equipamentos(session, query: PaginacaoSchema):
+    """Página de GET /equipamentos, ordenada por nome"""
+    equipamentos, next_cursor = pagina_keyset(session, select(*COLUNAS_EQUIPAMENTO), Equipamento.nome,
+                                              lambda e: e.nome, query)
+    if not equipamentos:
+        # se não há equipamentos cadastrados
+        return {"equipamentos":[], "limit": query.limit, "next_cursor": None}, 200
+    logger.debug("%s equipamentos encontrados", len(equipamentos))
+    resposta = apresenta_equipamentos_linhas(equipamentos)
+    resposta.update(limit=query.limit, next_cursor=next_cursor)
+    return resposta, 200
+
+
+def lista_tecnicos(session, query: PaginacaoSchema):
+    """Página de GET /tecnicos, ordenada por matrícula"""
+    tecnicos, next_cursor = pagina_keyset(session, select(*COLUNAS_TECNICO), Tecnico.matricula,
+                                          lambda t: t.matricula, query)
+    if not tecnicos:
+        # se não há tecnicos cadastrados
+        return {"tecnicos":[], "limit": query.limit, "next_cursor": None}, 200
+    logger.debug("%s tecnicos encontrados", len(tecnicos))
+    resposta = apresenta_tecnicos_linhas(tecnicos)
+    resposta.update(limit=query.limit, next_cursor=next_cursor)
+    return resposta, 200
+
+
+def lista_manutencoes(session, query: ManutencaoPaginadoSchema, status: str = None):
+    """Página de GET /manutencoes (ou, com status, de GET /manutencoes/status),
+    ordenada por id"""
+    consulta, apresenta = consulta_manutencoes(query.expand)
+    if status is not None:
+        consulta = consulta.where(Manutencao.status == status)
+    manutencoes, next_cursor = pagina_keyset(session, consulta, Manutencao.id, lambda m: m.id, query,
+                                             variantes=variantes_arquivo(query))
+    if not manutencoes:
+        return {"manutenções":[], "limit": query.limit, "next_cursor": None}, 200  # Retorna lista vazia no formato esperado
+    resposta = apresenta(manutencoes)
+    resposta.update(limit=query.limit, next_cursor=next_cursor)
+    return resposta, 200
+
+
+def lista_manutencoes_status(session, query: ManutencaoStatusPaginadoSchema):
+    """Página de GET /manutencoes/status"""
+    return lista_manutencoes(session, query, unquote(unquote(query.status)))
+
+
+def busca_manutencoes(session, query: ManutencaoBuscaSchema):
+    """Página de GET /manutencoes/busca, na ordem do parâmetro ordem"""
+    consulta, apresenta = consulta_manutencoes(query.expand)
+    status = [s.strip() for s in unquote(query.status).split(",") if s.strip()] if query.status else None
+    ordem = query.ordem.lstrip("-")
+    consulta, indice = filtra_manutencoes(
+        consulta, session,
+        nome_equipamento=query.nome_equipamento,
+        matricula_tecnico=query.matricula_tecnico,
+        status=status,
+        tipo_manutencao=query.tipo_manutencao,
+        setor=query.setor,
+        previsao_de=query.previsao_de,
+        previsao_ate=query.previsao_ate,
+        ordem=ordem)
+    logger.debug("Busca de manutenções conduzida pelo índice %s", indice)
+
+    if ordem == "previsao_conclusao":
+        # cursor composto pela data e pelo id, para desempate
+        consulta = consulta.add_columns(Manutencao.previsao_conclusao.label("previsao_cursor"))
+        manutencoes, next_cursor = pagina_keyset(
+            session, consulta, (Manutencao.previsao_conclusao, Manutencao.id),
+            lambda m: [m.previsao_cursor.isoformat(), m.id], query,
+            descendente=query.ordem.startswith("-"),
+            converte=lambda chave: [datetime.fromisoformat(chave[0]), int(chave[1])],
+            variantes=variantes_arquivo(query))
+    else:
+        manutencoes, next_cursor = pagina_keyset(session, consulta, Manutencao.id, lambda m: m.id,
+                                                 query, descendente=query.ordem.startswith("-"),
+                                                 variantes=variantes_arquivo(query))
+
+    resposta = apresenta(manutencoes)
+    resposta.update(limit=query.limit, next_cursor=next_cursor)
+    return resposta, 200
+
+
+def resumo_manutencoes(session, query=None):
+    """Contadores de GET /manutencoes/resumo"""
+    contadores = session.execute(select(ResumoManutencao.dimensao, ResumoManutencao.valor,
+                                        ResumoManutencao.quantidade)).all()
+    return apresenta_resumo(contadores), 200
+
+
+def relatorio_mttr(session, query: RelatorioPeriodoSchema):
+    """Relatório de GET /relatorios/mttr"""
+    de, ate = periodo_relatorio(query)
+    return apresenta_mttr(session.execute(consulta_mttr(de, ate)).all(), de, ate), 200
+
+
+def relatorio_abertas(session, query: RelatorioAbertasSchema):
+    """Relatório de GET /relatorios/abertas"""
+    return apresenta_abertas(session.execute(consulta_abertas(query.setor)).all(), query.setor), 200
+
+
+def relatorio_backlog(session, query=None):
+    """Relatório de GET /relatorios/backlog"""
+    return apresenta_backlog(session.execute(consulta_abertas()).all()), 200
+
+
+def relatorio_carga_tecnicos(session, query: RelatorioPeriodoSchema):
+    """Relatório de GET /relatorios/carga-tecnicos"""
+    de, ate = periodo_relatorio(query)
+    return apresenta_carga(session.execute(consulta_carga(de, ate)).all(), de, ate), 200
+
+
+def busca_texto(session, query: BuscaTextoSchema):
+    """Resultado de GET /busca"""
+    expressao = expressao_texto(unquote(query.q))
+    equipamentos = session.execute(consulta_busca_equipamentos(expressao, query.limit)).all()
+    manutencoes = session.execute(consulta_busca_manutencoes(expressao, query.limit)).all()
+    return apresenta_busca(equipamentos, manutencoes), 200
+
+
+def lista_alteracoes(session, query: AlteracoesBuscaSchema):
+    """Página de GET /changes, ou 410 se since é anterior ao horizonte da
+    compactação"""
+    # horizonte, entradas e estados lidos no mesmo estado do banco: uma escrita
+    # efetivada entre as consultas não fica fora do delta nem do next_since
+    with leitura_consistente(session.connection()):
+        horizonte = horizonte_alteracoes(session.connection())
+        if 0 < query.since < horizonte:
+            # antes da carga completa o cliente busca o seq atual, de modo que
+            # nenhuma alteração feita durante a recarga se perde
+            atual = max(session.scalar(select(func.max(Alteracao.seq))) or 0, horizonte)
+            return {"mesage": "Alterações anteriores ao horizonte já foram compactadas; recarregue os dados",
+                    "next_since": atual}, 410
+
+        entradas = session.execute(consulta_alteracoes(query.since, query.limit)).all()
+        pendentes = {}
+        for seq, tabela, chave, operacao in entradas[:query.limit]:
+            if operacao != "delete":
+                pendentes.setdefault(tabela, set()).add(chave)
+        estados = {}
+        for tabela, chaves in pendentes.items():
+            for linha in session.execute(consulta_estados(tabela, chaves)):
+                estados[(tabela, str(linha[0]))] = linha[1:]
+    return apresenta_alteracoes(entradas, estados, query.since, query.limit), 200
@@ -1,71 +1,177 @@
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+from contextvars import ContextVar
+from queue import SimpleQueue
+from threading import Lock
+import atexit
 import logging
 import os
+import random
 
 
-log_path = "log/"
-# Verifica se o diretorio para armexanar os logs não existe
-if not os.path.exists(log_path):
-   # então cria o diretorio
-   os.makedirs(log_path)
+# configurações ajustáveis por variáveis de ambiente (ou pelos argumentos de
+# configura_logs). Nada é configurado na importação do módulo
+configuracao = {
+    "log_path": os.environ.get("LOG_PATH", "log/"),
+    "log_level": os.environ.get("LOG_LEVEL", "INFO").upper(),
+    # tamanho máximo de cada arquivo de log antes da rotação (padrão 10 MiB)
+    "log_max_bytes": int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+    "log_backup_count": int(os.environ.get("LOG_BACKUP_COUNT", 10)),
+    # com LOG_QUEUE=0 os handlers voltam a escrever diretamente na thread da requisição
+    "log_queue": os.environ.get("LOG_QUEUE", "1") != "0",
+}
+# fração das requisições que terão seus logs de DEBUG registrados
+log_debug_sample_rate = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", 1.0))
 
+listeners = []
+_configurado = False
+_lock = Lock()
 
-dictConfig({
-    "version": 1,
-    "disable_existing_loggers": True,
-    "formatters": {
-        "default": {
-            "format": "[%(asctime)s] %(levelname)-4s %(funcName)s() L%(lineno)-4d %(message)s",
+
+def _dict_config(log_path, log_level, log_max_bytes, log_backup_count):
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {
+            "default": {
+                "format": "[%(asctime)s] %(levelname)-4s %(funcName)s() L%(lineno)-4d %(message)s",
+            },
+            "detailed": {
+                "format": "[%(asctime)s] %(levelname)-4s %(funcName)s() L%(lineno)-4d %(message)s - call_trace=%(pathname)s L%(lineno)-4d",
+            }
         },
-        "detailed": {
-            "format": "[%(asctime)s] %(levelname)-4s %(funcName)s() L%(lineno)-4d %(message)s - call_trace=%(pathname)s L%(lineno)-4d",
-        }
-    },
-    "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "default",
-            "stream": "ext://sys.stdout",
+        "handlers": {
+            "console": {
+                "class": "logging.StreamHandler",
+                "formatter": "default",
+                "stream": "ext://sys.stdout",
+            },
+            # "email": {
+            #     "class": "logging.handlers.SMTPHandler",
+            #     "formatter": "default",
+            #     "level": "ERROR",
+            #     "mailhost": ("smtp.example.com", 587),
+            #     "fromaddr": "devops@example.com",
+            #     "toaddrs": ["receiver@example.com", "receiver2@example.com"],
+            #     "subject": "Error Logs",
+            #     "credentials": ("username", "password"),
+            # },
+            "error_file": {
+                "class": "logging.handlers.RotatingFileHandler",
+                "formatter": "detailed",
+                "filename": os.path.join(log_path, "gunicorn.error.log"),
+                "maxBytes": log_max_bytes,
+                "backupCount": log_backup_count,
+                "delay": True,
+            },
+            "detailed_file": {
+                "class": "logging.handlers.RotatingFileHandler",
+                "formatter": "detailed",
+                "filename": os.path.join(log_path, "gunicorn.detailed.log"),
+                "maxBytes": log_max_bytes,
+                "backupCount": log_backup_count,
+                "delay": True,
+            }
         },
-        # "email": {
-        #     "class": "logging.handlers.SMTPHandler",
-        #     "formatter": "default",
-        #     "level": "ERROR",
-        #     "mailhost": ("smtp.example.com", 587),
-        #     "fromaddr": "devops@example.com",
-        #     "toaddrs": ["receiver@example.com", "receiver2@example.com"],
-        #     "subject": "Error Logs",
-        #     "credentials": ("username", "password"),
-        # },
-        "error_file": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "formatter": "detailed",
-            "filename": "log/gunicorn.error.log",
-            "maxBytes": 10000,
-            "backupCount": 10,
-            "delay": "True",
+        "loggers": {
+            "gunicorn.error": {
+                "handlers": ["console", "error_file"],  #, email],
+                "level": "INFO",
+                "propagate": False,
+            },
+            # evita que o DEBUG da aplicação ative os logs internos do SQLAlchemy
+            # (o pool usa o nome da sua classe, definida em model/pool.py)
+            "sqlalchemy": {
+                "level": "WARNING",
+            },
+            "model.pool": {
+                "level": "WARNING",
+            }
         },
-        "detailed_file": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "formatter": "detailed",
-            "filename": "log/gunicorn.detailed.log",
-            "maxBytes": 10000,
-            "backupCount": 10,
-            "delay": "True",
-        }
-    },
-    "loggers": {
-        "gunicorn.error": {
-            "handlers": ["console", "error_file"],  #, email],
-            "level": "INFO",
-            "propagate": False,
+        "root": {
+            "handlers": ["console", "detailed_file"],
+            "level": log_level,
         }
-    },
-    "root": {
-        "handlers": ["console", "detailed_file"],
-        "level": "INFO",
     }
-})
+
+
+def enfileira_handlers(destino: logging.Logger) -> QueueListener:
+    """ Substitui os handlers do logger por um QueueHandler e passa a executar
+        os handlers originais (escrita em arquivo/console) em uma thread de
+        segundo plano, tirando o I/O de log da thread da requisição.
+    """
+    fila = SimpleQueue()
+    listener = QueueListener(fila, *destino.handlers, respect_handler_level=True)
+    destino.handlers = [QueueHandler(fila)]
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def configura_logs(**opcoes):
+    """ Configura os handlers de log (console e arquivos em log_path) na
+        primeira chamada; as chamadas seguintes não têm efeito.
+
+    As opções (log_path, log_level, log_max_bytes, log_backup_count, log_queue)
+    substituem os valores lidos das variáveis de ambiente.
+    """
+    global _configurado
+    if _configurado:
+        return
+    with _lock:
+        if _configurado:
+            return
+        configuracao.update({chave: valor for chave, valor in opcoes.items() if valor is not None})
+        # Verifica se o diretorio para armexanar os logs não existe
+        if not os.path.exists(configuracao["log_path"]):
+            # então cria o diretorio
+            os.makedirs(configuracao["log_path"])
+        dictConfig(_dict_config(configuracao["log_path"], configuracao["log_level"].upper(),
+                                configuracao["log_max_bytes"], configuracao["log_backup_count"]))
+        if configuracao["log_queue"]:
+            listeners.extend([enfileira_handlers(logging.getLogger()),
+                              enfileira_handlers(logging.getLogger("gunicorn.error"))])
+        # a amostragem vale para todos os registros que chegam aos handlers da raiz
+        for handler in logging.getLogger().handlers:
+            handler.addFilter(FiltroAmostragem())
+        _configurado = True
+
+
+def _reinicia_listeners():
+    # a thread do listener não sobrevive ao fork (gunicorn --preload): o
+    # processo filho recebe filas novas e inicia as suas próprias threads
+    for listener in listeners:
+        fila = SimpleQueue()
+        for destino in (logging.getLogger(), logging.getLogger("gunicorn.error")):
+            for handler in destino.handlers:
+                if isinstance(handler, QueueHandler) and handler.queue is listener.queue:
+                    handler.queue = fila
+        listener.queue = fila
+        listener._thread = None
+        listener.start()
+
+
+os.register_at_fork(after_in_child=_reinicia_listeners)
+
+
+# indica se os logs de DEBUG da requisição corrente devem ser registrados
+_debug_amostrado = ContextVar("debug_amostrado", default=True)
+
+
+class FiltroAmostragem(logging.Filter):
+    """ Descarta os registros de DEBUG das requisições que não foram sorteadas
+        pela amostragem, mantendo todos os registros de nível INFO ou superior.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or _debug_amostrado.get()
+
+
+def amostra_requisicao():
+    """ Sorteia se os logs de DEBUG da requisição corrente serão registrados,
+        de acordo com LOG_DEBUG_SAMPLE_RATE.
+    """
+    _debug_amostrado.set(log_debug_sample_rate >= 1.0 or random.random() < log_debug_sample_rate)
 
 
 logger = logging.getLogger(__name__)
@@ -0,0 +1,186 @@
+from contextvars import ContextVar
+from threading import Lock
+import time
+
+from sqlalchemy import event
+
+
+# limites (em segundos/bytes/quantidade) dos buckets dos histogramas
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_TAMANHO = (100, 1000, 10000, 100000, 1000000, 10000000)
+BUCKETS_SQL = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escapa(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _rotulos(nomes, valores, extra: str = "") -> str:
+    pares = [f'{nome}="{_escapa(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """ Contador com rótulos no formato do Prometheus.
+    """
+
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = Lock()
+
+    def incrementa(self, valores=(), quantidade=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def exporta(self):
+        with self._lock:
+            itens = sorted(self._valores.items())
+        for valores, total in itens:
+            yield f"{self.nome}{_rotulos(self.rotulos, valores)} {_numero(total)}"
+
+
+class Histograma:
+    """ Histograma com buckets fixos e rótulos no formato do Prometheus.
+    """
+
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, buckets, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.buckets = tuple(buckets)
+        self.rotulos = tuple(rotulos)
+        self._series = {}
+        self._lock = Lock()
+
+    def observa(self, valor, valores=()):
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = {"buckets": [0] * len(self.buckets), "soma": 0.0, "total": 0}
+            for indice, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie["buckets"][indice] += 1
+            serie["soma"] += valor
+            serie["total"] += 1
+
+    def exporta(self):
+        with self._lock:
+            itens = sorted((valores, dict(serie, buckets=list(serie["buckets"])))
+                           for valores, serie in self._series.items())
+        for valores, serie in itens:
+            for limite, quantidade in zip(self.buckets, serie["buckets"]):
+                le = 'le="%s"' % _numero(limite)
+                yield f"{self.nome}_bucket{_rotulos(self.rotulos, valores, le)} {quantidade}"
+            le = 'le="+Inf"'
+            yield f"{self.nome}_bucket{_rotulos(self.rotulos, valores, le)} {serie['total']}"
+            yield f"{self.nome}_sum{_rotulos(self.rotulos, valores)} {_numero(serie['soma'])}"
+            yield f"{self.nome}_count{_rotulos(self.rotulos, valores)} {serie['total']}"
+
+
+class Medidor:
+    """ Valor instantâneo (gauge) calculado no momento da exportação.
+    """
+
+    tipo = "gauge"
+
+    def __init__(self, nome: str, ajuda: str, funcao):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.funcao = funcao
+
+    def exporta(self):
+        yield f"{self.nome} {_numero(self.funcao())}"
+
+
+class ContadorCalculado(Medidor):
+    """ Total acumulado (counter) mantido por outro componente, lido no momento
+        da exportação.
+    """
+
+    tipo = "counter"
+
+
+class Metricas:
+    """ Registro das métricas da aplicação, exportadas no formato texto do
+        Prometheus (versão 0.0.4).
+
+    As métricas são mantidas por processo: com vários workers do gunicorn cada
+    um expõe os próprios valores, que devem ser agregados pelo Prometheus.
+    """
+
+    def __init__(self):
+        rotulos = ("method", "route")
+        self.requisicoes = Contador("http_requests_total", "Total de requisições por rota e status",
+                                    rotulos + ("status",))
+        self.latencia = Histograma("http_request_duration_seconds", "Tempo de resposta das requisições",
+                                   BUCKETS_LATENCIA, rotulos)
+        self.tamanho = Histograma("http_response_size_bytes", "Tamanho do corpo das respostas",
+                                  BUCKETS_TAMANHO, rotulos)
+        self.comandos_sql = Histograma("http_request_db_statements", "Comandos SQL executados por requisição",
+                                       BUCKETS_SQL, rotulos)
+        self.tempo_sql = Histograma("http_request_db_seconds", "Tempo acumulado no banco por requisição",
+                                    BUCKETS_LATENCIA, rotulos)
+        self.registradas = [self.requisicoes, self.latencia, self.tamanho, self.comandos_sql, self.tempo_sql]
+        self._requisicao = ContextVar("metricas_requisicao", default=None)
+
+    def registra(self, metrica):
+        self.registradas.append(metrica)
+        return metrica
+
+    def inicia_requisicao(self):
+        self._requisicao.set({"inicio": time.perf_counter(), "comandos": 0, "tempo_sql": 0.0})
+
+    def finaliza_requisicao(self, metodo: str, rota: str, status: int, tamanho):
+        dados = self._requisicao.get()
+        if dados is None:
+            return
+        self._requisicao.set(None)
+        rotulos = (metodo, rota)
+        self.requisicoes.incrementa(rotulos + (str(status),))
+        self.latencia.observa(time.perf_counter() - dados["inicio"], rotulos)
+        if tamanho is not None:
+            self.tamanho.observa(tamanho, rotulos)
+        self.comandos_sql.observa(dados["comandos"], rotulos)
+        self.tempo_sql.observa(dados["tempo_sql"], rotulos)
+
+    def instrumenta_engine(self, engine):
+        """ Conta os comandos SQL e o tempo gasto no banco pela requisição
+            corrente, através dos eventos de cursor da engine.
+
+        O início de cada comando fica no contexto da sua execução, descartado
+        com ele: um comando que falha (sem after_cursor_execute) não deixa
+        estado na conexão do pool.
+        """
+        @event.listens_for(engine, "before_cursor_execute")
+        def antes(conn, cursor, statement, parameters, context, executemany):
+            if context is not None:
+                context._metricas_inicio = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def depois(conn, cursor, statement, parameters, context, executemany):
+            dados = self._requisicao.get()
+            if dados is not None:
+                dados["comandos"] += 1
+                inicio = getattr(context, "_metricas_inicio", None)
+                if inicio is not None:
+                    dados["tempo_sql"] += time.perf_counter() - inicio
+
+    def exporta(self) -> str:
+        linhas = []
+        for metrica in self.registradas:
+            linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            linhas.extend(metrica.exporta())
+        return "\n".join(linhas) + "\n"
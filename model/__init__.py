@@ -1,8 +1,8 @@
-from sqlalchemy_utils import database_exists, create_database
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine, CheckConstraint, event, DateTime
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy import create_engine, event, make_url
+from contextvars import ContextVar
+from threading import Lock
 import os
-from datetime import datetime
 
 
 # importando os elementos definidos no modelo
@@ -10,35 +10,252 @@ from model.base import Base
 from model.equipamento import Equipamento
 from model.manutencao import Manutencao
 from model.tecnico import Tecnico
+from model.resumo import ResumoManutencao, reconstroi_resumo
+from model.alteracoes import Alteracao, CompactacaoPeriodica, compacta_alteracoes, horizonte_alteracoes
+from model.arquivo import ManutencaoArquivo, arquiva_manutencoes, no_arquivo
+from model.relatorios import CicloManutencao, RelatorioDiario, reconstroi_relatorios
+from model.pool import PoolObservavel, PoolLeitura, estatisticas_pool, estatisticas_leitura
+from model.sqlite import perfil_sqlite, executa_escrita, leitura_consistente
+from model.migracoes import aplica_migracoes
+from model.carga import carrega_lote, remove_lote, altera_status_lote
+from model.busca import filtra_manutencoes, estatisticas_indices
+from model.texto import expressao_texto, reconstroi_indices_texto
+from model.referencias import cache_referencias
+from model.agrupamento import EscritaAgrupada
 
 
-db_path = "database/"
-# Verifica se o diretorio não existe
-if not os.path.exists(db_path):
-   # então cria o diretorio
-   os.makedirs(db_path)
+# configuração do banco. Nada é criado na importação do pacote: o diretório,
+# o banco, a engine e as migrações são preparados no primeiro uso da engine
+# (obtem_engine ou Session()), o que mantém rápida a inicialização dos workers
+configuracao = {
+    "db_path": os.environ.get("DB_PATH", "database/"),
+    # url completa do banco; quando informada, db_path é ignorado
+    "db_url": os.environ.get("DB_URL"),
+    # consultas (GET) em um pool de conexões somente leitura e escritas em uma
+    # única conexão serializada. Só se aplica a bancos SQLite em arquivo
+    "separa_leitura": os.environ.get("DB_SPLIT_READS", "1") != "0",
+    # dimensionamento do pool de conexões (de leitura, quando separado)
+    "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+    "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+    "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+    "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 3600)),
+}
 
-# url de acesso ao banco (essa é uma url de acesso ao sqlite local)
-db_url = 'sqlite:///%s/db.sqlite3' % db_path
+_engine = None
+_engine_leitura = None
+_lock_engine = Lock()
+# funções chamadas com a engine assim que ela é criada (ex.: instrumentação)
+_ao_criar_engine = []
 
-# cria a engine de conexão com o banco
-engine = create_engine(db_url, echo=False)
 
-# Habilita os CHECK CONSTRAINTS no SQLite
-@event.listens_for(engine, "connect")
-def enable_foreign_keys(dbapi_connection, connection_record):
-    cursor = dbapi_connection.cursor()
-    cursor.execute("PRAGMA foreign_keys=ON")  # Ativa constraints como CHECK e FOREIGN KEY
-    cursor.close()
+def configura_banco(**opcoes):
+    """ Altera a configuração do banco (db_path, db_url, separa_leitura,
+        pool_size, max_overflow, pool_timeout, pool_recycle). Só tem efeito
+        antes da criação da engine.
+    """
+    desconhecidas = set(opcoes) - set(configuracao)
+    if desconhecidas:
+        raise ValueError(f"Opções de banco desconhecidas: {', '.join(sorted(desconhecidas))}")
+    if _engine is not None:
+        raise RuntimeError("A engine já foi criada; configure o banco antes do primeiro uso")
+    configuracao.update(opcoes)
 
-# Instancia um criador de seção com o banco
-Session = sessionmaker(bind=engine)
-session = Session()
 
-# cria o banco se ele não existir 
-if not database_exists(engine.url):
-    create_database(engine.url) 
+def url_banco() -> str:
+    """ Retorna a url de acesso ao banco da configuração atual: db_url ou, por
+        padrão, o sqlite local em db_path.
+    """
+    return configuracao["db_url"] or 'sqlite:///%s/db.sqlite3' % configuracao["db_path"]
 
-# cria as tabelas do banco, caso não existam
-    Base.metadata.create_all(engine)
-    
+
+def url_leitura(url):
+    """ Retorna a url somente leitura (URI com mode=ro) de um banco SQLite em
+        arquivo, ou None se o banco não for um arquivo SQLite.
+    """
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:") \
+            or url.database.startswith("file:"):
+        return None
+    return url.set(database="file:" + url.database, query={**url.query, "mode": "ro", "uri": "true"})
+
+
+def quando_criar_engine(funcao):
+    """ Registra uma função chamada com cada engine (escrita e leitura) logo
+        após a sua criação (ou imediatamente, se ela já existir).
+    """
+    if _engine is not None:
+        for engine in dict.fromkeys((_engine, _engine_leitura)):
+            funcao(engine)
+    else:
+        _ao_criar_engine.append(funcao)
+
+
+def engine_criada():
+    """ Retorna a engine, ou None se ela ainda não foi usada.
+    """
+    return _engine
+
+
+def engine_leitura_criada():
+    """ Retorna a engine das consultas, ou None se ela ainda não foi usada.
+    """
+    return _engine_leitura
+
+
+def obtem_engine():
+    """ Retorna a engine de conexão com o banco (a das escritas), criando-a no
+        primeiro uso: cria o diretório e o banco, se não existirem, e aplica as
+        migrações pendentes.
+    """
+    global _engine, _engine_leitura
+    if _engine is None:
+        with _lock_engine:
+            if _engine is None:
+                _engine, _engine_leitura = _cria_engines()
+    return _engine
+
+
+def obtem_engine_leitura():
+    """ Retorna a engine das consultas: o pool somente leitura, ou a própria
+        engine de escrita quando a leitura não é separada.
+    """
+    obtem_engine()
+    return _engine_leitura
+
+
+def _cria_engine(url, poolclass, pool_size: int, max_overflow: int, somente_leitura: bool = False):
+    # cria a engine de conexão com o banco
+    engine = create_engine(url, echo=False,
+                           poolclass=poolclass,
+                           pool_size=pool_size,
+                           max_overflow=max_overflow,
+                           pool_timeout=configuracao["pool_timeout"],
+                           pool_recycle=configuracao["pool_recycle"],
+                           pool_pre_ping=True)
+    estatisticas = poolclass.estatisticas
+
+    # Habilita os CHECK CONSTRAINTS no SQLite
+    @event.listens_for(engine, "connect")
+    def enable_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")  # Ativa constraints como CHECK e FOREIGN KEY
+        cursor.close()
+        # aplica o perfil de desempenho/concorrência (WAL, synchronous, cache, busy_timeout...)
+        perfil_sqlite.aplica(dbapi_connection, somente_leitura)
+        estatisticas.registra_conexao()
+
+    @event.listens_for(engine, "checkout")
+    def registra_checkout(dbapi_connection, connection_record, connection_proxy):
+        estatisticas.registra_checkout()
+
+    @event.listens_for(engine, "checkin")
+    def registra_checkin(dbapi_connection, connection_record):
+        estatisticas.registra_checkin()
+
+    return engine
+
+
+def _cria_engines():
+    from sqlalchemy_utils import database_exists, create_database
+
+    url = make_url(url_banco())
+    leitura = url_leitura(url) if configuracao["separa_leitura"] else None
+
+    # Verifica se o diretorio do banco sqlite não existe
+    if url.get_backend_name() == "sqlite" and url.database and not url.database.startswith(("file:", ":memory:")):
+        diretorio = os.path.dirname(url.database)
+        if diretorio and not os.path.exists(diretorio):
+            # então cria o diretorio
+            os.makedirs(diretorio)
+
+    if leitura is None:
+        engine = _cria_engine(url, PoolObservavel, configuracao["pool_size"], configuracao["max_overflow"])
+    else:
+        # uma única conexão de escrita: as escritas aguardam a sua vez no pool,
+        # em ordem de chegada, em vez de disputar o lock do banco
+        engine = _cria_engine(url, PoolObservavel, 1, 0)
+
+    # cria o banco se ele não existir
+    if not database_exists(engine.url):
+        create_database(engine.url)
+
+    # cria as tabelas do banco, caso não existam, e atualiza o schema de um
+    # banco já existente aplicando as migrações pendentes
+    aplica_migracoes(engine)
+
+    # o pool de leitura é criado depois das migrações, com o banco já existente
+    engine_leitura = engine if leitura is None else \
+        _cria_engine(leitura, PoolLeitura, configuracao["pool_size"], configuracao["max_overflow"],
+                     somente_leitura=True)
+
+    _sessoes.configure(bind=engine)
+    _sessoes_leitura.configure(bind=engine_leitura)
+    for funcao in _ao_criar_engine:
+        for criada in dict.fromkeys((engine, engine_leitura)):
+            funcao(criada)
+    return engine, engine_leitura
+
+
+def __getattr__(nome):
+    # "from model import engine" continua funcionando, criando a engine no acesso
+    if nome == "engine":
+        return obtem_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+
+# indica se as sessões criadas no contexto atual são somente de consulta
+_somente_leitura = ContextVar("somente_leitura", default=False)
+
+
+def roteia_sessao(somente_leitura: bool):
+    """ Define se a próxima sessão criada no contexto atual (ex.: a da
+        requisição) usa o pool somente leitura ou a conexão de escrita.
+
+    Retorna o token a ser passado para restaura_roteamento ao fim do contexto.
+    """
+    return _somente_leitura.set(somente_leitura)
+
+
+def restaura_roteamento(token):
+    """ Desfaz o roteamento definido por roteia_sessao, voltando ao anterior.
+    """
+    _somente_leitura.reset(token)
+
+
+def _nova_sessao():
+    obtem_engine()
+    return _sessoes_leitura() if _somente_leitura.get() else _sessoes()
+
+
+# Instancia um criador de seção com o banco. A sessão tem escopo de requisição:
+# é criada no primeiro uso de Session() e descartada no teardown da aplicação
+_sessoes = sessionmaker()
+_sessoes_leitura = sessionmaker()
+Session = scoped_session(_nova_sessao)
+
+
+def _sessao_escrita_agrupada():
+    # os registros inseridos são entregues às requisições já desanexados da
+    # sessão, por isso não expiram no commit
+    obtem_engine()
+    return _sessoes(expire_on_commit=False)
+
+
+escrita_agrupada = EscritaAgrupada(_sessao_escrita_agrupada)
+
+# compactação do log de alterações em segundo plano, iniciada com o worker
+compactacao_alteracoes = CompactacaoPeriodica(obtem_engine)
+
+
+def _descarta_conexoes_herdadas():
+    # com gunicorn --preload a engine pode ter sido criada no processo mestre:
+    # o worker não reaproveita as conexões herdadas (close=False mantém as do
+    # mestre abertas para ele) e abre as suas no primeiro uso
+    for engine in dict.fromkeys((_engine, _engine_leitura)):
+        if engine is not None:
+            engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_descarta_conexoes_herdadas)
+os.register_at_fork(after_in_child=escrita_agrupada.reinicia)
+os.register_at_fork(after_in_child=compactacao_alteracoes.reinicia)
@@ -0,0 +1,184 @@
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from threading import Event, Lock, Thread
+import logging
+import os
+import queue
+import time
+
+from model.sqlite import executa_escrita
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Pendente:
+    """ Inserção aguardando a transação do grupo: o resultado é o registro
+        inserido ou a exceção que a requisição deve tratar.
+    """
+
+    def __init__(self, modelo, valores: dict):
+        self.modelo = modelo
+        self.valores = valores
+        self.registro = None
+        self.erro = None
+        self.concluida = Event()
+        self._reservada = Lock()
+
+    def reserva(self) -> bool:
+        """ Reserva a inserção para quem a efetivará: a thread de escrita, ao
+            montar o grupo, ou a requisição, ao desistir de esperar. Só a
+            primeira reserva tem sucesso.
+        """
+        return self._reservada.acquire(blocking=False)
+
+
+class EscritaAgrupada:
+    """ Agrupa as inserções simultâneas de várias requisições (group commit).
+
+    Cada requisição entrega o seu registro e aguarda. Uma única thread de
+    escrita reúne as inserções que chegam dentro da janela (ou até completar o
+    tamanho máximo do grupo) e as efetiva em uma só transação, de modo que o
+    custo do commit (fsync) é dividido entre elas. As inserções de um mesmo
+    modelo são feitas em um único INSERT; havendo conflito, cada registro é
+    inserido em seu próprio savepoint, e cada requisição recebe o seu próprio
+    resultado: o registro inserido ou o IntegrityError do conflito.
+
+    A espera da requisição pela entrada do registro em um grupo é limitada: se
+    a thread de escrita não chegar a ele a tempo, a requisição o retira do
+    grupo e faz a inserção por conta própria. Já reservado por um grupo, o
+    registro tem o resultado da transação do grupo, que a requisição aguarda.
+    """
+
+    def __init__(self, fabrica_sessao):
+        self._fabrica_sessao = fabrica_sessao
+        self.ativa = os.environ.get("GROUP_COMMIT", "0") != "0"
+        # espera máxima por outras inserções depois da primeira do grupo
+        self.janela = float(os.environ.get("GROUP_COMMIT_WINDOW_MS", 2)) / 1000
+        self.tamanho = max(int(os.environ.get("GROUP_COMMIT_MAX_BATCH", 64)), 1)
+        # espera máxima da requisição pela transação do grupo
+        self.espera = float(os.environ.get("GROUP_COMMIT_TIMEOUT_MS", 5000)) / 1000
+        self.reinicia()
+
+    def configura(self, ativa: bool = None, janela_ms: float = None, tamanho: int = None,
+                  espera_ms: float = None):
+        """ Altera as opções da escrita agrupada (ativa, janela em ms, tamanho
+            máximo do grupo e espera máxima da requisição em ms).
+        """
+        if ativa is not None:
+            self.ativa = bool(ativa)
+        if janela_ms is not None:
+            self.janela = float(janela_ms) / 1000
+        if tamanho is not None:
+            self.tamanho = max(int(tamanho), 1)
+        if espera_ms is not None:
+            self.espera = float(espera_ms) / 1000
+
+    def reinicia(self):
+        """ Descarta a fila e a thread de escrita (a thread do processo pai não
+            existe no processo filho após um fork).
+        """
+        self._lock = Lock()
+        self._fila = queue.SimpleQueue()
+        self._thread = None
+        self.grupos = 0
+        self.registros = 0
+
+    def insere(self, objeto):
+        """ Insere o registro (objeto transiente do modelo) na próxima transação
+            do grupo e retorna o registro inserido, desanexado da sessão.
+            Levanta a exceção da inserção (ex.: IntegrityError) em caso de erro.
+
+        Retorna None se a espera se esgotar antes de o registro entrar em um
+        grupo: ele é retirado da fila e a inserção fica a cargo de quem chamou.
+        Se o grupo do registro já estiver em andamento, aguarda o fim da sua
+        transação (limitada pelo busy_timeout e pelas novas tentativas de
+        executa_escrita), pois a inserção pode ser efetivada.
+        """
+        valores = {chave: valor for chave, valor in vars(objeto).items() if not chave.startswith("_")}
+        pendente = _Pendente(type(objeto), valores)
+        self._inicia()
+        self._fila.put(pendente)
+        if not pendente.concluida.wait(self.espera):
+            if pendente.reserva():
+                return None
+            pendente.concluida.wait()
+        if pendente.erro is not None:
+            raise pendente.erro
+        return pendente.registro
+
+    def _inicia(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = Thread(target=self._executa, name="escrita-agrupada", daemon=True)
+                    self._thread.start()
+
+    def _proximo_grupo(self):
+        grupo = [self._fila.get()]
+        limite = time.perf_counter() + self.janela
+        while len(grupo) < self.tamanho:
+            restante = limite - time.perf_counter()
+            try:
+                grupo.append(self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return grupo
+
+    def _executa(self):
+        while True:
+            # as inserções já retiradas pelas requisições ficam de fora
+            grupo = [pendente for pendente in self._proximo_grupo() if pendente.reserva()]
+            if not grupo:
+                continue
+            try:
+                self._efetiva(grupo)
+            except Exception as e:
+                logger.error("Erro na escrita agrupada de %s registros: %s", len(grupo), e)
+                for pendente in grupo:
+                    pendente.erro = e
+            for pendente in grupo:
+                pendente.concluida.set()
+
+    def _efetiva(self, grupo):
+        session = self._fabrica_sessao()
+        try:
+            def processa(s):
+                for pendente in grupo:
+                    pendente.registro, pendente.erro = None, None
+                modelos = {}
+                for pendente in grupo:
+                    modelos.setdefault(pendente.modelo, []).append(pendente)
+                for modelo, pendentes in modelos.items():
+                    if not self._insere(s, modelo, pendentes) and len(pendentes) > 1:
+                        # conflito: um savepoint por registro para isolar os conflitos
+                        for pendente in pendentes:
+                            self._insere(s, modelo, [pendente])
+
+            executa_escrita(session, processa)
+            session.expunge_all()
+            self.grupos += 1
+            self.registros += len(grupo)
+        finally:
+            session.close()
+
+    def _insere(self, session, modelo, pendentes) -> bool:
+        """ Insere os registros em um único INSERT dentro de um savepoint.
+            Retorna False em caso de conflito (registrado no pendente, se único).
+        """
+        try:
+            with session.begin_nested():
+                registros = session.scalars(
+                    insert(modelo).returning(modelo, sort_by_parameter_order=True),
+                    [pendente.valores for pendente in pendentes]).all()
+        except IntegrityError as e:
+            if len(pendentes) == 1:
+                pendentes[0].erro = e
+            return False
+        for pendente, registro in zip(pendentes, registros):
+            pendente.registro = registro
+        return True
+
+    def resumo(self) -> dict:
+        return {"ativa": self.ativa, "janela_ms": self.janela * 1000, "tamanho": self.tamanho,
+                "espera_ms": self.espera * 1000, "grupos": self.grupos, "registros": self.registros}
@@ -0,0 +1,189 @@
+from sqlalchemy import Column, String, Integer, DateTime, Index, CheckConstraint
+from threading import Event, Lock, Thread
+import logging
+import os
+
+from  model import Base
+
+
+class Alteracao(Base):
+    __tablename__ = 'alteracoes'
+
+    seq = Column(Integer, primary_key=True, autoincrement=True) #nunca reaproveitado (AUTOINCREMENT)
+    tabela = Column(String(40), nullable=False)
+    chave = Column(String(140), nullable=False) #chave primária do registro alterado
+    operacao = Column(String(6), nullable=False) #insert, update ou delete
+    momento = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_alteracoes_tabela_chave", "tabela", "chave", "seq"),
+        Index("ix_alteracoes_tabela_seq", "tabela", "seq"), #última alteração de cada tabela
+        {"sqlite_autoincrement": True},
+    )
+
+
+class CompactacaoAlteracoes(Base):
+    __tablename__ = 'compactacao_alteracoes'
+
+    #linha única com o maior seq cujas remoções já foram descartadas do log:
+    #clientes sincronizados antes dele precisam recarregar tudo
+    id = Column(Integer, primary_key=True)
+    horizonte = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        CheckConstraint("id = 1", name="check_linha_unica"),
+    )
+
+
+# tabelas registradas no log e a coluna da chave primária de cada uma
+TABELAS = {
+    "equipamentos": "pk_nome",
+    "tecnicos": "pk_matricula",
+    "manutencao": "pk_id",
+}
+
+logger = logging.getLogger(__name__)
+
+# dias em que as remoções ficam no log antes de serem descartadas pela compactação
+retencao_remocoes = int(os.environ.get("CHANGES_RETENTION_DAYS", 30))
+
+_MOMENTO = "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+def _registra(tabela: str, chave: str, operacao: str, condicao: str = "") -> str:
+    return (f"INSERT INTO alteracoes (tabela, chave, operacao, momento) "
+            f"SELECT '{tabela}', CAST({chave} AS TEXT), '{operacao}', {_MOMENTO}{condicao};\n")
+
+
+def _triggers(tabela: str, pk: str):
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS tr_alteracoes_{tabela}_insert AFTER INSERT ON {tabela}
+    BEGIN
+    {_registra(tabela, "NEW." + pk, "insert")}END""",
+        f"""CREATE TRIGGER IF NOT EXISTS tr_alteracoes_{tabela}_update AFTER UPDATE ON {tabela}
+    BEGIN
+    {_registra(tabela, "OLD." + pk, "delete", f" WHERE OLD.{pk} IS NOT NEW.{pk}")}"""
+        f"""{_registra(tabela, "NEW." + pk, "update")}END""",
+        f"""CREATE TRIGGER IF NOT EXISTS tr_alteracoes_{tabela}_delete AFTER DELETE ON {tabela}
+    BEGIN
+    {_registra(tabela, "OLD." + pk, "delete")}END""",
+    ]
+
+
+TRIGGERS = [trigger for tabela, pk in TABELAS.items() for trigger in _triggers(tabela, pk)]
+
+
+def cria_triggers_alteracoes(conn):
+    """ Cria os triggers que registram no log cada inserção, alteração e
+        remoção de equipamentos, técnicos e manutenções.
+    """
+    for trigger in TRIGGERS:
+        conn.exec_driver_sql(trigger)
+
+
+def registra_existentes(conn):
+    """ Registra como inserção os registros que ainda não constam do log, para
+        que a sincronização a partir do zero os inclua.
+    """
+    for tabela, pk in TABELAS.items():
+        conn.exec_driver_sql(
+            f"INSERT INTO alteracoes (tabela, chave, operacao, momento) "
+            f"SELECT '{tabela}', CAST({pk} AS TEXT), 'insert', {_MOMENTO} FROM {tabela} "
+            f"WHERE CAST({pk} AS TEXT) NOT IN (SELECT chave FROM alteracoes WHERE tabela = '{tabela}')")
+
+
+def horizonte_alteracoes(conn) -> int:
+    """ Retorna o horizonte da compactação: o maior seq cujas remoções já
+        foram descartadas do log (0 se nenhuma foi).
+    """
+    return conn.exec_driver_sql("SELECT COALESCE(MAX(horizonte), 0) FROM compactacao_alteracoes").scalar()
+
+
+def compacta_alteracoes(conn, dias: int = None) -> int:
+    """ Compacta o log de alterações, mantendo seu tamanho proporcional à
+        quantidade de registros:
+
+        - descarta as entradas substituídas por uma entrada posterior do mesmo
+          registro (o cliente só precisa do estado mais recente);
+        - descarta as remoções mais antigas que dias (padrão:
+          retencao_remocoes) e avança o horizonte até elas.
+
+    Retorna a quantidade de entradas descartadas.
+    """
+    dias = retencao_remocoes if dias is None else dias
+    descartadas = conn.exec_driver_sql(
+        "DELETE FROM alteracoes WHERE seq NOT IN "
+        "(SELECT MAX(seq) FROM alteracoes GROUP BY tabela, chave)").rowcount
+    horizonte = conn.exec_driver_sql(
+        "SELECT MAX(seq) FROM alteracoes WHERE operacao = 'delete' "
+        "AND momento < strftime('%Y-%m-%d %H:%M:%f000', 'now', ?)", (f"-{dias} days",)).scalar()
+    if horizonte:
+        descartadas += conn.exec_driver_sql(
+            "DELETE FROM alteracoes WHERE operacao = 'delete' AND seq <= ?", (horizonte,)).rowcount
+        conn.exec_driver_sql(
+            "INSERT INTO compactacao_alteracoes (id, horizonte) VALUES (1, ?) "
+            "ON CONFLICT (id) DO UPDATE SET horizonte = MAX(horizonte, excluded.horizonte)", (horizonte,))
+    return descartadas
+
+
+class CompactacaoPeriodica:
+    """ Compacta o log de alterações em segundo plano, a cada intervalo
+        segundos, em uma thread própria do worker: a compactação reescreve o
+        log inteiro e não deve atrasar as requisições de escrita.
+    """
+
+    def __init__(self, obtem_engine):
+        self._obtem_engine = obtem_engine
+        # segundos entre compactações (0 desativa; fica a cargo do comando do flask)
+        self.intervalo = float(os.environ.get("CHANGES_COMPACTION_INTERVAL", 3600))
+        self.reinicia()
+
+    def configura(self, intervalo: float = None):
+        """ Altera o intervalo, em segundos, entre as compactações.
+        """
+        if intervalo is not None:
+            self.intervalo = float(intervalo)
+
+    def reinicia(self):
+        """ Descarta a thread de compactação (a thread do processo pai não
+            existe no processo filho após um fork).
+        """
+        self._lock = Lock()
+        self._parada = Event()
+        self._thread = None
+
+    def inicia(self):
+        """ Inicia a thread de compactação, se ativa e ainda não iniciada.
+        """
+        if self.intervalo > 0 and self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._parada.clear()
+                    self._thread = Thread(target=self._executa, name="compactacao-alteracoes", daemon=True)
+                    self._thread.start()
+
+    def para(self):
+        """ Encerra a thread de compactação.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._parada.set()
+            thread.join()
+
+    def _executa(self):
+        while not self._parada.wait(self.intervalo):
+            self.compacta()
+
+    def compacta(self) -> int:
+        """ Compacta o log em uma transação própria e retorna a quantidade de
+            entradas descartadas (0 em caso de erro, que é apenas registrado).
+        """
+        try:
+            with self._obtem_engine().begin() as conn:
+                descartadas = compacta_alteracoes(conn)
+        except Exception as e:
+            logger.warning("Não foi possível compactar o log de alterações: %s", e)
+            return 0
+        logger.debug("Log de alterações compactado: %s entradas descartadas", descartadas)
+        return descartadas
@@ -0,0 +1,125 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index, Table, delete, insert, inspect, \
+                       literal, select
+from sqlalchemy.sql.visitors import replacement_traverse
+from datetime import datetime, timedelta
+import os
+import time
+
+from  model import Base
+from model.manutencao import Manutencao
+from model.resumo import _soma
+from model.sqlite import executa_escrita
+
+
+class ManutencaoArquivo(Base):
+    __tablename__ = 'manutencao_arquivo'
+
+    #mesmas colunas de manutencao: as consultas com include_archived são as
+    #mesmas da tabela ativa, apenas direcionadas a esta tabela (no_arquivo)
+    id = Column("pk_id", Integer, primary_key=True, autoincrement=False)
+    nome_equipamento = Column(String(140), ForeignKey("equipamentos.pk_nome"))
+    matricula_tecnico = Column(String(140), ForeignKey("tecnicos.pk_matricula"))
+    status = Column(String(140))
+    tipo_manutencao = Column(String(140))
+    comentario = Column(String(140), default="")
+    previsao_conclusao = Column(DateTime)
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
+    arquivada_em = Column(DateTime, nullable=False)
+
+    #as chaves estrangeiras são verificadas ao remover equipamentos e técnicos
+    __table_args__ = (
+        Index("ix_manutencao_arquivo_equipamento", "nome_equipamento"),
+        Index("ix_manutencao_arquivo_tecnico", "matricula_tecnico"),
+        Index("ix_manutencao_arquivo_previsao", "previsao_conclusao"),
+    )
+
+
+# manutenções concluídas há mais de dias_arquivamento (pela previsão de
+# conclusão) são movidas para manutencao_arquivo em lotes de tamanho_lote_arquivo,
+# com uma pausa entre as transações para não bloquear as demais escritas
+STATUS_ARQUIVAVEL = "Pronto"
+dias_arquivamento = int(os.environ.get("ARCHIVE_AFTER_DAYS", 180))
+tamanho_lote_arquivo = int(os.environ.get("ARCHIVE_BATCH_SIZE", 500))
+pausa_arquivamento = float(os.environ.get("ARCHIVE_PAUSE_MS", 50)) / 1000
+
+# os contadores de resumo_manutencao incluem as manutenções arquivadas: mover
+# um registro entre as tabelas não altera o resumo
+TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS tr_resumo_arquivo_insert AFTER INSERT ON manutencao_arquivo
+    BEGIN
+    {_soma("NEW", "1")}END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tr_resumo_arquivo_delete AFTER DELETE ON manutencao_arquivo
+    BEGIN
+    {_soma("OLD", "-1")}END""",
+]
+
+_COLUNAS = [coluna.name for coluna in Manutencao.__table__.c]
+
+
+def cria_triggers_arquivo(conn):
+    """ Cria os triggers que contam as manutenções arquivadas no resumo.
+    """
+    for trigger in TRIGGERS:
+        conn.exec_driver_sql(trigger)
+
+
+def arquiva_manutencoes(session, dias: int = None, lote: int = None, pausa: float = None) -> int:
+    """ Move para manutencao_arquivo as manutenções com status Pronto e
+        previsão de conclusão anterior a dias (padrão: dias_arquivamento) atrás.
+
+    Cada lote de até lote registros é copiado e removido da tabela ativa em uma
+    transação curta, seguida de uma pausa (em segundos), de modo que as demais
+    escritas não aguardam o arquivamento inteiro. Os ids de manutencao não são
+    reaproveitados (AUTOINCREMENT), por isso um id arquivado continua único.
+
+    Retorna a quantidade de manutenções arquivadas.
+    """
+    dias = dias_arquivamento if dias is None else dias
+    lote = tamanho_lote_arquivo if lote is None else lote
+    pausa = pausa_arquivamento if pausa is None else pausa
+    limite = datetime.now() - timedelta(days=dias)
+    tabela, arquivo = Manutencao.__table__, ManutencaoArquivo.__table__
+    candidatas = (select(tabela.c.pk_id)
+                  .where(tabela.c.status == STATUS_ARQUIVAVEL,
+                         tabela.c.previsao_conclusao < limite)
+                  .order_by(tabela.c.previsao_conclusao)  # ordem do índice (status, previsao_conclusao)
+                  .limit(lote))
+
+    def processa(s):
+        ids = s.scalars(candidatas).all()
+        if ids:
+            s.execute(insert(arquivo).from_select(
+                _COLUNAS + ["arquivada_em"],
+                select(*[tabela.c[nome] for nome in _COLUNAS], literal(datetime.now(), DateTime))
+                .where(tabela.c.pk_id.in_(ids))))
+            s.execute(delete(tabela).where(tabela.c.pk_id.in_(ids)))
+        return len(ids)
+
+    total = 0
+    while True:
+        arquivadas = executa_escrita(session, processa)
+        total += arquivadas
+        if arquivadas < lote:
+            return total
+        time.sleep(pausa)
+
+
+def no_arquivo(comando):
+    """ Retorna uma cópia do comando (select) que consulta manutencao_arquivo
+        no lugar de manutencao, com as mesmas colunas, filtros e ordenação.
+    """
+    tabela, arquivo = Manutencao.__table__, ManutencaoArquivo.__table__
+    # colunas mapeadas (e não as da tabela), que mantêm os nomes dos atributos
+    # (ex.: id em vez de pk_id) nas linhas do resultado
+    colunas = {propriedade.columns[0].name: getattr(ManutencaoArquivo, propriedade.key).__clause_element__()
+               for propriedade in inspect(ManutencaoArquivo).column_attrs}
+
+    def substitui(elemento):
+        if isinstance(elemento, Table) and elemento.name == tabela.name:
+            return arquivo
+        if isinstance(elemento, Column) and getattr(elemento, "table", None) is not None \
+                and elemento.table.name == tabela.name:
+            return colunas[elemento.name]
+        return None
+
+    return replacement_traverse(comando, {}, substitui)
@@ -0,0 +1,26 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from model.sqlite import perfil_sqlite
+
+
+def cria_engine_assincrona(engine):
+    """ Cria a engine assíncrona (driver aiosqlite) sobre o mesmo banco da
+        engine síncrona, com os mesmos PRAGMAs aplicados a cada conexão. Com a
+        engine de leitura as conexões também são somente leitura (mode=ro).
+
+    Retorna a engine e o criador de sessões assíncronas. As tabelas e as
+    migrações continuam a cargo da engine síncrona.
+    """
+    url = engine.url.set(drivername="sqlite+aiosqlite")
+    somente_leitura = url.query.get("mode") == "ro"
+    engine_assincrona = create_async_engine(url, echo=False, pool_pre_ping=True)
+
+    @event.listens_for(engine_assincrona.sync_engine, "connect")
+    def configura_conexao(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+        perfil_sqlite.aplica(dbapi_connection, somente_leitura)
+
+    return engine_assincrona, async_sessionmaker(engine_assincrona, expire_on_commit=False)
@@ -0,0 +1,156 @@
+from sqlalchemy import select, text
+from sqlalchemy.sql.expression import UnaryExpression
+from sqlalchemy.sql.operators import custom_op
+from threading import Lock
+
+from model.equipamento import Equipamento
+from model.manutencao import Manutencao
+
+
+# índices da tabela manutencao considerados pelo planejador da busca, com as
+# colunas na ordem em que aparecem no índice
+INDICES_BUSCA = {
+    "ix_manutencao_status": ("status",),
+    "ix_manutencao_status_previsao": ("status", "previsao_conclusao"),
+    "ix_manutencao_equipamento_status": ("nome_equipamento", "status"),
+    "ix_manutencao_tecnico_status": ("matricula_tecnico", "status"),
+    "ix_manutencao_tipo_status": ("tipo_manutencao", "status"),
+    "ix_manutencao_previsao": ("previsao_conclusao",),
+}
+
+# fração estimada das linhas que sobra após um filtro de intervalo de datas
+FATOR_INTERVALO = 0.25
+
+
+class EstatisticasIndices:
+    """ Lê de sqlite_stat1 (gerada pelo ANALYZE) a quantidade média de linhas
+        por valor de cada prefixo dos índices, usada para estimar a
+        seletividade dos filtros. As estatísticas são lidas uma vez por processo.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._stats = None
+
+    def carrega(self, session):
+        with self._lock:
+            if self._stats is None:
+                self._stats = {}
+                existe = session.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")).first()
+                if existe:
+                    linhas = session.execute(text(
+                        "SELECT idx, stat FROM sqlite_stat1 WHERE tbl = 'manutencao'")).all()
+                    for indice, stat in linhas:
+                        if indice:
+                            self._stats[indice] = [int(valor) for valor in stat.split() if valor.isdigit()]
+            return self._stats
+
+    def descarta(self):
+        with self._lock:
+            self._stats = None
+
+
+estatisticas_indices = EstatisticasIndices()
+
+
+def escolhe_indice(igualdades: set, intervalo: str, ordem: str, stats: dict):
+    """ Escolhe o índice que deve conduzir a busca.
+
+    Arguments:
+        igualdades: colunas filtradas por igualdade (ou IN).
+        intervalo: coluna filtrada por intervalo, se houver.
+        ordem: coluna de ordenação.
+        stats: estatísticas de EstatisticasIndices.
+
+    Prefere o índice cujo prefixo cobre mais colunas filtradas e, entre esses,
+    o de menor quantidade estimada de linhas. Retorna None quando nenhum
+    índice ajuda (busca sem filtros ordenada por id, servida pela chave primária).
+    """
+    total = max((valores[0] for valores in stats.values() if valores), default=1000000)
+    melhor, menor_custo = None, None
+    for indice, colunas in INDICES_BUSCA.items():
+        prefixo = 0
+        while prefixo < len(colunas) and colunas[prefixo] in igualdades:
+            prefixo += 1
+        proxima = colunas[prefixo] if prefixo < len(colunas) else None
+        if prefixo:
+            valores = stats.get(indice, [])
+            # sem estatísticas, supõe que cada coluna reduz as linhas em 10x
+            custo = valores[prefixo] if len(valores) > prefixo else total / 10 ** prefixo
+            if proxima and proxima == intervalo:
+                custo *= FATOR_INTERVALO
+        elif proxima == intervalo:
+            custo = total * FATOR_INTERVALO
+        elif proxima == ordem and not igualdades:
+            # evita ordenar a tabela inteira quando não há filtros
+            custo = total
+        else:
+            continue
+        # em caso de empate prefere o índice com mais colunas
+        if menor_custo is None or custo < menor_custo or \
+                (custo == menor_custo and len(colunas) > len(INDICES_BUSCA[melhor])):
+            melhor, menor_custo = indice, custo
+    return melhor
+
+
+def coluna_busca(coluna, indexavel: bool):
+    """ Retorna a coluna para uso no filtro. Quando o filtro não deve usar
+        índice, aplica o operador unário + do SQLite, que impede o uso dos
+        índices da coluna e direciona o planejador para o índice escolhido.
+        A expressão envolve a própria coluna, de modo que no_arquivo também a
+        direciona a manutencao_arquivo.
+    """
+    if indexavel:
+        return coluna
+    return UnaryExpression(coluna, operator=custom_op("+"), type_=coluna.type)
+
+
+def filtra_manutencoes(consulta, session, nome_equipamento=None, matricula_tecnico=None,
+                       status=None, tipo_manutencao=None, setor=None,
+                       previsao_de=None, previsao_ate=None, ordem="id"):
+    """ Aplica os filtros da busca de manutenções à consulta, conduzindo-a pelo
+        índice escolhido em escolhe_indice.
+
+    Retorna a consulta filtrada e o nome do índice escolhido (ou None).
+    """
+    colunas = {
+        "nome_equipamento": Manutencao.__table__.c.nome_equipamento,
+        "matricula_tecnico": Manutencao.__table__.c.matricula_tecnico,
+        "status": Manutencao.__table__.c.status,
+        "tipo_manutencao": Manutencao.__table__.c.tipo_manutencao,
+        "previsao_conclusao": Manutencao.__table__.c.previsao_conclusao,
+    }
+    igualdades = set()
+    if nome_equipamento or setor:
+        igualdades.add("nome_equipamento")
+    if matricula_tecnico:
+        igualdades.add("matricula_tecnico")
+    if status:
+        igualdades.add("status")
+    if tipo_manutencao:
+        igualdades.add("tipo_manutencao")
+    intervalo = "previsao_conclusao" if previsao_de or previsao_ate else None
+
+    indice = escolhe_indice(igualdades, intervalo, ordem, estatisticas_indices.carrega(session))
+    indexaveis = set(INDICES_BUSCA.get(indice, ()))
+
+    def coluna(nome):
+        return coluna_busca(colunas[nome], nome in indexaveis)
+
+    if nome_equipamento:
+        consulta = consulta.where(coluna("nome_equipamento") == nome_equipamento)
+    if setor:
+        consulta = consulta.where(coluna("nome_equipamento").in_(
+            select(Equipamento.nome).where(Equipamento.setor == setor)))
+    if matricula_tecnico:
+        consulta = consulta.where(coluna("matricula_tecnico") == matricula_tecnico)
+    if status:
+        consulta = consulta.where(coluna("status").in_(status))
+    if tipo_manutencao:
+        consulta = consulta.where(coluna("tipo_manutencao") == tipo_manutencao)
+    if previsao_de:
+        consulta = consulta.where(coluna("previsao_conclusao") >= previsao_de)
+    if previsao_ate:
+        consulta = consulta.where(coluna("previsao_conclusao") <= previsao_ate)
+    return consulta, indice
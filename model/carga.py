@@ -0,0 +1,212 @@
+from sqlalchemy import case, delete, exists, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from itertools import islice
+import os
+
+from model.manutencao import Manutencao
+from model.sqlite import executa_escrita
+
+
+# quantidade de registros inseridos por transação nas cargas em lote
+tamanho_lote = int(os.environ.get("BULK_CHUNK_SIZE", 500))
+
+
+def _lotes(iteravel, tamanho):
+    iterador = iter(iteravel)
+    while lote := list(islice(iterador, tamanho)):
+        yield lote
+
+
+def _existentes(session, coluna, valores):
+    """ Retorna o subconjunto dos valores que já existem na coluna informada.
+    """
+    if not valores:
+        return set()
+    return set(session.scalars(select(coluna).where(coluna.in_(valores))))
+
+
+def carrega_lote(session, modelo, registros, chave=None, referencias=()):
+    """ Insere registros em lote, em transações de até tamanho_lote linhas,
+        usando um único INSERT executemany por transação.
+
+    Arguments:
+        modelo: classe do modelo cuja tabela receberá os registros.
+        registros: iterável de (linha, valores, erro) gerado por valida_registros.
+        chave: atributo único do modelo; registros repetidos na base ou na
+            própria carga são rejeitados como duplicados.
+        referencias: pares (atributo, coluna referenciada) verificados antes da
+            inserção; registros com referência inexistente são rejeitados.
+
+    Retorna a lista de resultados por linha, na ordem recebida, e a
+    interrupção da carga: None ou o par (linha, exceção) quando a leitura do
+    corpo ou a gravação de um lote falha, sendo linha a primeira linha não
+    gravada. Erros em uma linha não interrompem a carga das demais; a
+    interrupção encerra a carga, mas os lotes anteriores continuam efetivados e
+    os seus resultados são retornados.
+    """
+    resultados = []
+    vistos = set()
+    coluna_chave = getattr(modelo, chave) if chave else None
+
+    def interrupcao(e):
+        return (resultados[-1]["linha"] + 1 if resultados else 1), e
+
+    lotes = _lotes(registros, tamanho_lote)
+    while True:
+        try:
+            lote = next(lotes, None)
+        except Exception as e:
+            return resultados, interrupcao(e)
+        if lote is None:
+            return resultados, None
+
+        def processa(s):
+            resultado_lote = {}
+            candidatos = []
+            no_lote = set()
+            validos = [(n, v) for n, v, erro in lote if erro is None]
+            if coluna_chave is not None:
+                existentes = _existentes(s, coluna_chave, {v[chave] for n, v in validos})
+            faltantes = {}
+            for atributo, coluna in referencias:
+                valores = {v[atributo] for n, v in validos}
+                faltantes[atributo] = valores - _existentes(s, coluna, valores)
+
+            for numero, valores, erro in lote:
+                if erro is not None:
+                    resultado_lote[numero] = {"linha": numero, "status": "invalido", "mesage": erro}
+                    continue
+                if coluna_chave is not None:
+                    if valores[chave] in existentes or valores[chave] in vistos \
+                            or valores[chave] in no_lote:
+                        resultado_lote[numero] = {"linha": numero, "status": "duplicado",
+                                                  "chave": valores[chave],
+                                                  "mesage": "Registro de mesma chave já salvo na base"}
+                        continue
+                    no_lote.add(valores[chave])
+                invalidas = [a for a, c in referencias if valores[a] in faltantes[a]]
+                if invalidas:
+                    resultado_lote[numero] = {"linha": numero, "status": "referencia_invalida",
+                                              "mesage": f"Referência não encontrada: {', '.join(invalidas)}"}
+                    continue
+                candidatos.append((numero, valores))
+
+            chaves = _insere(s, modelo, [v for n, v in candidatos])
+            if chaves is None:
+                # conflito concorrente: insere linha a linha para isolar os conflitos
+                chaves = [_insere_linha(s, modelo, v) for n, v in candidatos]
+            for (numero, valores), valor_chave in zip(candidatos, chaves):
+                if valor_chave is None:
+                    resultado_lote[numero] = {"linha": numero, "status": "conflito",
+                                              "mesage": "Conflito de integridade ao inserir o registro"}
+                else:
+                    resultado_lote[numero] = {"linha": numero, "status": "inserido", "chave": valor_chave}
+            return [resultado_lote[numero] for numero, valores, erro in lote]
+
+        try:
+            resultado_lote = executa_escrita(session, processa)
+        except Exception as e:
+            # o lote não foi efetivado
+            return resultados, interrupcao(e)
+        if coluna_chave is not None:
+            vistos.update(r["chave"] for r in resultado_lote if r["status"] == "inserido")
+        resultados.extend(resultado_lote)
+
+
+def _insere(session, modelo, linhas):
+    """ Insere as linhas em um único executemany dentro de um savepoint,
+        retornando as chaves primárias geradas ou None em caso de conflito.
+    """
+    if not linhas:
+        return []
+    coluna_pk = modelo.__mapper__.primary_key[0]
+    try:
+        with session.begin_nested():
+            return list(session.scalars(
+                insert(modelo).returning(coluna_pk, sort_by_parameter_order=True), linhas))
+    except IntegrityError:
+        return None
+
+
+def _insere_linha(session, modelo, linha):
+    chaves = _insere(session, modelo, [linha])
+    return chaves[0] if chaves else None
+
+
+def remove_lote(session, modelo, chaves, vinculos=()):
+    """ Remove em uma única transação os registros das chaves informadas,
+        usando um DELETE por lote de até tamanho_lote chaves.
+
+    Arguments:
+        modelo: classe do modelo cujos registros serão removidos.
+        chaves: valores da chave primária dos registros a remover.
+        vinculos: colunas de outras tabelas que referenciam a chave primária;
+            registros ainda referenciados não são removidos.
+
+    Retorna as chaves removidas, as inexistentes e as bloqueadas por vínculo.
+    """
+    coluna_pk = modelo.__mapper__.primary_key[0]
+    chaves = list(dict.fromkeys(chaves))
+
+    def processa(s):
+        removidas = set()
+        bloqueadas = set()
+        for lote in _lotes(chaves, tamanho_lote):
+            comando = delete(modelo).where(coluna_pk.in_(lote))
+            for coluna in vinculos:
+                comando = comando.where(~exists().where(coluna == coluna_pk))
+            removidas.update(s.scalars(comando.returning(coluna_pk),
+                                       execution_options={"synchronize_session": False}))
+            # as chaves que continuam na base depois do DELETE estão vinculadas
+            bloqueadas.update(_existentes(s, coluna_pk, [c for c in lote if c not in removidas]))
+        return {"removidos": [c for c in chaves if c in removidas],
+                "inexistentes": [c for c in chaves if c not in removidas and c not in bloqueadas],
+                "bloqueados": [c for c in chaves if c in bloqueadas]}
+
+    return executa_escrita(session, processa)
+
+
+def altera_status_lote(session, ids, status, status_atual=None, versoes=None):
+    """ Altera o status das manutenções informadas com um UPDATE por lote de até
+        tamanho_lote ids, incrementando a versão de cada linha alterada.
+
+    Arguments:
+        ids: ids das manutenções a alterar.
+        status: novo status.
+        status_atual: quando informado, só altera as manutenções neste status.
+        versoes: versão esperada por id; ids cuja versão na base é outra não
+            são alterados.
+
+    Retorna os ids alterados com a nova versão, os ids em conflito (status ou
+    versão diferente do esperado) com a versão e o status atuais, e os ids
+    inexistentes.
+    """
+    versoes = versoes or {}
+    ids = list(dict.fromkeys(ids))
+
+    def processa(s):
+        alterados = {}
+        conflitos = {}
+        for lote in _lotes(ids, tamanho_lote):
+            comando = (update(Manutencao).where(Manutencao.id.in_(lote))
+                       .values(status=status, versao=Manutencao.versao + 1))
+            if status_atual is not None:
+                comando = comando.where(Manutencao.status == status_atual)
+            esperadas = {id: versoes[id] for id in lote if id in versoes}
+            if esperadas:
+                # uma única condição compara cada linha com a versão esperada do seu id
+                comando = comando.where(Manutencao.versao == case(
+                    esperadas, value=Manutencao.id, else_=Manutencao.versao))
+            alterados.update(s.execute(comando.returning(Manutencao.id, Manutencao.versao),
+                                       execution_options={"synchronize_session": False}).all())
+            restantes = [id for id in lote if id not in alterados]
+            if restantes:
+                conflitos.update((id, (versao, atual)) for id, versao, atual in s.execute(
+                    select(Manutencao.id, Manutencao.versao, Manutencao.status)
+                    .where(Manutencao.id.in_(restantes))))
+        return {"alterados": [{"id": id, "versao": alterados[id]} for id in ids if id in alterados],
+                "conflitos": [{"id": id, "versao": conflitos[id][0], "status": conflitos[id][1]}
+                              for id in ids if id in conflitos],
+                "inexistentes": [id for id in ids if id not in alterados and id not in conflitos]}
+
+    return executa_escrita(session, processa)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Float, ForeignKey, Enum, CheckConstraint
+from sqlalchemy import Column, String, Integer, DateTime, Float, ForeignKey, Enum, CheckConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from typing import Union
@@ -20,6 +20,7 @@ class Equipamento(Base):
     #check do impacto para garantir integridade do bd
     __table_args__ = (
         CheckConstraint("impacto IN ('Alto', 'Medio', 'Baixo')", name="check_impacto"),
+        Index("ix_equipamentos_setor", "setor"),
     )
 
     def __init__(self, nome:str, modelo:str, setor:str, impacto:str,
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Float, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from typing import Union
@@ -15,10 +15,28 @@ class Manutencao(Base):
     tipo_manutencao= Column(String(140))
     comentario = Column(String(140),default="")
     previsao_conclusao = Column(DateTime)
+    versao = Column(Integer, nullable=False, default=1, server_default="1") #incrementada a cada alteração
 
     equipamentos = relationship("Equipamento", back_populates="manutencao")
     tecnicos = relationship("Tecnico", back_populates="manutencao")
 
+    #indices para as buscas e para as verificações de vínculo feitas ao remover
+    #equipamentos e técnicos (que usam o prefixo dos índices compostos)
+    __table_args__ = (
+        Index("ix_manutencao_equipamento_status", "nome_equipamento", "status"),
+        Index("ix_manutencao_tecnico_status", "matricula_tecnico", "status"),
+        Index("ix_manutencao_status", "status"),
+        Index("ix_manutencao_status_previsao", "status", "previsao_conclusao"),
+        Index("ix_manutencao_tipo_status", "tipo_manutencao", "status"),
+        Index("ix_manutencao_previsao", "previsao_conclusao"),
+        #ids nunca reaproveitados: um id removido pode estar no arquivo
+        {"sqlite_autoincrement": True},
+    )
+
+    #controle de concorrência otimista: o ORM inclui a versão carregada no WHERE
+    #do UPDATE e a incrementa, detectando alterações concorrentes (StaleDataError)
+    __mapper_args__ = {"version_id_col": versao}
+
     def __init__(self, nome_equipamento:str, matricula_tecnico:str, status:str, tipo_manutencao:str, comentario:str, previsao_conclusao:datetime):
 
         self.nome_equipamento = nome_equipamento
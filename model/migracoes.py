@@ -0,0 +1,191 @@
+from sqlalchemy.schema import CreateTable
+import logging
+
+from model.base import Base
+from model.manutencao import Manutencao
+from model.resumo import cria_triggers_resumo, reconstroi_resumo
+from model.texto import cria_indices_texto, reconstroi_indices_texto
+from model.alteracoes import cria_triggers_alteracoes, registra_existentes
+from model.arquivo import cria_triggers_arquivo
+from model.relatorios import cria_triggers_relatorios, registra_ciclos, reconstroi_relatorios
+
+
+logger = logging.getLogger(__name__)
+
+
+def _v1_indices_manutencao(conn):
+    """ Cria os índices de chaves estrangeiras e de status da manutencao.
+    """
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_manutencao_nome_equipamento "
+                         "ON manutencao (nome_equipamento)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_manutencao_matricula_tecnico "
+                         "ON manutencao (matricula_tecnico)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_manutencao_status "
+                         "ON manutencao (status)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_manutencao_status_previsao "
+                         "ON manutencao (status, previsao_conclusao)")
+    conn.exec_driver_sql("ANALYZE manutencao")
+
+
+def _v2_resumo_manutencao(conn):
+    """ Cria os triggers dos contadores de resumo e calcula os valores iniciais.
+    """
+    cria_triggers_resumo(conn)
+    reconstroi_resumo(conn)
+
+
+def _v3_indices_busca(conn):
+    """ Cria os índices usados pela busca de manutenções. Os índices simples de
+        nome_equipamento e matricula_tecnico passam a ser prefixos dos compostos.
+    """
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_manutencao_equipamento_status "
+                         "ON manutencao (nome_equipamento, status)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_manutencao_tecnico_status "
+                         "ON manutencao (matricula_tecnico, status)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_manutencao_tipo_status "
+                         "ON manutencao (tipo_manutencao, status)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_manutencao_previsao "
+                         "ON manutencao (previsao_conclusao)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_equipamentos_setor "
+                         "ON equipamentos (setor)")
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_manutencao_nome_equipamento")
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_manutencao_matricula_tecnico")
+    conn.exec_driver_sql("ANALYZE")
+
+
+def _v4_indices_texto(conn):
+    """ Cria a busca textual de equipamentos e manutenções e indexa os
+        registros já existentes.
+    """
+    cria_indices_texto(conn)
+    reconstroi_indices_texto(conn)
+
+
+def _v5_versao_manutencao(conn):
+    """ Acrescenta a coluna de versão usada no controle de concorrência das
+        alterações de manutenção.
+    """
+    colunas = {linha[1] for linha in conn.exec_driver_sql("PRAGMA table_info(manutencao)")}
+    if "versao" not in colunas:
+        conn.exec_driver_sql("ALTER TABLE manutencao ADD COLUMN versao INTEGER NOT NULL DEFAULT 1")
+
+
+def _v6_log_alteracoes(conn):
+    """ Cria os triggers do log de alterações e registra os dados já existentes.
+    """
+    cria_triggers_alteracoes(conn)
+    registra_existentes(conn)
+
+
+def _v7_indice_alteracoes_tabela(conn):
+    """ Cria o índice da última alteração de cada tabela, consultado pelo cache
+        de referências.
+    """
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_alteracoes_tabela_seq "
+                         "ON alteracoes (tabela, seq)")
+
+
+def _recria_manutencao_autoincrement(conn):
+    """ Recria a tabela manutencao com AUTOINCREMENT (se ainda não o tiver),
+        de modo que o id de uma manutenção removida ou arquivada nunca é
+        reaproveitado, e inicia a sequência após o maior id das manutenções
+        ativas e arquivadas. Os triggers de manutencao são recriados pelo
+        chamador.
+    """
+    definicao = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' "
+                                     "AND name = 'manutencao'").scalar()
+    if "AUTOINCREMENT" not in definicao.upper():
+        tabela = Manutencao.__table__
+        colunas = ", ".join(coluna.name for coluna in tabela.c)
+        criacao = str(CreateTable(tabela).compile(conn)).replace("CREATE TABLE manutencao ",
+                                                                 "CREATE TABLE manutencao_nova ", 1)
+        conn.exec_driver_sql(criacao)
+        conn.exec_driver_sql(f"INSERT INTO manutencao_nova ({colunas}) SELECT {colunas} FROM manutencao")
+        # os índices e triggers da tabela antiga são removidos com ela; os
+        # triggers de outras tabelas (equipamentos, manutencao_arquivo) citam
+        # manutencao pelo nome, e o modo legado da renomeação não os valida
+        conn.exec_driver_sql("DROP TABLE manutencao")
+        conn.exec_driver_sql("PRAGMA legacy_alter_table = ON")
+        conn.exec_driver_sql("ALTER TABLE manutencao_nova RENAME TO manutencao")
+        conn.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+        for indice in tabela.indexes:
+            indice.create(conn, checkfirst=True)
+        conn.exec_driver_sql("ANALYZE manutencao")
+    conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'manutencao'")
+    conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) SELECT 'manutencao', "
+                         "MAX((SELECT COALESCE(MAX(pk_id), 0) FROM manutencao), "
+                         "(SELECT COALESCE(MAX(pk_id), 0) FROM manutencao_arquivo))")
+
+
+def _v8_arquivo_manutencao(conn):
+    """ Recria a manutencao sem reaproveitamento de ids (um id arquivado não
+        pode voltar à tabela ativa), cria os triggers do resumo das manutenções
+        arquivadas e recria o do impacto dos equipamentos, que passa a contar
+        também as arquivadas.
+    """
+    _recria_manutencao_autoincrement(conn)
+    conn.exec_driver_sql("DROP TRIGGER IF EXISTS tr_resumo_equipamento_impacto")
+    cria_triggers_resumo(conn)
+    cria_indices_texto(conn)
+    cria_triggers_alteracoes(conn)
+    cria_triggers_arquivo(conn)
+
+
+def _v9_relatorios(conn):
+    """ Registra o ciclo (abertura e conclusão) das manutenções existentes,
+        cria os triggers dos relatórios e calcula as suas linhas diárias.
+    """
+    registra_ciclos(conn)
+    cria_triggers_relatorios(conn)
+    reconstroi_relatorios(conn)
+
+
+# lista ordenada das migrações: (versão, descrição, função que recebe a conexão)
+# novas alterações de schema devem ser adicionadas ao final, com a próxima versão
+MIGRACOES = [
+    (1, "índices de manutencao", _v1_indices_manutencao),
+    (2, "contadores de resumo das manutenções", _v2_resumo_manutencao),
+    (3, "índices da busca de manutenções", _v3_indices_busca),
+    (4, "busca textual (FTS5) de equipamentos e manutenções", _v4_indices_texto),
+    (5, "versão das manutenções", _v5_versao_manutencao),
+    (6, "log de alterações", _v6_log_alteracoes),
+    (7, "índice da última alteração por tabela", _v7_indice_alteracoes_tabela),
+    (8, "arquivo das manutenções concluídas", _v8_arquivo_manutencao),
+    (9, "relatórios diários de manutenção", _v9_relatorios),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+
+def versao_schema(conn) -> int:
+    """ Retorna a versão de schema gravada no banco (PRAGMA user_version).
+    """
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def aplica_migracoes(engine):
+    """ Cria as tabelas que ainda não existem e aplica, em ordem, as migrações
+        ainda não executadas no banco.
+
+    Em um banco novo todas as migrações são aplicadas logo após a criação das
+    tabelas, por isso devem ser idempotentes (IF NOT EXISTS). A versão do schema
+    é guardada em PRAGMA user_version e toda a atualização ocorre em uma única
+    transação com lock de escrita (BEGIN IMMEDIATE), de modo que vários workers
+    iniciando ao mesmo tempo não aplicam a mesma migração.
+    """
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            versao = versao_schema(conn)
+            if versao < VERSAO_ATUAL:
+                Base.metadata.create_all(conn)
+                for numero, descricao, migracao in MIGRACOES:
+                    if numero > versao:
+                        logger.info("Aplicando migração %d: %s", numero, descricao)
+                        migracao(conn)
+                conn.exec_driver_sql(f"PRAGMA user_version={VERSAO_ATUAL}")
+            conn.exec_driver_sql("COMMIT")
+        except Exception:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
@@ -0,0 +1,89 @@
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.exc import TimeoutError
+from threading import Lock
+import time
+
+
+class EstatisticasPool:
+    """ Acumula estatísticas de uso do pool de conexões: quantidade de
+        checkouts/checkins, conexões abertas e tempo de espera por conexão.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reinicia()
+
+    def reinicia(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.conexoes_criadas = 0
+            self.timeouts = 0
+            self.espera_total = 0.0
+            self.espera_maxima = 0.0
+
+    def registra_espera(self, segundos: float, timeout: bool = False):
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            self.espera_total += segundos
+            self.espera_maxima = max(self.espera_maxima, segundos)
+
+    def registra_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+
+    def registra_checkin(self):
+        with self._lock:
+            self.checkins += 1
+
+    def registra_conexao(self):
+        with self._lock:
+            self.conexoes_criadas += 1
+
+    def resumo(self, pool) -> dict:
+        """ Retorna um dicionário com as estatísticas acumuladas e o estado
+            atual do pool informado.
+        """
+        with self._lock:
+            media = self.espera_total / self.checkouts if self.checkouts else 0.0
+            return {
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "em_uso": pool.checkedout(),
+                "disponiveis": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "conexoes_criadas": self.conexoes_criadas,
+                "timeouts": self.timeouts,
+                "espera_media_ms": round(media * 1000, 3),
+                "espera_maxima_ms": round(self.espera_maxima * 1000, 3),
+            }
+
+
+# estatísticas da conexão de escrita e do pool de conexões somente leitura
+estatisticas_pool = EstatisticasPool()
+estatisticas_leitura = EstatisticasPool()
+
+
+class PoolObservavel(QueuePool):
+    """ QueuePool que mede o tempo gasto esperando por uma conexão livre.
+    """
+    estatisticas = estatisticas_pool
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except TimeoutError:
+            self.estatisticas.registra_espera(time.perf_counter() - inicio, timeout=True)
+            raise
+        self.estatisticas.registra_espera(time.perf_counter() - inicio)
+        return conexao
+
+
+class PoolLeitura(PoolObservavel):
+    """ PoolObservavel das conexões somente leitura, com estatísticas próprias.
+    """
+    estatisticas = estatisticas_leitura
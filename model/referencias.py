@@ -0,0 +1,128 @@
+from threading import Lock
+import os
+import sqlite3
+
+
+class CacheReferencias:
+    """ Cache em memória dos equipamentos (impacto e setor) e técnicos (turno),
+        usado para validar as referências das manutenções sem consultar o banco.
+
+    As duas tabelas são pequenas e raramente alteradas, por isso são carregadas
+    por inteiro. O cache é descartado pelas rotas de escrita de equipamentos e
+    técnicos deste processo (invalida) e acompanha as escritas dos demais
+    workers pelo PRAGMA data_version de uma conexão própria, somente leitura:
+    quando ele muda, a última entrada de equipamentos e técnicos no log de
+    alterações indica se as referências precisam ser recarregadas.
+    """
+
+    CONSULTA_ASSINATURA = ("SELECT (SELECT MAX(seq) FROM alteracoes WHERE tabela = 'equipamentos'), "
+                           "(SELECT MAX(seq) FROM alteracoes WHERE tabela = 'tecnicos')")
+
+    def __init__(self):
+        self._lock = Lock()
+        self._banco = None
+        self._conexao = None
+        self._data_version = None
+        self._assinatura = None
+        self.equipamentos = {}
+        self.tecnicos = {}
+        self.hits = 0
+        self.misses = 0
+        self.recargas = 0
+
+    def conecta(self, banco: str):
+        """ Define o arquivo do banco SQLite e carrega as referências.
+        """
+        with self._lock:
+            self._banco = banco
+            self._descarta_conexao()
+            self._carrega()
+
+    @property
+    def ativo(self) -> bool:
+        """ Indica se o cache já tem um banco configurado (conecta).
+        """
+        return self._banco is not None
+
+    def invalida(self):
+        """ Descarta as referências em memória: a próxima consulta as recarrega.
+        """
+        with self._lock:
+            self._assinatura = None
+
+    def equipamento(self, nome: str):
+        """ Retorna (impacto, setor) do equipamento, ou None se ele não existir.
+        """
+        with self._lock:
+            self._atualiza()
+            return self.equipamentos.get(nome)
+
+    def tecnico(self, matricula: str):
+        """ Retorna o turno do técnico (uma tupla com ele), ou None se ele não
+            existir.
+        """
+        with self._lock:
+            self._atualiza()
+            return self.tecnicos.get(matricula)
+
+    def resumo(self) -> dict:
+        with self._lock:
+            return {"equipamentos": len(self.equipamentos), "tecnicos": len(self.tecnicos),
+                    "hits": self.hits, "misses": self.misses, "recargas": self.recargas}
+
+    def reinicia_conexao(self):
+        """ Abandona a conexão herdada do processo pai (após um fork): o worker
+            abre a sua e recarrega as referências no próximo uso.
+        """
+        self._lock = Lock()
+        self._conexao = None
+        self._assinatura = None
+
+    def _descarta_conexao(self):
+        if self._conexao is not None:
+            self._conexao.close()
+            self._conexao = None
+
+    def _cursor(self):
+        if self._conexao is None:
+            self._conexao = sqlite3.connect(f"file:{os.path.abspath(self._banco)}?mode=ro", uri=True,
+                                            check_same_thread=False, isolation_level=None)
+            self._data_version = None
+        return self._conexao.cursor()
+
+    def _atualiza(self):
+        if self._banco is None:
+            raise RuntimeError("Cache de referências sem banco configurado")
+        if self._assinatura is not None:
+            # PRAGMA data_version muda quando outra conexão efetiva uma escrita
+            data_version = self._cursor().execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                self.hits += 1
+                return
+            self._data_version = data_version
+            assinatura = self._cursor().execute(self.CONSULTA_ASSINATURA).fetchone()
+            if assinatura == self._assinatura:
+                self.hits += 1
+                return
+        self.misses += 1
+        self._carrega()
+
+    def _carrega(self):
+        cursor = self._cursor()
+        # leitura em uma única transação, para que referências e assinatura
+        # correspondam ao mesmo estado do banco
+        cursor.execute("BEGIN")
+        try:
+            self._data_version = cursor.execute("PRAGMA data_version").fetchone()[0]
+            self._assinatura = cursor.execute(self.CONSULTA_ASSINATURA).fetchone()
+            self.equipamentos = {nome: (impacto, setor) for nome, impacto, setor in
+                                 cursor.execute("SELECT pk_nome, impacto, setor FROM equipamentos")}
+            self.tecnicos = {matricula: (turno,) for matricula, turno in
+                             cursor.execute("SELECT pk_matricula, turno FROM tecnicos")}
+        finally:
+            cursor.execute("COMMIT")
+        self.recargas += 1
+
+
+cache_referencias = CacheReferencias()
+os.register_at_fork(after_in_child=cache_referencias.reinicia_conexao)
@@ -0,0 +1,164 @@
+from sqlalchemy import Column, String, Integer, Date, DateTime, Float
+
+from  model import Base
+
+
+class CicloManutencao(Base):
+    __tablename__ = 'ciclo_manutencao'
+
+    #abertura e conclusão de cada manutenção, ativa ou arquivada (mesmo id)
+    id = Column("pk_id", Integer, primary_key=True, autoincrement=False)
+    aberta_em = Column(DateTime, nullable=False)
+    concluida_em = Column(DateTime) #nula enquanto a manutenção está aberta
+
+
+class RelatorioDiario(Base):
+    __tablename__ = 'relatorio_diario'
+
+    #cada relatório lê apenas as linhas da sua dimensão no período (chave primária)
+    dimensao = Column(String(40), primary_key=True)
+    dia = Column(Date, primary_key=True)
+    valor = Column(String(140), primary_key=True) #equipamento, setor ou matrícula
+    quantidade = Column(Integer, nullable=False, default=0)
+    soma_segundos = Column(Float, nullable=False, default=0) #tempo de reparo das concluídas
+
+
+STATUS_CONCLUIDO = "Pronto"
+
+_AGORA = "strftime('%Y-%m-%d %H:%M:%f000', 'now', 'localtime')"
+
+# expressões de cada dimensão para uma linha de manutencao ou manutencao_arquivo
+# (prefixo REG, substituído por NEW ou OLD nos triggers) e o seu ciclo (c):
+# (dia, valor, segundos de reparo, condição para a linha ser contada).
+# As conclusões são contadas no dia da conclusão e as abertas no dia da abertura
+DIMENSOES = {
+    "conclusao_equipamento": ("date(c.concluida_em)", "COALESCE(REG.nome_equipamento, '')",
+                              "(julianday(c.concluida_em) - julianday(c.aberta_em)) * 86400",
+                              f"REG.status = '{STATUS_CONCLUIDO}' AND c.concluida_em IS NOT NULL"),
+    "conclusao_tecnico": ("date(c.concluida_em)", "COALESCE(REG.matricula_tecnico, '')",
+                          "(julianday(c.concluida_em) - julianday(c.aberta_em)) * 86400",
+                          f"REG.status = '{STATUS_CONCLUIDO}' AND c.concluida_em IS NOT NULL"),
+    "abertas_setor": ("date(c.aberta_em)",
+                      "COALESCE((SELECT setor FROM equipamentos WHERE pk_nome = REG.nome_equipamento), '')",
+                      "0", f"REG.status IS NOT '{STATUS_CONCLUIDO}'"),
+}
+
+# contadores sem dia (estado atual), mantidos em resumo_manutencao:
+# (valor, condição para a linha ser contada)
+ATUAIS = {
+    "abertas_tecnico": ("COALESCE(REG.matricula_tecnico, '')", f"REG.status IS NOT '{STATUS_CONCLUIDO}'"),
+}
+
+_ACUMULA = ("ON CONFLICT (dimensao, dia, valor) DO UPDATE SET quantidade = quantidade + excluded.quantidade, "
+            "soma_segundos = soma_segundos + excluded.soma_segundos;\n")
+
+
+def _acumula(registro: str, delta: str) -> str:
+    """ Gera os comandos que somam delta às linhas diárias de cada dimensão
+        e aos contadores atuais em que a manutenção é contada.
+    """
+    return "".join(
+        f"INSERT INTO relatorio_diario (dimensao, dia, valor, quantidade, soma_segundos) "
+        f"SELECT '{dimensao}', {dia}, {valor.replace('REG', registro)}, {delta}, {delta} * {segundos} "
+        f"FROM ciclo_manutencao AS c WHERE c.pk_id = {registro}.pk_id AND {condicao.replace('REG', registro)} "
+        f"{_ACUMULA}"
+        for dimensao, (dia, valor, segundos, condicao) in DIMENSOES.items()) + "".join(
+        f"INSERT INTO resumo_manutencao (dimensao, valor, quantidade) "
+        f"SELECT '{dimensao}', {valor.replace('REG', registro)}, {delta} WHERE {condicao.replace('REG', registro)} "
+        f"ON CONFLICT (dimensao, valor) DO UPDATE SET quantidade = quantidade + excluded.quantidade;\n"
+        for dimensao, (valor, condicao) in ATUAIS.items())
+
+
+def _move_setor(registro: str, sinal: str) -> str:
+    return (f"INSERT INTO relatorio_diario (dimensao, dia, valor, quantidade, soma_segundos) "
+            f"SELECT 'abertas_setor', date(c.aberta_em), COALESCE({registro}.setor, ''), {sinal}COUNT(*), 0 "
+            f"FROM manutencao AS m JOIN ciclo_manutencao AS c ON c.pk_id = m.pk_id "
+            f"WHERE m.nome_equipamento = {registro}.pk_nome AND m.status IS NOT '{STATUS_CONCLUIDO}' "
+            f"GROUP BY date(c.aberta_em) {_ACUMULA}")
+
+
+TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS tr_relatorio_manutencao_insert AFTER INSERT ON manutencao
+    BEGIN
+    INSERT OR REPLACE INTO ciclo_manutencao (pk_id, aberta_em, concluida_em)
+    SELECT NEW.pk_id, agora, CASE WHEN NEW.status = '{STATUS_CONCLUIDO}' THEN agora END
+    FROM (SELECT {_AGORA} AS agora);
+    {_acumula("NEW", "1")}END""",
+    # a conclusão é registrada na mudança para Pronto; reabrir a manutenção
+    # mantém a data de abertura e descarta a de conclusão
+    f"""CREATE TRIGGER IF NOT EXISTS tr_relatorio_manutencao_update
+    AFTER UPDATE OF status, nome_equipamento, matricula_tecnico ON manutencao
+    BEGIN
+    {_acumula("OLD", "-1")}UPDATE ciclo_manutencao SET concluida_em = CASE WHEN NEW.status = '{STATUS_CONCLUIDO}'
+    THEN COALESCE(CASE WHEN OLD.status = '{STATUS_CONCLUIDO}' THEN concluida_em END, {_AGORA}) END
+    WHERE pk_id = NEW.pk_id;
+    {_acumula("NEW", "1")}END""",
+    # ao arquivar, a manutenção é inserida no arquivo antes de ser removida da
+    # tabela ativa: o ciclo é mantido e a contagem passa de uma para a outra
+    f"""CREATE TRIGGER IF NOT EXISTS tr_relatorio_manutencao_delete AFTER DELETE ON manutencao
+    BEGIN
+    {_acumula("OLD", "-1")}DELETE FROM ciclo_manutencao WHERE pk_id = OLD.pk_id
+    AND NOT EXISTS (SELECT 1 FROM manutencao_arquivo WHERE pk_id = OLD.pk_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tr_relatorio_arquivo_insert AFTER INSERT ON manutencao_arquivo
+    BEGIN
+    {_acumula("NEW", "1")}END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tr_relatorio_arquivo_delete AFTER DELETE ON manutencao_arquivo
+    BEGIN
+    {_acumula("OLD", "-1")}DELETE FROM ciclo_manutencao WHERE pk_id = OLD.pk_id
+    AND NOT EXISTS (SELECT 1 FROM manutencao WHERE pk_id = OLD.pk_id);
+    END""",
+    # a alteração do setor de um equipamento move as suas manutenções abertas
+    f"""CREATE TRIGGER IF NOT EXISTS tr_relatorio_equipamento_setor AFTER UPDATE OF setor ON equipamentos
+    BEGIN
+    {_move_setor("OLD", "-")}{_move_setor("NEW", "")}END""",
+]
+
+
+def cria_triggers_relatorios(conn):
+    """ Cria os triggers que registram a abertura e a conclusão das manutenções
+        e mantêm as linhas diárias dos relatórios.
+    """
+    for trigger in TRIGGERS:
+        conn.exec_driver_sql(trigger)
+
+
+def registra_ciclos(conn):
+    """ Registra a abertura e a conclusão das manutenções que ainda não têm
+        ciclo, a partir do log de alterações: a primeira entrada do registro é a
+        abertura e, nas concluídas, a última é a conclusão. Sem entradas no log
+        (ou após a sua compactação) as datas são aproximadas pelas disponíveis.
+    """
+    for tabela in ("manutencao", "manutencao_arquivo"):
+        conn.exec_driver_sql(
+            f"INSERT OR IGNORE INTO ciclo_manutencao (pk_id, aberta_em, concluida_em) "
+            f"SELECT pk_id, aberta, CASE WHEN status = '{STATUS_CONCLUIDO}' THEN MAX(aberta, COALESCE(ultima, aberta)) END "
+            f"FROM (SELECT REG.pk_id, REG.status, "
+            f"COALESCE((SELECT strftime('%Y-%m-%d %H:%M:%f000', MIN(momento), 'localtime') FROM alteracoes "
+            f"WHERE tabela = 'manutencao' AND chave = CAST(REG.pk_id AS TEXT) AND operacao != 'delete'), {_AGORA}) "
+            f"AS aberta, "
+            f"(SELECT strftime('%Y-%m-%d %H:%M:%f000', MAX(momento), 'localtime') FROM alteracoes "
+            f"WHERE tabela = 'manutencao' AND chave = CAST(REG.pk_id AS TEXT) AND operacao != 'delete') "
+            f"AS ultima FROM {tabela} AS REG)")
+
+
+def reconstroi_relatorios(conn):
+    """ Recalcula todas as linhas diárias e os contadores atuais dos relatórios
+        a partir das tabelas manutencao e manutencao_arquivo e dos seus ciclos.
+    """
+    conn.exec_driver_sql("DELETE FROM relatorio_diario")
+    for dimensao, (valor, condicao) in ATUAIS.items():
+        linhas = " UNION ALL ".join(f"SELECT {valor} AS valor FROM {tabela} AS REG WHERE {condicao}"
+                                    for tabela in ("manutencao", "manutencao_arquivo"))
+        conn.exec_driver_sql(f"DELETE FROM resumo_manutencao WHERE dimensao = '{dimensao}'")
+        conn.exec_driver_sql(
+            f"INSERT INTO resumo_manutencao (dimensao, valor, quantidade) "
+            f"SELECT '{dimensao}', valor, COUNT(*) FROM ({linhas}) GROUP BY valor")
+    for dimensao, (dia, valor, segundos, condicao) in DIMENSOES.items():
+        linhas = " UNION ALL ".join(
+            f"SELECT {dia} AS dia, {valor} AS valor, {segundos} AS segundos "
+            f"FROM {tabela} AS REG JOIN ciclo_manutencao AS c ON c.pk_id = REG.pk_id WHERE {condicao}"
+            for tabela in ("manutencao", "manutencao_arquivo"))
+        conn.exec_driver_sql(
+            f"INSERT INTO relatorio_diario (dimensao, dia, valor, quantidade, soma_segundos) "
+            f"SELECT '{dimensao}', dia, valor, COUNT(*), SUM(segundos) FROM ({linhas}) GROUP BY dia, valor")
@@ -0,0 +1,82 @@
+from sqlalchemy import Column, String, Integer
+
+from  model import Base
+
+
+class ResumoManutencao(Base):
+    __tablename__ = 'resumo_manutencao'
+
+    dimensao = Column(String(40), primary_key=True) #status, tipo_manutencao, impacto ou abertas_tecnico
+    valor = Column(String(140), primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+
+
+# expressões que definem o valor de cada dimensão para uma linha de manutencao
+# (o prefixo REG é substituído por NEW ou OLD nos triggers)
+DIMENSOES = {
+    "status": "COALESCE(REG.status, '')",
+    "tipo_manutencao": "COALESCE(REG.tipo_manutencao, '')",
+    "impacto": "COALESCE((SELECT impacto FROM equipamentos WHERE pk_nome = REG.nome_equipamento), '')",
+}
+
+
+def _soma(registro: str, delta: str) -> str:
+    """ Gera os comandos que somam delta ao contador de cada dimensão da linha.
+    """
+    return "".join(
+        f"INSERT INTO resumo_manutencao (dimensao, valor, quantidade) "
+        f"VALUES ('{dimensao}', {expressao.replace('REG', registro)}, {delta}) "
+        f"ON CONFLICT (dimensao, valor) DO UPDATE SET quantidade = quantidade + excluded.quantidade;\n"
+        for dimensao, expressao in DIMENSOES.items())
+
+
+TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS tr_resumo_manutencao_insert AFTER INSERT ON manutencao
+    BEGIN
+    {_soma("NEW", "1")}END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tr_resumo_manutencao_delete AFTER DELETE ON manutencao
+    BEGIN
+    {_soma("OLD", "-1")}END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tr_resumo_manutencao_update
+    AFTER UPDATE OF status, tipo_manutencao, nome_equipamento ON manutencao
+    BEGIN
+    {_soma("OLD", "-1")}{_soma("NEW", "1")}END""",
+    # a alteração do impacto de um equipamento move todas as suas manutenções,
+    # ativas e arquivadas
+    """CREATE TRIGGER IF NOT EXISTS tr_resumo_equipamento_impacto
+    AFTER UPDATE OF impacto ON equipamentos
+    BEGIN
+    INSERT INTO resumo_manutencao (dimensao, valor, quantidade)
+    SELECT 'impacto', COALESCE(OLD.impacto, ''),
+    -(SELECT COUNT(*) FROM manutencao WHERE nome_equipamento = OLD.pk_nome)
+    -(SELECT COUNT(*) FROM manutencao_arquivo WHERE nome_equipamento = OLD.pk_nome) WHERE true
+    ON CONFLICT (dimensao, valor) DO UPDATE SET quantidade = quantidade + excluded.quantidade;
+    INSERT INTO resumo_manutencao (dimensao, valor, quantidade)
+    SELECT 'impacto', COALESCE(NEW.impacto, ''),
+    (SELECT COUNT(*) FROM manutencao WHERE nome_equipamento = NEW.pk_nome)
+    +(SELECT COUNT(*) FROM manutencao_arquivo WHERE nome_equipamento = NEW.pk_nome) WHERE true
+    ON CONFLICT (dimensao, valor) DO UPDATE SET quantidade = quantidade + excluded.quantidade;
+    END""",
+]
+
+
+def cria_triggers_resumo(conn):
+    """ Cria os triggers que mantêm os contadores de resumo_manutencao
+        atualizados a cada inserção, alteração e remoção de manutenção.
+    """
+    for trigger in TRIGGERS:
+        conn.exec_driver_sql(trigger)
+
+
+def reconstroi_resumo(conn):
+    """ Recalcula os contadores de resumo_manutencao (das dimensões de
+        DIMENSOES) a partir das tabelas manutencao e manutencao_arquivo.
+    """
+    for dimensao, expressao in DIMENSOES.items():
+        conn.exec_driver_sql(f"DELETE FROM resumo_manutencao WHERE dimensao = '{dimensao}'")
+        conn.exec_driver_sql(
+            f"INSERT INTO resumo_manutencao (dimensao, valor, quantidade) "
+            f"SELECT '{dimensao}', valor, COUNT(*) FROM "
+            f"(SELECT {expressao.replace('REG', 'manutencao')} AS valor FROM manutencao "
+            f"UNION ALL SELECT {expressao.replace('REG', 'manutencao_arquivo')} FROM manutencao_arquivo) "
+            f"GROUP BY valor")
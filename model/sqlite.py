@@ -0,0 +1,120 @@
+from sqlalchemy.exc import OperationalError
+from contextlib import contextmanager
+import logging
+import os
+import random
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# valores aceitos pelos PRAGMAs textuais, para evitar configurações inválidas
+JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+SYNCHRONOUS = ("OFF", "NORMAL", "FULL", "EXTRA")
+TEMP_STORE = ("DEFAULT", "FILE", "MEMORY")
+
+
+def _opcao(nome: str, padrao: str, validos) -> str:
+    valor = os.environ.get(nome, padrao).upper()
+    if valor not in validos:
+        raise ValueError(f"Valor inválido para {nome}: '{valor}'")
+    return valor
+
+
+class PerfilSQLite:
+    """ Perfil de desempenho aplicado a cada nova conexão com o SQLite.
+
+    Os valores padrão são adequados para produção com vários workers: WAL
+    permite que leitores não bloqueiem o escritor, synchronous NORMAL é seguro
+    em WAL e busy_timeout faz o SQLite aguardar a liberação do lock em vez de
+    falhar imediatamente. Cada opção pode ser ajustada por variável de ambiente.
+    """
+
+    def __init__(self):
+        self.journal_mode = _opcao("SQLITE_JOURNAL_MODE", "WAL", JOURNAL_MODES)
+        self.synchronous = _opcao("SQLITE_SYNCHRONOUS", "NORMAL", SYNCHRONOUS)
+        self.temp_store = _opcao("SQLITE_TEMP_STORE", "MEMORY", TEMP_STORE)
+        # valor negativo indica tamanho em KiB (64 MiB)
+        self.cache_size = int(os.environ.get("SQLITE_CACHE_SIZE", -64000))
+        self.mmap_size = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+        self.busy_timeout = int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000))
+
+    def pragmas(self, somente_leitura: bool = False):
+        """ Retorna a lista de PRAGMAs a serem executados na conexão. Conexões
+            somente leitura não alteram o journal_mode (definido pela conexão
+            de escrita) e recusam qualquer escrita (query_only).
+        """
+        if somente_leitura:
+            escrita = ["PRAGMA query_only=ON"]
+        else:
+            escrita = [f"PRAGMA journal_mode={self.journal_mode}",
+                       f"PRAGMA synchronous={self.synchronous}"]
+        return escrita + [
+            f"PRAGMA cache_size={self.cache_size}",
+            f"PRAGMA mmap_size={self.mmap_size}",
+            f"PRAGMA temp_store={self.temp_store}",
+            f"PRAGMA busy_timeout={self.busy_timeout}",
+        ]
+
+    def aplica(self, dbapi_connection, somente_leitura: bool = False):
+        """ Executa os PRAGMAs do perfil na conexão informada.
+        """
+        cursor = dbapi_connection.cursor()
+        for pragma in self.pragmas(somente_leitura):
+            cursor.execute(pragma)
+        cursor.close()
+
+
+perfil_sqlite = PerfilSQLite()
+
+# configuração das novas tentativas de escrita quando o banco está ocupado
+max_tentativas = max(int(os.environ.get("SQLITE_BUSY_RETRIES", 5)), 1)
+espera_inicial = float(os.environ.get("SQLITE_BUSY_BACKOFF", 0.05))
+
+
+def banco_ocupado(erro: OperationalError) -> bool:
+    """ Indica se o erro corresponde a SQLITE_BUSY / SQLITE_LOCKED.
+    """
+    mensagem = str(erro.orig).lower()
+    return "database is locked" in mensagem or "database is busy" in mensagem \
+        or "database table is locked" in mensagem
+
+
+def executa_escrita(session, operacao):
+    """ Executa a operação de escrita e efetiva a transação, repetindo com
+        backoff exponencial caso o banco esteja ocupado (SQLITE_BUSY).
+
+    A operação recebe a sessão e deve refazer todas as alterações, pois a
+    transação é desfeita antes de cada nova tentativa. Retorna o valor
+    retornado pela operação.
+    """
+    for tentativa in range(max_tentativas):
+        try:
+            resultado = operacao(session)
+            session.commit()
+            return resultado
+        except OperationalError as e:
+            session.rollback()
+            if not banco_ocupado(e) or tentativa == max_tentativas - 1:
+                raise
+            espera = espera_inicial * (2 ** tentativa) * random.uniform(0.5, 1.5)
+            logger.warning("Banco ocupado, nova tentativa de escrita em %.3fs", espera)
+            time.sleep(espera)
+
+
+@contextmanager
+def leitura_consistente(conn):
+    """ Executa as consultas do bloco em uma única transação de leitura, de
+        modo que todas veem o mesmo estado do banco.
+
+    O driver sqlite3 não abre transação para SELECT (cada consulta veria as
+    escritas efetivadas entre elas), por isso a transação é aberta com BEGIN
+    explícito, efetivada ao final do bloco e desfeita em caso de erro.
+    """
+    conn.exec_driver_sql("BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.exec_driver_sql("ROLLBACK")
+        raise
+    conn.exec_driver_sql("COMMIT")
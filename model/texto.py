@@ -0,0 +1,97 @@
+import re
+
+from sqlalchemy import column, literal_column, table
+
+
+# índices de texto (FTS5) das descrições de equipamentos e manutenções. O
+# tokenizador remove acentos, de modo que "peca" também encontra "peça", e os
+# índices de prefixo aceleram as buscas por parte de uma palavra ("EG*")
+TOKENIZADOR = "unicode61 remove_diacritics 2"
+PREFIXOS = "2 3"
+
+# equipamentos não tem chave inteira (o rowid pode mudar após um VACUUM), por
+# isso o índice guarda uma cópia de nome e modelo e é ligado pelo nome
+TABELAS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS fts_equipamentos USING fts5(
+    nome, modelo, tokenize='{TOKENIZADOR}', prefix='{PREFIXOS}')""",
+    # manutencao tem chave inteira: o índice usa a própria tabela como conteúdo
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS fts_manutencao USING fts5(
+    comentario, tipo_manutencao, content='manutencao', content_rowid='pk_id',
+    tokenize='{TOKENIZADOR}', prefix='{PREFIXOS}')""",
+]
+
+TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS tr_fts_equipamentos_insert AFTER INSERT ON equipamentos
+    BEGIN
+    INSERT INTO fts_equipamentos (nome, modelo) VALUES (NEW.pk_nome, NEW.modelo);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tr_fts_equipamentos_delete AFTER DELETE ON equipamentos
+    BEGIN
+    DELETE FROM fts_equipamentos WHERE nome = OLD.pk_nome;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tr_fts_equipamentos_update
+    AFTER UPDATE OF pk_nome, modelo ON equipamentos
+    BEGIN
+    DELETE FROM fts_equipamentos WHERE nome = OLD.pk_nome;
+    INSERT INTO fts_equipamentos (nome, modelo) VALUES (NEW.pk_nome, NEW.modelo);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tr_fts_manutencao_insert AFTER INSERT ON manutencao
+    BEGIN
+    INSERT INTO fts_manutencao (rowid, comentario, tipo_manutencao)
+    VALUES (NEW.pk_id, NEW.comentario, NEW.tipo_manutencao);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tr_fts_manutencao_delete AFTER DELETE ON manutencao
+    BEGIN
+    INSERT INTO fts_manutencao (fts_manutencao, rowid, comentario, tipo_manutencao)
+    VALUES ('delete', OLD.pk_id, OLD.comentario, OLD.tipo_manutencao);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tr_fts_manutencao_update
+    AFTER UPDATE OF comentario, tipo_manutencao ON manutencao
+    BEGIN
+    INSERT INTO fts_manutencao (fts_manutencao, rowid, comentario, tipo_manutencao)
+    VALUES ('delete', OLD.pk_id, OLD.comentario, OLD.tipo_manutencao);
+    INSERT INTO fts_manutencao (rowid, comentario, tipo_manutencao)
+    VALUES (NEW.pk_id, NEW.comentario, NEW.tipo_manutencao);
+    END""",
+]
+
+# representação das tabelas de texto para as consultas com o SQLAlchemy Core
+fts_equipamentos = table("fts_equipamentos", column("nome"), column("rank"))
+fts_manutencao = table("fts_manutencao", column("rowid"), column("rank"))
+
+
+def cria_indices_texto(conn):
+    """ Cria as tabelas de busca textual e os triggers que as mantêm
+        sincronizadas com equipamentos e manutencao.
+    """
+    for comando in TABELAS + TRIGGERS:
+        conn.exec_driver_sql(comando)
+
+
+def reconstroi_indices_texto(conn):
+    """ Recria o conteúdo das tabelas de busca textual a partir da base e
+        compacta os índices.
+    """
+    conn.exec_driver_sql("DELETE FROM fts_equipamentos")
+    conn.exec_driver_sql("INSERT INTO fts_equipamentos (nome, modelo) SELECT pk_nome, modelo FROM equipamentos")
+    conn.exec_driver_sql("INSERT INTO fts_manutencao (fts_manutencao) VALUES ('rebuild')")
+    for tabela in ("fts_equipamentos", "fts_manutencao"):
+        conn.exec_driver_sql(f"INSERT INTO {tabela} ({tabela}) VALUES ('optimize')")
+
+
+def expressao_texto(termos: str) -> str:
+    """ Converte o texto digitado pelo usuário em uma expressão MATCH do FTS5:
+        cada palavra vira um prefixo entre aspas e todas precisam aparecer.
+
+        Levanta ValueError se o texto não tiver nenhuma palavra.
+    """
+    palavras = re.findall(r"\w+", termos)
+    if not palavras:
+        raise ValueError("Informe ao menos uma palavra para a busca")
+    return " ".join('"%s"*' % palavra for palavra in palavras)
+
+
+def corresponde(tabela, expressao: str):
+    """ Retorna a condição MATCH da tabela de texto para a expressão.
+    """
+    return literal_column(tabela.name).op("MATCH")(expressao)
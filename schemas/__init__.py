@@ -1,10 +1,32 @@
 from schemas.equipamento import EquipamentoSchema, EquipamentoBuscaSchema, ListagemEquipamentoSchema, \
-                                EquipamentoDelSchema, EquipamentoViewSchema,\
-                                 apresenta_equipamentos, apresenta_equipamento
-from schemas.tecnico import TecnicoSchema, TecnicoDelSchema, TecnicoBuscaSchema, TecnicoViewSchema, \
-                            ListagemTecnicoSchema, apresenta_tecnicos, apresenta_tecnico
+                                EquipamentoDelSchema, EquipamentoViewSchema, EquipamentoLoteDelSchema, \
+                                 apresenta_equipamento, \
+                                 COLUNAS_EQUIPAMENTO, CAMPOS_EQUIPAMENTO, apresenta_equipamentos_linhas
+from schemas.tecnico import TecnicoSchema, TecnicoDelSchema, TecnicoLoteDelSchema, TecnicoBuscaSchema, TecnicoViewSchema, \
+                            ListagemTecnicoSchema, apresenta_tecnico, \
+                            COLUNAS_TECNICO, apresenta_tecnicos_linhas
 from schemas.manutencao import ManutencaoSchema, ManutencaoBuscaSchema, ListagemManutencaoSchema, \
-                                ManutencaoDelSchema, ManutencaoViewSchema, \
-                                ManutencaoIdSchema, apresenta_manutencoes, apresenta_manutencao, \
-                                ManutencaoStatusSchema, ManutencaoPath
-from schemas.error import ErrorSchema
\ No newline at end of file
+                                ManutencaoDelSchema, ManutencaoLoteDelSchema, ManutencaoViewSchema, \
+                                ManutencaoStatusLoteSchema, ManutencaoStatusLoteViewSchema, \
+                                ManutencaoIdSchema, apresenta_manutencao, \
+                                ManutencaoStatusSchema, ManutencaoStatusPaginadoSchema, ManutencaoPath, \
+                                COLUNAS_MANUTENCAO, CAMPOS_MANUTENCAO, apresenta_manutencoes_linhas, \
+                                ResumoManutencaoViewSchema, apresenta_resumo, \
+                                ManutencaoPaginadoSchema, consulta_manutencoes
+from schemas.paginacao import PaginacaoSchema, pagina_keyset
+from schemas.exportacao import ExportacaoSchema, ExportacaoManutencaoSchema, TIPOS_EXPORTACAO, \
+                              blocos_consulta, exporta_blocos
+from schemas.error import ErrorSchema
+from schemas.monitoramento import PoolViewSchema
+from schemas.carga import CargaViewSchema, RemocaoLoteViewSchema, le_registros, valida_registros
+
+from schemas.busca import BuscaTextoSchema, BuscaTextoViewSchema, apresenta_busca, \
+                          consulta_busca_equipamentos, consulta_busca_manutencoes
+
+from schemas.alteracoes import AlteracoesBuscaSchema, ListagemAlteracoesSchema, ESTADOS, \
+                               consulta_alteracoes, consulta_estados, apresenta_alteracoes
+
+from schemas.relatorios import RelatorioPeriodoSchema, RelatorioAbertasSchema, RelatorioMttrViewSchema, \
+                               RelatorioAbertasViewSchema, RelatorioBacklogViewSchema, RelatorioCargaViewSchema, \
+                               periodo_relatorio, consulta_mttr, consulta_abertas, consulta_carga, \
+                               apresenta_mttr, apresenta_abertas, apresenta_backlog, apresenta_carga
@@ -0,0 +1,88 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from sqlalchemy import select
+from model.alteracoes import Alteracao
+from model.equipamento import Equipamento
+from model.manutencao import Manutencao
+from model.tecnico import Tecnico
+from schemas.equipamento import COLUNAS_EQUIPAMENTO, CAMPOS_EQUIPAMENTO
+from schemas.manutencao import COLUNAS_MANUTENCAO, CAMPOS_MANUTENCAO
+from schemas.tecnico import COLUNAS_TECNICO, CAMPOS_TECNICO
+
+
+class AlteracoesBuscaSchema(BaseModel):
+    """ Define os parâmetros da sincronização incremental: o último seq já
+        recebido pelo cliente (0 para começar do zero) e o tamanho da página.
+    """
+    since: int = Field(0, ge=0)
+    limit: int = Field(500, ge=1, le=5000)
+
+
+class AlteracaoViewSchema(BaseModel):
+    """ Define como uma alteração é retornada. Em inserções e alterações, dados
+        traz o estado atual do registro; em remoções (tombstones) é nulo.
+    """
+    seq: int
+    tabela: str
+    chave: str
+    operacao: str
+    dados: Optional[Dict[str, Any]] = None
+
+
+class ListagemAlteracoesSchema(BaseModel):
+    """ Define como a página de alterações é retornada. next_since é o valor de
+        since da próxima chamada e mais indica se há alterações pendentes.
+    """
+    alteracoes: List[AlteracaoViewSchema]
+    next_since: int
+    mais: bool
+
+
+# colunas, campos e chave primária usados para carregar o estado atual dos
+# registros de cada tabela do log
+ESTADOS = {
+    "equipamentos": (COLUNAS_EQUIPAMENTO, CAMPOS_EQUIPAMENTO, Equipamento.nome, str),
+    "tecnicos": (COLUNAS_TECNICO, CAMPOS_TECNICO, Tecnico.matricula, str),
+    "manutencao": (COLUNAS_MANUTENCAO, CAMPOS_MANUTENCAO, Manutencao.id, int),
+}
+
+
+def consulta_alteracoes(since: int, limit: int):
+    """ Monta a consulta das entradas do log posteriores a since, em ordem,
+        com uma entrada a mais para indicar se há próxima página.
+    """
+    return (select(Alteracao.seq, Alteracao.tabela, Alteracao.chave, Alteracao.operacao)
+            .where(Alteracao.seq > since)
+            .order_by(Alteracao.seq)
+            .limit(limit + 1))
+
+
+def consulta_estados(tabela: str, chaves):
+    """ Monta a consulta do estado atual dos registros da tabela com as chaves
+        informadas. A primeira coluna de cada linha é a chave primária.
+    """
+    colunas, campos, coluna_pk, tipo = ESTADOS[tabela]
+    return select(coluna_pk, *colunas).where(coluna_pk.in_([tipo(chave) for chave in chaves]))
+
+
+def apresenta_alteracoes(entradas, estados, since: int, limit: int):
+    """ Retorna uma representação da página de alterações seguindo o schema
+        definido em ListagemAlteracoesSchema.
+
+    entradas são as linhas de consulta_alteracoes e estados o dicionário
+    (tabela, chave) -> linha de consulta_estados sem a chave. Cada registro aparece uma
+    só vez na página, na posição da sua alteração mais recente.
+    """
+    mais = len(entradas) > limit
+    entradas = entradas[:limit]
+    ultimas = {(tabela, chave): seq for seq, tabela, chave, operacao in entradas}
+    alteracoes = []
+    for seq, tabela, chave, operacao in entradas:
+        if ultimas[(tabela, chave)] != seq:
+            continue
+        linha = estados.get((tabela, chave)) if operacao != "delete" else None
+        alteracoes.append({"seq": seq, "tabela": tabela, "chave": chave, "operacao": operacao,
+                           "dados": dict(zip(ESTADOS[tabela][1], linha)) if linha else None})
+    return {"alteracoes": alteracoes,
+            "next_since": entradas[-1][0] if entradas else since,
+            "mais": mais}
@@ -0,0 +1,55 @@
+from pydantic import BaseModel, Field
+from typing import List
+from sqlalchemy import select
+from model.equipamento import Equipamento
+from model.manutencao import Manutencao
+from model.texto import fts_equipamentos, fts_manutencao, corresponde
+from schemas.equipamento import EquipamentoViewSchema, COLUNAS_EQUIPAMENTO, CAMPOS_EQUIPAMENTO
+from schemas.manutencao import ManutencaoExpandidaSchema, COLUNAS_MANUTENCAO, CAMPOS_MANUTENCAO
+
+
+class BuscaTextoSchema(BaseModel):
+    """ Define os parâmetros da busca textual em equipamentos e manutenções.
+    """
+    q: str = Field(..., min_length=1, max_length=200)
+    limit: int = Field(20, ge=1, le=100)
+
+
+class BuscaTextoViewSchema(BaseModel):
+    """ Define como o resultado da busca textual será retornado, com os itens
+        de cada lista ordenados pela relevância.
+    """
+    equipamentos: List[EquipamentoViewSchema]
+    manutencoes: List[ManutencaoExpandidaSchema]
+
+
+def consulta_busca_equipamentos(expressao: str, limit: int):
+    """ Monta a consulta dos equipamentos cujo nome ou modelo correspondem à
+        expressão, dos mais relevantes (bm25) aos menos relevantes.
+    """
+    return (select(*COLUNAS_EQUIPAMENTO)
+            .select_from(fts_equipamentos)
+            .join(Equipamento, Equipamento.nome == fts_equipamentos.c.nome)
+            .where(corresponde(fts_equipamentos, expressao))
+            .order_by(fts_equipamentos.c.rank)
+            .limit(limit))
+
+
+def consulta_busca_manutencoes(expressao: str, limit: int):
+    """ Monta a consulta das manutenções cujo comentário ou tipo correspondem
+        à expressão, das mais relevantes (bm25) às menos relevantes.
+    """
+    return (select(*COLUNAS_MANUTENCAO)
+            .select_from(fts_manutencao)
+            .join(Manutencao, Manutencao.id == fts_manutencao.c.rowid)
+            .where(corresponde(fts_manutencao, expressao))
+            .order_by(fts_manutencao.c.rank)
+            .limit(limit))
+
+
+def apresenta_busca(equipamentos, manutencoes):
+    """ Retorna uma representação do resultado da busca textual seguindo o
+        schema definido em BuscaTextoViewSchema.
+    """
+    return {"equipamentos": [dict(zip(CAMPOS_EQUIPAMENTO, linha)) for linha in equipamentos],
+            "manutencoes": [dict(zip(CAMPOS_MANUTENCAO, linha)) for linha in manutencoes]}
@@ -0,0 +1,81 @@
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional, Union
+import csv
+import io
+import json
+
+
+class CargaResultadoSchema(BaseModel):
+    """ Define como o resultado de cada linha de uma carga em lote é retornado.
+    """
+    linha: int
+    status: str
+    chave: Optional[Union[str, int]] = None
+    mesage: Optional[str] = None
+
+class CargaViewSchema(BaseModel):
+    """ Define como o resumo de uma carga em lote é retornado. Uma carga
+        interrompida traz também a linha em que parou e o motivo.
+    """
+    total: int
+    inseridos: int
+    rejeitados: int
+    resultados: List[CargaResultadoSchema]
+    interrompido: Optional[bool] = None
+    linha_interrompida: Optional[int] = None
+    mesage: Optional[str] = None
+
+
+class RemocaoLoteViewSchema(BaseModel):
+    """ Define como o resultado de uma remoção em lote é retornado.
+    """
+    removidos: List[Union[str, int]]
+    inexistentes: List[Union[str, int]]
+    bloqueados: List[Union[str, int]]
+
+
+def le_registros(request):
+    """ Lê os registros enviados no corpo da requisição, de acordo com o
+        Content-Type: array JSON (application/json), NDJSON
+        (application/x-ndjson) ou CSV com cabeçalho (text/csv).
+
+    NDJSON e CSV são lidos linha a linha do stream da requisição, sem carregar
+    o corpo inteiro em memória. Gera tuplas (linha, dados) e levanta ValueError
+    caso o corpo não esteja no formato esperado.
+    """
+    if request.mimetype in ("application/x-ndjson", "application/ndjson"):
+        texto = io.TextIOWrapper(request.stream, encoding="utf-8")
+        for numero, conteudo in enumerate(texto, start=1):
+            if conteudo.strip():
+                try:
+                    yield numero, json.loads(conteudo)
+                except json.JSONDecodeError:
+                    yield numero, None
+    elif request.mimetype == "text/csv":
+        texto = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+        # a linha 1 é o cabeçalho
+        for numero, dados in enumerate(csv.DictReader(texto), start=2):
+            yield numero, dados
+    else:
+        dados = request.get_json(silent=True)
+        if not isinstance(dados, list):
+            raise ValueError("O corpo deve ser um array JSON, NDJSON ou CSV")
+        for numero, item in enumerate(dados, start=1):
+            yield numero, item
+
+
+def valida_registros(registros, schema):
+    """ Valida cada registro com o schema informado.
+
+    Gera tuplas (linha, valores, erro): valores é o dicionário validado ou
+    None, e erro é a mensagem de validação quando o registro é inválido.
+    """
+    for numero, dados in registros:
+        if not isinstance(dados, dict):
+            yield numero, None, "Registro malformado"
+            continue
+        try:
+            yield numero, schema.model_validate(dados).model_dump(), None
+        except ValidationError as e:
+            campos = ", ".join(".".join(str(l) for l in erro["loc"]) for erro in e.errors())
+            yield numero, None, f"Campos inválidos: {campos}"
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from model.equipamento import Equipamento
 
 
@@ -22,20 +22,19 @@ class ListagemEquipamentoSchema(BaseModel):
     """ Define como a lista de equipamentos cadastrados deverá será retornada.
     """
     equipamentos:List[EquipamentoSchema]
+    limit: Optional[int] = None
+    next_cursor: Optional[str] = None
 
-def apresenta_equipamentos(equipamentos: List[Equipamento]):
-    """ Retorna uma representação do equipamento seguindo o schema definido em
-        EquipamentoSchema.
+# colunas selecionadas nas listagens, na ordem dos campos de CAMPOS_EQUIPAMENTO
+COLUNAS_EQUIPAMENTO = (Equipamento.nome, Equipamento.modelo, Equipamento.setor, Equipamento.impacto)
+CAMPOS_EQUIPAMENTO = ("nome", "modelo", "setor", "impacto")
+
+def apresenta_equipamentos_linhas(linhas):
+    """ Retorna uma representação dos equipamentos seguindo o schema definido em
+        EquipamentoSchema, a partir das linhas (tuplas) selecionadas com
+        COLUNAS_EQUIPAMENTO, sem instanciar objetos do ORM.
     """
-    result = []
-    for equipamento in equipamentos:
-        result.append({
-            "nome": equipamento.nome,
-            "modelo": equipamento.modelo,
-            "setor": equipamento.setor,
-            "impacto": equipamento.impacto,            
-        })
-    return {"equipamentos": result}
+    return {"equipamentos": [dict(zip(CAMPOS_EQUIPAMENTO, linha)) for linha in linhas]}
 
 class EquipamentoViewSchema(BaseModel):
     """Define como um  equipamento será retornado
@@ -51,6 +50,11 @@ class EquipamentoDelSchema(BaseModel):
     """
     mesage: str
     nome: str
+
+class EquipamentoLoteDelSchema(BaseModel):
+    """ Define os nomes dos equipamentos a remover em lote.
+    """
+    nomes: List[str] = Field(..., min_length=1, max_length=1000)
     
 
 def apresenta_equipamento(equipamento: Equipamento):
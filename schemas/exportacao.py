@@ -0,0 +1,65 @@
+from pydantic import BaseModel
+from typing import Literal
+from itertools import islice
+import csv
+import heapq
+import io
+import json
+
+
+class ExportacaoSchema(BaseModel):
+    """ Define o formato da exportação: csv (padrão) ou ndjson (um objeto JSON
+        por linha).
+    """
+    format: Literal["csv", "ndjson"] = "csv"
+
+
+class ExportacaoManutencaoSchema(ExportacaoSchema):
+    """ Define o formato da exportação de manutenções e se as manutenções
+        arquivadas são incluídas.
+    """
+    include_archived: bool = False
+
+
+TIPOS_EXPORTACAO = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def blocos_consulta(conexao, comandos, chave, tamanho: int):
+    """ Executa os comandos (selects já ordenados pela chave) com cursor no
+        servidor e gera as linhas em blocos de até tamanho linhas, sem carregar
+        o resultado inteiro em memória.
+
+    Com mais de um comando (por exemplo, a tabela ativa e o arquivo) as linhas
+    dos resultados são intercaladas pela função chave, como um só resultado.
+    """
+    resultados = [conexao.execution_options(stream_results=True, yield_per=tamanho).execute(comando)
+                  for comando in comandos]
+    linhas = resultados[0] if len(resultados) == 1 else heapq.merge(*resultados, key=chave)
+    while True:
+        bloco = list(islice(linhas, tamanho))
+        if not bloco:
+            return
+        yield bloco
+
+
+def exporta_blocos(blocos, campos, formato: str):
+    """ Gera o conteúdo da exportação no formato informado, um trecho de texto
+        por bloco de linhas. No csv o cabeçalho (campos) é o primeiro trecho.
+    """
+    if formato == "csv":
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, lineterminator="\n")
+        escritor.writerow(campos)
+        yield buffer.getvalue()
+        for bloco in blocos:
+            buffer.seek(0)
+            buffer.truncate()
+            escritor.writerows(bloco)
+            yield buffer.getvalue()
+    else:
+        codifica = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        for bloco in blocos:
+            yield "".join(codifica(dict(zip(campos, linha))) + "\n" for linha in bloco)
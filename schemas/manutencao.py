@@ -1,7 +1,13 @@
-from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
+from sqlalchemy import func, select
 from model.manutencao import Manutencao
+from model.equipamento import Equipamento
+from model.tecnico import Tecnico
+from schemas.paginacao import PaginacaoSchema
+from schemas.equipamento import EquipamentoViewSchema, COLUNAS_EQUIPAMENTO, CAMPOS_EQUIPAMENTO
+from schemas.tecnico import TecnicoSchema, COLUNAS_TECNICO, CAMPOS_TECNICO
 
 class ManutencaoSchema(BaseModel):
     """Define como uma manutencao em equipamento ao ser cadastrada
@@ -16,13 +22,6 @@ class ManutencaoSchema(BaseModel):
     comentario: str
     previsao_conclusao: datetime
 
-class ManutencaoBuscaSchema(BaseModel):
-    """ Define como deve ser a estrutura que representa a busca. Que será
-        feita com base no nome e status do equipamento.
-    """
-    nome_equipamento: Optional[str] = None
-    status: Optional[str]= None
-
 class ManutencaoIdSchema(BaseModel):
     '''Define como deve ser a estrutura de visualização feita separando
         cada status
@@ -34,29 +33,123 @@ class ManutencaoStatusSchema(BaseModel):
         cada status
     '''
     status: str
+    versao: Optional[int] = None #versão esperada, alternativa ao cabeçalho If-Match
+
+class ManutencaoPaginadoSchema(PaginacaoSchema):
+    '''Define os parâmetros da listagem de manutenções: paginação, os dados
+        relacionados a incluir em cada item (expand=equipamento,tecnico) e se
+        as manutenções arquivadas também são listadas (include_archived)
+    '''
+    expand: Optional[str] = None
+    include_archived: bool = False #inclui as manutenções concluídas já arquivadas
+
+class ManutencaoBuscaSchema(ManutencaoPaginadoSchema):
+    """ Define como deve ser a estrutura que representa a busca. Que será
+        feita com base no equipamento, técnico, status (um ou mais, separados
+        por vírgula), tipo de manutenção, setor do equipamento e intervalo da
+        previsão de conclusão, ordenada por id ou previsao_conclusao (prefixo
+        "-" para ordem decrescente).
+    """
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+    nome_equipamento: Optional[str] = None
+    matricula_tecnico: Optional[str] = None
+    status: Optional[str]= None
+    tipo_manutencao: Optional[str] = None
+    setor: Optional[str] = None
+    previsao_de: Optional[datetime] = None
+    previsao_ate: Optional[datetime] = None
+    ordem: Literal["id", "-id", "previsao_conclusao", "-previsao_conclusao"] = "id"
+
+class ManutencaoStatusPaginadoSchema(ManutencaoPaginadoSchema):
+    '''Define a busca por status com os parâmetros de paginação
+    '''
+    status: str
+
+class ManutencaoExpandidaSchema(ManutencaoSchema):
+    """ Define uma manutenção da listagem, com os dados do equipamento e do
+        técnico quando solicitados pelo parâmetro expand.
+    """
+    id: int
+    versao: int
+    equipamento: Optional[EquipamentoViewSchema] = None
+    tecnico: Optional[TecnicoSchema] = None
     
 class ListagemManutencaoSchema(BaseModel):
     """ Define como a lista de equipamentos em manutencao deverá será retornada.
     """
-    manutencoes:List[ManutencaoSchema]
+    manutencoes:List[ManutencaoExpandidaSchema]
+    limit: Optional[int] = None
+    next_cursor: Optional[str] = None
 
-def apresenta_manutencoes(manutencoes: List[Manutencao]):
-    """ Retorna uma representação do equipamento em manutencao seguindo o schema definido em
-        ManutencaoSchema.
+# colunas selecionadas nas listagens, na ordem dos campos de CAMPOS_MANUTENCAO.
+# A data é formatada pelo próprio SQLite, evitando converter cada valor em
+# datetime para depois chamar strftime
+COLUNAS_MANUTENCAO = (
+    Manutencao.id,
+    Manutencao.versao,
+    Manutencao.nome_equipamento,
+    Manutencao.matricula_tecnico,
+    Manutencao.status,
+    Manutencao.tipo_manutencao,
+    Manutencao.comentario,
+    func.strftime("%d/%m/%Y %H:%M", Manutencao.previsao_conclusao).label("previsao_conclusao"),
+)
+CAMPOS_MANUTENCAO = ("id", "versao", "nome_equipamento", "matricula_tecnico", "status",
+                     "tipo_manutencao", "comentario", "previsao_conclusao")
+
+def apresenta_manutencoes_linhas(linhas):
+    """ Retorna uma representação das manutenções seguindo o schema definido em
+        ManutencaoSchema, a partir das linhas (tuplas) selecionadas com
+        COLUNAS_MANUTENCAO, sem instanciar objetos do ORM.
     """
-    result = []
-    for manutencao in manutencoes:        
-        formatted_date = manutencao.previsao_conclusao.strftime("%d/%m/%Y %H:%M")
-        result.append({
-            "id":manutencao.id,
-            "nome_equipamento": manutencao.nome_equipamento,
-            "matricula_tecnico": manutencao.matricula_tecnico,
-            "status": manutencao.status,
-            "tipo_manutencao":manutencao.tipo_manutencao,
-            "comentario":manutencao.comentario,
-            "previsao_conclusao":formatted_date                        
-        })
-    return {"manutencoes": result}
+    return {"manutencoes": [dict(zip(CAMPOS_MANUTENCAO, linha)) for linha in linhas]}
+
+# dados relacionados que podem ser incluídos nas listagens: colunas, campos e
+# condição do join com a manutencao
+EXPANSOES = {
+    "equipamento": (COLUNAS_EQUIPAMENTO, CAMPOS_EQUIPAMENTO, Equipamento,
+                    Manutencao.nome_equipamento == Equipamento.nome),
+    "tecnico": (COLUNAS_TECNICO, CAMPOS_TECNICO, Tecnico,
+                Manutencao.matricula_tecnico == Tecnico.matricula),
+}
+
+def consulta_manutencoes(expand: Optional[str] = None):
+    """ Monta a consulta da listagem de manutenções e a função que apresenta
+        suas linhas.
+
+    Cada expansão informada em expand (separadas por vírgula) acrescenta um
+    LEFT JOIN à mesma consulta, de modo que os dados do equipamento e do técnico
+    são obtidos sem consultas adicionais por linha. Levanta ValueError para
+    expansões desconhecidas.
+    """
+    nomes = [nome.strip() for nome in (expand or "").split(",") if nome.strip()]
+    invalidos = [nome for nome in nomes if nome not in EXPANSOES]
+    if invalidos:
+        raise ValueError(f"Expansão inválida: {', '.join(invalidos)}")
+    if not nomes:
+        return select(*COLUNAS_MANUTENCAO), apresenta_manutencoes_linhas
+
+    consulta = select(*COLUNAS_MANUTENCAO).select_from(Manutencao)
+    partes = []
+    inicio = len(COLUNAS_MANUTENCAO)
+    for nome in dict.fromkeys(nomes):
+        colunas, campos, modelo, condicao = EXPANSOES[nome]
+        consulta = consulta.add_columns(*colunas).outerjoin(modelo, condicao)
+        partes.append((nome, campos, inicio, inicio + len(colunas)))
+        inicio += len(colunas)
+
+    def apresenta(linhas):
+        result = []
+        for linha in linhas:
+            item = dict(zip(CAMPOS_MANUTENCAO, linha))
+            for nome, campos, de, ate in partes:
+                valores = linha[de:ate]
+                # a chave primária é nula quando o registro relacionado não existe
+                item[nome] = dict(zip(campos, valores)) if any(v is not None for v in valores) else None
+            result.append(item)
+        return {"manutencoes": result}
+
+    return consulta, apresenta
 
 class ManutencaoViewSchema(BaseModel):
     """Define como uma manutencao em equipamento será retornada
@@ -66,7 +159,8 @@ class ManutencaoViewSchema(BaseModel):
     status: str
     tipo_manutencao: str
     comentario: str
-    previsao_conclusao: datetime    
+    previsao_conclusao: datetime
+    versao: int
 
 class ManutencaoDelSchema(BaseModel):
     """ Define como deve ser a estrutura do dado retornado após uma requisição
@@ -75,6 +169,42 @@ class ManutencaoDelSchema(BaseModel):
     mesage: str
     nome_equipamento: str
 
+class ManutencaoStatusLoteSchema(BaseModel):
+    """ Define a alteração de status de várias manutenções de uma só vez.
+
+    status_atual restringe a alteração às manutenções nesse status (ex.: de
+    "Fila de espera" para "Em manutenção") e versoes informa a versão esperada
+    de cada id, que não é alterado se tiver sido modificado nesse meio tempo.
+    """
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+    status: str
+    status_atual: Optional[str] = None
+    versoes: Dict[int, int] = {}
+
+class ManutencaoVersaoSchema(BaseModel):
+    """ Define uma manutenção alterada e a sua nova versão.
+    """
+    id: int
+    versao: int
+
+class ManutencaoConflitoSchema(ManutencaoVersaoSchema):
+    """ Define uma manutenção não alterada por conflito, com a versão e o status
+        atuais.
+    """
+    status: str
+
+class ManutencaoStatusLoteViewSchema(BaseModel):
+    """ Define como o resultado da alteração de status em lote é retornado.
+    """
+    alterados: List[ManutencaoVersaoSchema]
+    conflitos: List[ManutencaoConflitoSchema]
+    inexistentes: List[int]
+
+class ManutencaoLoteDelSchema(BaseModel):
+    """ Define os ids das manutenções a remover em lote.
+    """
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+
 def apresenta_manutencao(manutencao: Manutencao):
     """ Retorna uma representação do equipamento em manutencao seguindo o schema definido em
         ManutencaoSchema.
@@ -85,8 +215,30 @@ def apresenta_manutencao(manutencao: Manutencao):
         "status": manutencao.status,
         "tipo_manutencao": manutencao.tipo_manutencao,
         "comentario":manutencao.comentario,
-        "previsao_conclusao":manutencao.previsao_conclusao
+        "previsao_conclusao":manutencao.previsao_conclusao,
+        "versao":manutencao.versao
     }
 
 class ManutencaoPath(BaseModel):
-    id: int    
+    id: int
+
+class ResumoManutencaoViewSchema(BaseModel):
+    """ Define como o resumo das manutenções por status, tipo e impacto do
+        equipamento será retornado.
+    """
+    total: int
+    status: Dict[str, int]
+    tipo_manutencao: Dict[str, int]
+    impacto: Dict[str, int]
+
+def apresenta_resumo(contadores):
+    """ Retorna uma representação do resumo seguindo o schema definido em
+        ResumoManutencaoViewSchema, a partir das linhas (dimensao, valor,
+        quantidade) de resumo_manutencao.
+    """
+    resumo = {"status": {}, "tipo_manutencao": {}, "impacto": {}}
+    for dimensao, valor, quantidade in contadores:
+        if quantidade > 0 and dimensao in resumo:
+            resumo[dimensao][valor] = quantidade
+    resumo["total"] = sum(resumo["status"].values())
+    return resumo
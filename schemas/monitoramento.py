@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class PoolViewSchema(BaseModel):
+    """ Define como as estatísticas do pool de conexões serão retornadas
+    """
+    pool_size: int
+    max_overflow: int
+    em_uso: int
+    disponiveis: int
+    overflow: int
+    checkouts: int
+    checkins: int
+    conexoes_criadas: int
+    timeouts: int
+    espera_media_ms: float
+    espera_maxima_ms: float
+    leitura: Optional["PoolViewSchema"] = None #pool somente leitura, quando separado
@@ -0,0 +1,90 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from sqlalchemy import tuple_
+import base64
+import json
+
+
+class PaginacaoSchema(BaseModel):
+    """ Define os parâmetros de paginação por cursor (keyset) aceitos pelas
+        rotas de listagem.
+    """
+    limit: int = Field(100, ge=1, le=1000)
+    cursor: Optional[str] = None
+
+
+def codifica_cursor(chave) -> str:
+    """ Gera um cursor opaco a partir da chave do último item da página.
+    """
+    dados = json.dumps({"k": chave}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(dados).decode().rstrip("=")
+
+
+def _escalar(valor) -> bool:
+    return isinstance(valor, (str, int)) and not isinstance(valor, bool)
+
+
+def decodifica_cursor(cursor: str, colunas: int = 1):
+    """ Recupera a chave contida em um cursor gerado por codifica_cursor: um
+        valor (str ou int) ou, para chaves de mais de uma coluna, uma lista com
+        um valor por coluna terminada pelo id de desempate (int).
+
+    Levanta ValueError caso o cursor seja inválido.
+    """
+    try:
+        preenchimento = "=" * (-len(cursor) % 4)
+        dados = base64.urlsafe_b64decode(cursor + preenchimento)
+        chave = json.loads(dados)["k"]
+    except Exception as e:
+        raise ValueError("Cursor de paginação inválido") from e
+    valores = chave if colunas > 1 and isinstance(chave, list) else [chave]
+    if len(valores) != colunas or not all(_escalar(valor) for valor in valores) \
+            or (colunas > 1 and not isinstance(valores[-1], int)):
+        raise ValueError("Cursor de paginação inválido")
+    return chave
+
+
+def pagina_keyset(session, consulta, coluna, chave, paginacao: PaginacaoSchema,
+                  descendente: bool = False, converte=None, variantes=()):
+    """ Aplica paginação keyset sobre a consulta (select), ordenando pela coluna
+        informada e buscando apenas as linhas posteriores ao cursor. A função
+        chave extrai da linha o valor da coluna usado no cursor.
+
+    A coluna pode ser uma tupla de colunas (por exemplo, data e id para
+    desempate), caso em que a chave é uma lista de valores comparada como row
+    value. A função converte, se informada, transforma a chave lida do cursor
+    nos tipos esperados pelas colunas.
+
+    Cada função de variantes recebe o comando da página e retorna o comando
+    equivalente em outra tabela (por exemplo, a de registros arquivados): as
+    páginas de cada uma são combinadas pela chave, como uma só listagem.
+
+    Retorna a lista de linhas da página e o cursor da próxima página (None
+    quando não há mais linhas).
+    """
+    colunas = coluna if isinstance(coluna, tuple) else (coluna,)
+    if paginacao.cursor:
+        valor = decodifica_cursor(paginacao.cursor, len(colunas))
+        if converte:
+            try:
+                valor = converte(valor)
+            except (TypeError, ValueError, IndexError) as e:
+                raise ValueError("Cursor de paginação inválido") from e
+        if len(colunas) > 1:
+            esquerda, direita = tuple_(*colunas), tuple_(*valor)
+        else:
+            esquerda, direita = colunas[0], valor
+        consulta = consulta.where(esquerda < direita if descendente else esquerda > direita)
+    ordem = [c.desc() for c in colunas] if descendente else list(colunas)
+    # busca uma linha a mais para saber se existe próxima página
+    comando = consulta.order_by(*ordem).limit(paginacao.limit + 1)
+    linhas = session.execute(comando).all()
+    if variantes:
+        for variante in variantes:
+            linhas.extend(session.execute(variante(comando)).all())
+        linhas.sort(key=chave, reverse=descendente)
+    next_cursor = None
+    if len(linhas) > paginacao.limit:
+        linhas = linhas[:paginacao.limit]
+        next_cursor = codifica_cursor(chave(linhas[-1]))
+    return linhas, next_cursor
@@ -0,0 +1,240 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date, timedelta
+from sqlalchemy import func, literal, or_, select, union_all
+from model.relatorios import RelatorioDiario
+from model.resumo import ResumoManutencao
+from model.tecnico import Tecnico
+
+
+# período padrão dos relatórios de conclusões, em dias até hoje
+DIAS_RELATORIO = 30
+
+# limites (em dias) das faixas de idade das manutenções abertas
+FAIXAS_IDADE = (7, 30, 90)
+
+
+class RelatorioPeriodoSchema(BaseModel):
+    """ Define o período (datas de conclusão) dos relatórios. Por padrão são
+        considerados os últimos 30 dias até hoje.
+    """
+    de: Optional[date] = None
+    ate: Optional[date] = None
+
+
+class RelatorioAbertasSchema(BaseModel):
+    """ Define o filtro do relatório de idade das manutenções abertas: o setor
+        dos equipamentos (todos, se não informado).
+    """
+    setor: Optional[str] = None
+
+
+class MttrEquipamentoSchema(BaseModel):
+    nome_equipamento: str
+    concluidas: int
+    mttr_horas: float
+
+
+class RelatorioMttrViewSchema(BaseModel):
+    """ Define como o tempo médio de reparo (MTTR) das manutenções concluídas
+        no período será retornado, no geral e por equipamento (maiores primeiro).
+    """
+    de: str
+    ate: str
+    concluidas: int
+    mttr_horas: Optional[float] = None
+    equipamentos: List[MttrEquipamentoSchema]
+
+
+class FaixaIdadeSchema(BaseModel):
+    faixa: str
+    quantidade: int
+
+
+class RelatorioAbertasViewSchema(BaseModel):
+    """ Define como a idade (dias desde a abertura) das manutenções abertas
+        será retornada, com a quantidade em cada faixa de idade.
+    """
+    setor: Optional[str] = None
+    total: int
+    idade_media_dias: Optional[float] = None
+    mais_antiga: Optional[str] = None #data de abertura (AAAA-MM-DD)
+    faixas: List[FaixaIdadeSchema]
+
+
+class BacklogSetorSchema(BaseModel):
+    setor: str
+    abertas: int
+    idade_media_dias: float
+
+
+class RelatorioBacklogViewSchema(BaseModel):
+    """ Define como as manutenções abertas por setor serão retornadas (maiores
+        backlogs primeiro).
+    """
+    total: int
+    setores: List[BacklogSetorSchema]
+
+
+class CargaTecnicoSchema(BaseModel):
+    matricula: str
+    nome: Optional[str] = None
+    abertas: int
+    concluidas: int
+    horas_reparo: float
+
+
+class CargaTurnoSchema(BaseModel):
+    turno: str
+    abertas: int
+    concluidas: int
+    tecnicos: List[CargaTecnicoSchema]
+
+
+class RelatorioCargaViewSchema(BaseModel):
+    """ Define como a carga de trabalho dos técnicos será retornada, agrupada
+        por turno: manutenções abertas atribuídas a cada técnico e manutenções
+        concluídas (e horas de reparo) no período.
+    """
+    de: str
+    ate: str
+    turnos: List[CargaTurnoSchema]
+
+
+def periodo_relatorio(query: RelatorioPeriodoSchema, hoje: date = None):
+    """ Retorna as datas (de, ate) do período informado, completando as
+        ausentes com o período padrão. Levanta ValueError se de for posterior a
+        ate.
+    """
+    ate = query.ate or hoje or date.today()
+    de = query.de or ate - timedelta(days=DIAS_RELATORIO - 1)
+    if de > ate:
+        raise ValueError("A data inicial do período é posterior à data final")
+    return de, ate
+
+
+def consulta_mttr(de: date, ate: date):
+    """ Monta a consulta das conclusões por equipamento no período:
+        (equipamento, quantidade, segundos de reparo).
+    """
+    return (select(RelatorioDiario.valor, func.sum(RelatorioDiario.quantidade),
+                   func.sum(RelatorioDiario.soma_segundos))
+            .where(RelatorioDiario.dimensao == "conclusao_equipamento",
+                   RelatorioDiario.dia.between(de, ate))
+            .group_by(RelatorioDiario.valor))
+
+
+def consulta_abertas(setor: Optional[str] = None):
+    """ Monta a consulta das manutenções abertas por dia de abertura:
+        (dia, setor, quantidade).
+    """
+    consulta = (select(RelatorioDiario.dia, RelatorioDiario.valor, RelatorioDiario.quantidade)
+                .where(RelatorioDiario.dimensao == "abertas_setor", RelatorioDiario.quantidade != 0))
+    if setor is not None:
+        consulta = consulta.where(RelatorioDiario.valor == setor)
+    return consulta
+
+
+def consulta_carga(de: date, ate: date):
+    """ Monta a consulta da carga de cada técnico: (turno, matrícula, nome,
+        abertas, concluídas no período, segundos de reparo no período).
+    """
+    # abertas: contador atual do técnico; concluídas: linhas diárias do período
+    linhas = union_all(
+        select(ResumoManutencao.valor.label("matricula"), ResumoManutencao.quantidade.label("abertas"),
+               literal(0).label("concluidas"), literal(0.0).label("segundos"))
+        .where(ResumoManutencao.dimensao == "abertas_tecnico"),
+        select(RelatorioDiario.valor, literal(0), RelatorioDiario.quantidade, RelatorioDiario.soma_segundos)
+        .where(RelatorioDiario.dimensao == "conclusao_tecnico", RelatorioDiario.dia.between(de, ate)),
+    ).subquery()
+    carga = (select(linhas.c.matricula, func.sum(linhas.c.abertas).label("abertas"),
+                    func.sum(linhas.c.concluidas).label("concluidas"),
+                    func.sum(linhas.c.segundos).label("segundos"))
+             .group_by(linhas.c.matricula)
+             .subquery())
+    return (select(Tecnico.turno, carga.c.matricula, Tecnico.nome, carga.c.abertas,
+                   carga.c.concluidas, carga.c.segundos)
+            .outerjoin(Tecnico, Tecnico.matricula == carga.c.matricula)
+            .where(or_(carga.c.abertas != 0, carga.c.concluidas != 0))
+            .order_by(Tecnico.turno, carga.c.matricula))
+
+
+def _horas(segundos: float) -> float:
+    return round(segundos / 3600, 2)
+
+
+def apresenta_mttr(linhas, de: date, ate: date):
+    """ Retorna uma representação do MTTR seguindo o schema definido em
+        RelatorioMttrViewSchema, a partir das linhas de consulta_mttr.
+    """
+    equipamentos = [{"nome_equipamento": nome, "concluidas": quantidade,
+                     "mttr_horas": _horas(segundos / quantidade)}
+                    for nome, quantidade, segundos in linhas if quantidade > 0]
+    equipamentos.sort(key=lambda e: (-e["mttr_horas"], e["nome_equipamento"]))
+    concluidas = sum(quantidade for _, quantidade, _ in linhas if quantidade > 0)
+    segundos = sum(segundos for _, quantidade, segundos in linhas if quantidade > 0)
+    return {"de": de.isoformat(), "ate": ate.isoformat(), "concluidas": concluidas,
+            "mttr_horas": _horas(segundos / concluidas) if concluidas else None,
+            "equipamentos": equipamentos}
+
+
+def _faixa(idade: int) -> str:
+    inicio = 0
+    for limite in FAIXAS_IDADE:
+        if idade <= limite:
+            return f"{inicio}-{limite}"
+        inicio = limite + 1
+    return f"{inicio}+"
+
+
+def apresenta_abertas(linhas, setor: Optional[str] = None, hoje: date = None):
+    """ Retorna uma representação da idade das manutenções abertas seguindo o
+        schema definido em RelatorioAbertasViewSchema, a partir das linhas de
+        consulta_abertas.
+    """
+    hoje = hoje or date.today()
+    faixas = dict.fromkeys([_faixa(limite) for limite in FAIXAS_IDADE] + [_faixa(FAIXAS_IDADE[-1] + 1)], 0)
+    total, dias, mais_antiga = 0, 0, None
+    for dia, _, quantidade in linhas:
+        idade = max((hoje - dia).days, 0)
+        faixas[_faixa(idade)] += quantidade
+        total += quantidade
+        dias += idade * quantidade
+        if quantidade > 0 and (mais_antiga is None or dia < mais_antiga):
+            mais_antiga = dia
+    return {"setor": setor, "total": total,
+            "idade_media_dias": round(dias / total, 1) if total else None,
+            "mais_antiga": mais_antiga.isoformat() if mais_antiga else None,
+            "faixas": [{"faixa": faixa, "quantidade": quantidade} for faixa, quantidade in faixas.items()]}
+
+
+def apresenta_backlog(linhas, hoje: date = None):
+    """ Retorna uma representação das manutenções abertas por setor seguindo o
+        schema definido em RelatorioBacklogViewSchema, a partir das linhas de
+        consulta_abertas.
+    """
+    hoje = hoje or date.today()
+    setores = {}
+    for dia, setor, quantidade in linhas:
+        abertas, dias = setores.get(setor, (0, 0))
+        setores[setor] = (abertas + quantidade, dias + max((hoje - dia).days, 0) * quantidade)
+    backlog = [{"setor": setor, "abertas": abertas, "idade_media_dias": round(dias / abertas, 1)}
+               for setor, (abertas, dias) in setores.items() if abertas > 0]
+    backlog.sort(key=lambda s: (-s["abertas"], s["setor"]))
+    return {"total": sum(s["abertas"] for s in backlog), "setores": backlog}
+
+
+def apresenta_carga(linhas, de: date, ate: date):
+    """ Retorna uma representação da carga dos técnicos por turno seguindo o
+        schema definido em RelatorioCargaViewSchema, a partir das linhas de
+        consulta_carga.
+    """
+    turnos = {}
+    for turno, matricula, nome, abertas, concluidas, segundos in linhas:
+        grupo = turnos.setdefault(turno or "", {"turno": turno or "", "abertas": 0, "concluidas": 0,
+                                                "tecnicos": []})
+        grupo["abertas"] += abertas
+        grupo["concluidas"] += concluidas
+        grupo["tecnicos"].append({"matricula": matricula, "nome": nome, "abertas": abertas,
+                                  "concluidas": concluidas, "horas_reparo": _horas(segundos)})
+    return {"de": de.isoformat(), "ate": ate.isoformat(), "turnos": list(turnos.values())}
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 from model.tecnico import Tecnico
 
@@ -22,19 +22,19 @@ class ListagemTecnicoSchema(BaseModel):
     """ Define como a lista de tecnicos cadastrados deverá será retornada.
     """
     tecnicos:List[TecnicoSchema]
+    limit: Optional[int] = None
+    next_cursor: Optional[str] = None
 
-def apresenta_tecnicos(tecnicos: List[Tecnico]):
-    """ Retorna uma representação do cadastro do tecnico seguindo o schema definido em
-        TecnicoSchema.
+# colunas selecionadas nas listagens, na ordem dos campos de CAMPOS_TECNICO
+COLUNAS_TECNICO = (Tecnico.nome, Tecnico.matricula, Tecnico.turno)
+CAMPOS_TECNICO = ("nome", "matricula", "turno")
+
+def apresenta_tecnicos_linhas(linhas):
+    """ Retorna uma representação dos técnicos seguindo o schema definido em
+        TecnicoSchema, a partir das linhas (tuplas) selecionadas com
+        COLUNAS_TECNICO, sem instanciar objetos do ORM.
     """
-    result = []
-    for tecnico in tecnicos:
-        result.append({
-            "nome": tecnico.nome,
-            "matricula": tecnico.matricula,
-            "turno": tecnico.turno,                       
-        })
-    return {"tecnicos": result}
+    return {"tecnicos": [dict(zip(CAMPOS_TECNICO, linha)) for linha in linhas]}
 
 class TecnicoViewSchema(BaseModel):
     """Define como deve ser a estrutura do dado para ser retornado 
@@ -50,6 +50,12 @@ class TecnicoDelSchema(BaseModel):
     nome: str
     matricula: str
 
+class TecnicoLoteDelSchema(BaseModel):
+    """ Define as matrículas dos técnicos a remover em lote.
+    """
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+    matriculas: List[str] = Field(..., min_length=1, max_length=1000)
+
 def apresenta_tecnico(tecnico: Tecnico):
     """ Retorna uma representação dos dados do tecnico seguindo o schema definido em
         TecnicoSchema.
@@ -0,0 +1,70 @@
+""" Base dos testes: a aplicação é criada e inicializada uma vez por processo
+    sobre um banco temporário, cujos registros são removidos antes de cada
+    teste. Para executar: python -m nose2 -v
+"""
+from datetime import datetime, timedelta
+import atexit
+import shutil
+import tempfile
+import unittest
+
+DIRETORIO = tempfile.mkdtemp(prefix="teste_manutencao_")
+atexit.register(shutil.rmtree, DIRETORIO, ignore_errors=True)
+
+from app import create_app, inicializa, cache_respostas
+from model import obtem_engine, roteia_sessao
+
+app = create_app({"DB_PATH": DIRETORIO, "LOG_PATH": DIRETORIO, "LOG_LEVEL": "CRITICAL", "LOG_QUEUE": False,
+                  "CHANGES_COMPACTION_INTERVAL": 0})
+inicializa(app)
+
+# tabelas esvaziadas antes de cada teste (a ordem respeita as chaves estrangeiras)
+TABELAS = ("manutencao", "manutencao_arquivo", "equipamentos", "tecnicos", "alteracoes",
+           "compactacao_alteracoes")
+
+
+def limpa_banco():
+    with obtem_engine().begin() as conn:
+        for tabela in TABELAS:
+            conn.exec_driver_sql(f"DELETE FROM {tabela}")
+    cache_respostas.invalida()
+
+
+def lista(resposta) -> list:
+    """ Retorna as manutenções de uma resposta de listagem, com ou sem
+        registros (a listagem vazia usa a chave "manutenções").
+    """
+    corpo = resposta.get_json()
+    return corpo.get("manutencoes", corpo.get("manutenções"))
+
+
+class TesteApi(unittest.TestCase):
+    """ Caso de teste com o cliente da aplicação e um banco vazio.
+    """
+
+    def setUp(self):
+        roteia_sessao(False)
+        limpa_banco()
+        self.cliente = app.test_client()
+
+    def cria_equipamento(self, nome="E1", setor="S1", impacto="Alto"):
+        resposta = self.cliente.post("/equipamento", data={"nome": nome, "modelo": "M",
+                                                           "impacto": impacto, "setor": setor})
+        self.assertEqual(resposta.status_code, 200, resposta.get_json())
+
+    def cria_tecnico(self, matricula="T1", nome="Técnico", turno="Manhã"):
+        resposta = self.cliente.post("/tecnico", data={"nome": nome, "matricula": matricula, "turno": turno})
+        self.assertEqual(resposta.status_code, 200, resposta.get_json())
+
+    def cria_manutencao(self, status="Pendente", equipamento="E1", tecnico="T1", dias=0,
+                        tipo="Corretiva", comentario="troca de peça"):
+        """ Cadastra uma manutenção com previsão de conclusão dias atrás e
+            retorna o seu id.
+        """
+        previsao = (datetime.now() - timedelta(days=dias)).strftime("%Y-%m-%dT%H:%M")
+        resposta = self.cliente.post("/manutencao", data={
+            "nome_equipamento": equipamento, "matricula_tecnico": tecnico, "status": status,
+            "tipo_manutencao": tipo, "previsao_conclusao": previsao, "comentario": comentario})
+        self.assertEqual(resposta.status_code, 200, resposta.get_json())
+        with obtem_engine().connect() as conn:
+            return conn.exec_driver_sql("SELECT MAX(pk_id) FROM manutencao").scalar()
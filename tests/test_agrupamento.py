@@ -0,0 +1,54 @@
+from unittest import mock
+import queue
+import time
+
+from model import escrita_agrupada
+from tests.base import TesteApi
+
+
+class TestaEscritaAgrupada(TesteApi):
+
+    def setUp(self):
+        super().setUp()
+        escrita_agrupada.configura(ativa=True, espera_ms=50)
+        self.addCleanup(escrita_agrupada.configura, ativa=False, espera_ms=5000)
+
+    def cadastra(self, matricula):
+        return self.cliente.post("/tecnico", data={"nome": "Técnico", "matricula": matricula, "turno": "Manhã"})
+
+    def matriculas(self):
+        return [t["matricula"] for t in self.cliente.get("/tecnicos").get_json()["tecnicos"]]
+
+    def test_cadastro_e_conflito_pelo_grupo(self):
+        self.assertEqual(self.cadastra("T1").status_code, 200)
+        self.assertEqual(self.cadastra("T1").status_code, 409)
+        self.assertEqual(self.matriculas(), ["T1"])
+
+    def test_sem_thread_de_escrita_insere_em_transacao_propria(self):
+        # fila que nenhuma thread de escrita atende
+        fila = queue.SimpleQueue()
+        with mock.patch.object(escrita_agrupada, "_fila", fila):
+            resposta = self.cadastra("T2")
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(self.matriculas(), ["T2"])
+        # a inserção retirada da fila não é repetida quando a thread a alcança
+        grupos = escrita_agrupada.grupos
+        escrita_agrupada._inicia()
+        escrita_agrupada._fila.put(fila.get_nowait())
+        self.assertEqual(self.cadastra("T3").status_code, 200)
+        self.assertEqual(self.matriculas(), ["T2", "T3"])
+        self.assertEqual(escrita_agrupada.grupos - grupos, 1)
+
+    def test_grupo_em_andamento_aguarda_a_transacao(self):
+        # o grupo que já reservou o registro termina depois da espera da
+        # requisição, que responde com o resultado do grupo
+        efetiva = escrita_agrupada._efetiva
+
+        def efetiva_devagar(grupo):
+            time.sleep(escrita_agrupada.espera * 4)
+            efetiva(grupo)
+
+        with mock.patch.object(escrita_agrupada, "_efetiva", efetiva_devagar):
+            resposta = self.cadastra("T4")
+        self.assertEqual(resposta.status_code, 200, resposta.get_json())
+        self.assertEqual(self.matriculas(), ["T4"])
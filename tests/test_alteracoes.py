@@ -0,0 +1,106 @@
+from unittest import mock
+import threading
+
+import consultas
+from model import obtem_engine, compacta_alteracoes, compactacao_alteracoes
+from model.alteracoes import CompactacaoPeriodica
+from tests.base import TesteApi
+
+
+def ultimo_seq() -> int:
+    with obtem_engine().connect() as conn:
+        return conn.exec_driver_sql("SELECT COALESCE(MAX(seq), 0) FROM alteracoes").scalar()
+
+
+def entradas_log() -> int:
+    with obtem_engine().connect() as conn:
+        return conn.exec_driver_sql("SELECT COUNT(*) FROM alteracoes").scalar()
+
+
+class TestaAlteracoes(TesteApi):
+
+    def setUp(self):
+        super().setUp()
+        self.cria_equipamento("E1")
+        self.cria_tecnico("T1")
+        self.since = ultimo_seq()
+
+    def alteracoes(self, since):
+        resposta = self.cliente.get(f"/changes?since={since}")
+        self.assertEqual(resposta.status_code, 200, resposta.get_json())
+        return resposta.get_json()
+
+    def test_delta_com_estado_atual_e_remocoes(self):
+        id = self.cria_manutencao()
+        corpo = self.alteracoes(self.since)
+        self.assertEqual([(a["tabela"], a["chave"], a["operacao"]) for a in corpo["alteracoes"]],
+                         [("manutencao", str(id), "insert")])
+        self.assertEqual(corpo["alteracoes"][0]["dados"]["status"], "Pendente")
+        self.assertEqual(corpo["next_since"], ultimo_seq())
+
+        self.assertEqual(self.cliente.delete(f"/manutencao?id={id}").status_code, 200)
+        corpo = self.alteracoes(corpo["next_since"])
+        self.assertEqual([(a["chave"], a["operacao"], a["dados"]) for a in corpo["alteracoes"]],
+                         [(str(id), "delete", None)])
+        self.assertEqual(self.alteracoes(corpo["next_since"])["alteracoes"], [])
+
+    def test_leituras_no_mesmo_estado_do_banco(self):
+        # uma escrita efetivada depois da leitura do horizonte não aparece
+        # nas entradas nem nos estados da mesma resposta
+        original = consultas.horizonte_alteracoes
+
+        def horizonte_e_escrita(conn):
+            horizonte = original(conn)
+            with obtem_engine().begin() as escrita:
+                escrita.exec_driver_sql("UPDATE equipamentos SET setor = 'S9' WHERE pk_nome = 'E1'")
+            return horizonte
+
+        with mock.patch.object(consultas, "horizonte_alteracoes", horizonte_e_escrita):
+            corpo = self.alteracoes(0)
+        equipamentos = [a for a in corpo["alteracoes"] if a["tabela"] == "equipamentos"]
+        self.assertEqual([(a["operacao"], a["dados"]["setor"]) for a in equipamentos], [("insert", "S1")])
+        self.assertEqual(corpo["next_since"], self.since)
+
+        corpo = self.alteracoes(corpo["next_since"])
+        self.assertEqual([(a["operacao"], a["dados"]["setor"]) for a in corpo["alteracoes"]], [("update", "S9")])
+
+    def test_horizonte_compactado(self):
+        self.assertEqual(self.cliente.delete("/tecnico?matricula=T1").status_code, 200)
+        remocao = ultimo_seq()
+        with obtem_engine().begin() as conn:
+            conn.exec_driver_sql("UPDATE alteracoes SET momento = '2000-01-01 00:00:00.000000'")
+            compacta_alteracoes(conn, 1)
+        resposta = self.cliente.get(f"/changes?since={self.since}")
+        self.assertEqual(resposta.status_code, 410)
+        self.assertEqual(resposta.get_json()["next_since"], remocao)
+
+
+class TestaCompactacao(TesteApi):
+
+    def test_escritas_nao_compactam_o_log(self):
+        self.cria_equipamento("E1")
+        self.cria_tecnico("T1")
+        id = self.cria_manutencao()
+        for status in ("Em andamento", "Pronto"):
+            resposta = self.cliente.patch(f"/manutencao/{id}", data={"status": status})
+            self.assertEqual(resposta.status_code, 200, resposta.get_json())
+        self.assertEqual(entradas_log(), 5)
+        self.assertEqual(compactacao_alteracoes.compacta(), 2)
+        self.assertEqual(entradas_log(), 3)
+
+    def test_compactacao_periodica(self):
+        compactou = threading.Event()
+        compactacao = CompactacaoPeriodica(obtem_engine)
+        compactacao.configura(intervalo=0.01)
+        with mock.patch.object(compactacao, "compacta", compactou.set):
+            compactacao.inicia()
+            try:
+                self.assertTrue(compactou.wait(5))
+            finally:
+                compactacao.para()
+
+    def test_desativada(self):
+        compactacao = CompactacaoPeriodica(obtem_engine)
+        compactacao.configura(intervalo=0)
+        compactacao.inicia()
+        self.assertIsNone(compactacao._thread)
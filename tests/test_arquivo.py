@@ -0,0 +1,54 @@
+from model import Session, arquiva_manutencoes
+from tests.base import TesteApi, lista
+
+
+class TestaArquivo(TesteApi):
+
+    def setUp(self):
+        super().setUp()
+        self.cria_equipamento("E1", setor="S1")
+        self.cria_equipamento("E2", setor="S2")
+        self.cria_tecnico("T1")
+        self.cria_tecnico("T2")
+        self.pendente = self.cria_manutencao(status="Pendente", equipamento="E2", tecnico="T2")
+        self.recente = self.cria_manutencao(status="Pronto", equipamento="E2", tecnico="T2", dias=1)
+        self.antiga = self.cria_manutencao(status="Pronto", equipamento="E2", tecnico="T2", dias=400)
+        # a de maior id vai para o arquivo: um novo cadastro não pode reaproveitá-lo
+        self.ultima = self.cria_manutencao(status="Pronto", equipamento="E1", tecnico="T1", dias=400)
+        self.assertEqual(arquiva_manutencoes(Session(), lote=1, pausa=0), 2)
+        Session.remove()
+
+    def ids(self, consulta):
+        resposta = self.cliente.get(consulta)
+        self.assertEqual(resposta.status_code, 200, resposta.get_json())
+        return [manutencao["id"] for manutencao in lista(resposta)]
+
+    def test_listagens_com_arquivadas(self):
+        self.assertEqual(self.ids("/manutencoes"), [self.pendente, self.recente])
+        self.assertEqual(self.ids("/manutencoes?include_archived=true"),
+                         [self.pendente, self.recente, self.antiga, self.ultima])
+        self.assertEqual(self.ids("/manutencoes/status?status=Pronto&include_archived=true"),
+                         [self.recente, self.antiga, self.ultima])
+
+    def test_busca_com_filtros_sem_indice_no_arquivo(self):
+        consulta = "/manutencoes/busca?status=Pronto&tipo_manutencao=Corretiva&nome_equipamento=E2"
+        self.assertEqual(self.ids(consulta), [self.recente])
+        self.assertEqual(self.ids(consulta + "&include_archived=true"), [self.recente, self.antiga])
+        consulta = "/manutencoes/busca?status=Pronto&previsao_de=2019-01-01&matricula_tecnico=T2"
+        self.assertEqual(self.ids(consulta + "&include_archived=true"), [self.recente, self.antiga])
+        self.assertEqual(self.ids("/manutencoes/busca?setor=S1&include_archived=true"), [self.ultima])
+
+    def test_resumo_e_remocao_consideram_o_arquivo(self):
+        self.assertEqual(self.cliente.get("/manutencoes/resumo").get_json()["total"], 4)
+        resposta = self.cliente.delete("/equipamento?nome=E1")
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("manutenção vinculada", resposta.get_json()["mesage"])
+        self.assertEqual(self.cliente.delete("/tecnico?matricula=T1").status_code, 400)
+
+    def test_ids_nao_reaproveitados(self):
+        novo = self.cria_manutencao()
+        self.assertGreater(novo, self.ultima)
+        self.assertEqual(self.cliente.delete(f"/manutencao?id={novo}").status_code, 200)
+        self.assertGreater(self.cria_manutencao(), novo)
+        ids = self.ids("/manutencoes?include_archived=true")
+        self.assertEqual(len(ids), len(set(ids)))
@@ -0,0 +1,86 @@
+from starlette.testclient import TestClient
+
+from app import cache_respostas
+from asgi import app as app_asgi
+from model import Session, arquiva_manutencoes
+from schemas.paginacao import codifica_cursor
+from tests.base import TesteApi
+from tests.test_metricas import valor
+
+
+# consultas atendidas pelas rotas assíncronas, comparadas com a aplicação Flask
+CONSULTAS = [
+    "/equipamentos?limit=2",
+    "/tecnicos",
+    "/manutencoes?limit=3",
+    "/manutencoes?include_archived=true&expand=equipamento,tecnico",
+    "/manutencoes/status?status=Pendente",
+    "/manutencoes/busca?ordem=-previsao_conclusao&limit=2",
+    "/manutencoes/busca?setor=S2",
+    "/manutencoes/busca?status=Pronto&tipo_manutencao=Corretiva&nome_equipamento=E2&include_archived=true",
+    "/manutencoes/busca?status=Pronto&previsao_de=2019-01-01&matricula_tecnico=T2&include_archived=true",
+    "/manutencoes/resumo",
+    "/relatorios/mttr",
+    "/relatorios/abertas?setor=S1",
+    "/relatorios/backlog",
+    "/relatorios/carga-tecnicos",
+    "/busca?q=garfo",
+    "/changes?since=0&limit=5",
+    # erros
+    f"/equipamentos?cursor={codifica_cursor([1, 2])}",
+    "/manutencoes?cursor=invalido",
+    "/relatorios/mttr?de=2024-02-01&ate=2024-01-01",
+]
+
+
+class TestaAsgi(TesteApi):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.asgi = TestClient(app_asgi)
+        cls.asgi.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.asgi.__exit__(None, None, None)
+
+    def setUp(self):
+        super().setUp()
+        self.cria_equipamento("E1", setor="S1")
+        self.cria_equipamento("E2", setor="S2", impacto="Baixo")
+        self.cria_tecnico("T1")
+        self.cria_tecnico("T2", turno="Tarde")
+        for indice in range(6):
+            self.cria_manutencao(status="Pronto" if indice % 2 else "Pendente", equipamento=f"E{indice % 2 + 1}",
+                                 tecnico=f"T{indice % 2 + 1}", dias=400 if indice < 3 else indice,
+                                 comentario="troca de garfo" if indice < 2 else "revisão")
+        arquiva_manutencoes(Session(), lote=10, pausa=0)
+        Session.remove()
+
+    def test_respostas_iguais_nos_dois_modos(self):
+        for consulta in CONSULTAS:
+            cache_respostas.invalida()
+            flask = self.cliente.get(consulta)
+            cache_respostas.invalida()
+            asgi = self.asgi.get(consulta)
+            self.assertEqual(asgi.status_code, flask.status_code, consulta)
+            self.assertEqual(asgi.json(), flask.get_json(), consulta)
+
+    def test_escritas_repassadas_a_aplicacao_flask(self):
+        resposta = self.asgi.post("/tecnico", data={"nome": "Novo", "matricula": "T3", "turno": "Noite"})
+        self.assertEqual(resposta.status_code, 200)
+        matriculas = [t["matricula"] for t in self.asgi.get("/tecnicos").json()["tecnicos"]]
+        self.assertEqual(matriculas, ["T1", "T2", "T3"])
+
+    def test_etag_compartilhado(self):
+        etag = self.cliente.get("/equipamentos").headers["ETag"]
+        resposta = self.asgi.get("/equipamentos", headers={"If-None-Match": etag})
+        self.assertEqual(resposta.status_code, 304)
+
+    def test_metricas_de_sql_das_rotas_assincronas(self):
+        comandos = 'http_request_db_statements_sum{method="GET",route="/manutencoes"}'
+        antes = self.cliente.get("/metrics").get_data(as_text=True)
+        cache_respostas.invalida()
+        self.assertEqual(self.asgi.get("/manutencoes").status_code, 200)
+        depois = self.cliente.get("/metrics").get_data(as_text=True)
+        self.assertGreater(valor(depois, comandos) - valor(antes, comandos), 0)
@@ -0,0 +1,47 @@
+from schemas.paginacao import codifica_cursor
+from tests.base import TesteApi, lista
+from tests.test_paginacao import cursor_json
+
+
+class TestaBusca(TesteApi):
+
+    def setUp(self):
+        super().setUp()
+        self.cria_equipamento("E1", setor="S1")
+        self.cria_equipamento("E2", setor="S2")
+        self.cria_tecnico("T1")
+        # ids em ordem inversa das datas de previsão
+        self.ids = [self.cria_manutencao(status="Pronto" if indice % 2 else "Pendente",
+                                         equipamento=f"E{indice % 2 + 1}", dias=indice) for indice in range(5)]
+
+    def percorre(self, consulta):
+        ids, cursor = [], None
+        while True:
+            resposta = self.cliente.get(consulta + "&limit=2" + (f"&cursor={cursor}" if cursor else ""))
+            self.assertEqual(resposta.status_code, 200, resposta.get_json())
+            ids += [m["id"] for m in lista(resposta)]
+            cursor = resposta.get_json()["next_cursor"]
+            if not cursor:
+                return ids
+
+    def test_paginas_na_ordem_pedida(self):
+        self.assertEqual(self.percorre("/manutencoes/busca?ordem=-previsao_conclusao"), self.ids)
+        self.assertEqual(self.percorre("/manutencoes/busca?ordem=previsao_conclusao"), self.ids[::-1])
+        self.assertEqual(self.percorre("/manutencoes/busca?ordem=-id"), self.ids[::-1])
+
+    def test_filtros_combinados(self):
+        self.assertEqual(self.percorre("/manutencoes/busca?status=Pronto"), self.ids[1::2])
+        self.assertEqual(self.percorre("/manutencoes/busca?setor=S1&status=Pendente,Pronto"), self.ids[::2])
+        self.assertEqual(self.percorre("/manutencoes/busca?nome_equipamento=E2&tipo_manutencao=Preventiva"), [])
+
+    def test_cursor_malformado_retorna_400(self):
+        for cursor in ("nao-e-base64!", cursor_json([1, 2]), cursor_json({"a": 1}), cursor_json(None)):
+            resposta = self.cliente.get(f"/manutencoes/busca?cursor={cursor}")
+            self.assertEqual(resposta.status_code, 400, cursor)
+            self.assertIn("mesage", resposta.get_json())
+        for chave in (7, ["2024-01-01T00:00:00", "7"], ["x", 7]):
+            resposta = self.cliente.get(f"/manutencoes/busca?ordem=previsao_conclusao&cursor={cursor_json(chave)}")
+            self.assertEqual(resposta.status_code, 400, chave)
+        # cursor de outra ordenação (chave simples) na ordenação por data
+        resposta = self.cliente.get(f"/manutencoes/busca?ordem=-previsao_conclusao&cursor={codifica_cursor(3)}")
+        self.assertEqual(resposta.status_code, 400)
@@ -0,0 +1,32 @@
+from tests.base import TesteApi
+
+
+class TestaBuscaTexto(TesteApi):
+
+    def setUp(self):
+        super().setUp()
+        self.cria_equipamento("Empilhadeira")
+        self.cria_tecnico()
+        self.garfo = self.cria_manutencao(equipamento="Empilhadeira", comentario="troca do garfo dianteiro")
+        self.eletrica = self.cria_manutencao(equipamento="Empilhadeira", comentario="revisão elétrica")
+
+    def busca(self, q):
+        resposta = self.cliente.get(f"/busca?q={q}")
+        self.assertEqual(resposta.status_code, 200)
+        corpo = resposta.get_json()
+        return [e["nome"] for e in corpo["equipamentos"]], [m["id"] for m in corpo["manutencoes"]]
+
+    def test_prefixos_sem_diferenciar_acentos(self):
+        self.assertEqual(self.busca("garf"), ([], [self.garfo]))
+        self.assertEqual(self.busca("ELETRICA"), ([], [self.eletrica]))
+        self.assertEqual(self.busca("empilha"), (["Empilhadeira"], []))
+        self.assertEqual(self.busca("garfo revisão"), ([], []))
+
+    def test_indice_acompanha_remocoes(self):
+        self.assertEqual(self.cliente.delete(f"/manutencao?id={self.garfo}").status_code, 200)
+        self.assertEqual(self.busca("garfo"), ([], []))
+
+    def test_busca_sem_palavras(self):
+        resposta = self.cliente.get('/busca?q="')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("mesage", resposta.get_json())
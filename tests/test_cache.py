@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+from unittest import mock
+
+from tests.base import TesteApi
+
+
+class Amanha(date):
+    """ Data corrente avançada em um dia, como logo após a meia-noite.
+    """
+
+    @classmethod
+    def today(cls):
+        return date.today() + timedelta(days=1)
+
+
+class TestaCache(TesteApi):
+
+    def setUp(self):
+        super().setUp()
+        self.cria_equipamento()
+        self.cria_tecnico()
+        self.cria_manutencao()
+
+    def test_304_ate_a_proxima_escrita(self):
+        etag = self.cliente.get("/equipamentos").headers["ETag"]
+        self.assertEqual(self.cliente.get("/equipamentos", headers={"If-None-Match": etag}).status_code, 304)
+        self.cria_equipamento("E2")
+        resposta = self.cliente.get("/equipamentos", headers={"If-None-Match": etag})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(resposta.get_json()["equipamentos"]), 2)
+
+    def test_relatorios_expiram_na_virada_do_dia(self):
+        hoje = {rota: self.cliente.get(rota) for rota in ("/relatorios/abertas", "/relatorios/backlog",
+                                                          "/relatorios/mttr", "/relatorios/carga-tecnicos")}
+        self.assertEqual(hoje["/relatorios/backlog"].get_json()["setores"][0]["idade_media_dias"], 0)
+
+        with mock.patch("cache.date", Amanha), mock.patch("schemas.relatorios.date", Amanha):
+            for rota, resposta in hoje.items():
+                amanha = self.cliente.get(rota, headers={"If-None-Match": resposta.headers["ETag"]})
+                self.assertEqual(amanha.status_code, 200, rota)
+                self.assertNotEqual(amanha.headers["ETag"], resposta.headers["ETag"], rota)
+            self.assertEqual(self.cliente.get("/relatorios/backlog").get_json()["setores"][0]["idade_media_dias"], 1)
+            self.assertEqual(self.cliente.get("/relatorios/mttr").get_json()["ate"], Amanha.today().isoformat())
@@ -0,0 +1,72 @@
+from unittest import mock
+import json
+
+from model import cache_referencias, executa_escrita
+from tests.base import TesteApi
+
+
+def ndjson(*nomes) -> bytes:
+    return "".join(json.dumps({"nome": nome, "modelo": "M", "setor": "S1", "impacto": "Alto"}) + "\n"
+                   for nome in nomes).encode()
+
+
+class TestaCarga(TesteApi):
+
+    def setUp(self):
+        super().setUp()
+        # duas linhas por transação
+        lote = mock.patch("model.carga.tamanho_lote", 2)
+        lote.start()
+        self.addCleanup(lote.stop)
+
+    def envia(self, corpo):
+        with mock.patch.object(cache_referencias, "invalida", wraps=cache_referencias.invalida) as invalida:
+            resposta = self.cliente.post("/equipamentos/bulk", data=corpo,
+                                         content_type="application/x-ndjson")
+        self.assertTrue(invalida.called)
+        return resposta
+
+    def nomes(self):
+        return [e["nome"] for e in self.cliente.get("/equipamentos").get_json()["equipamentos"]]
+
+    def test_carga_completa(self):
+        resposta = self.envia(ndjson("E1", "E2", "E1") + b"{}\n")
+        self.assertEqual(resposta.status_code, 200)
+        corpo = resposta.get_json()
+        self.assertEqual((corpo["total"], corpo["inseridos"], corpo["rejeitados"]), (4, 2, 2))
+        self.assertEqual([r["status"] for r in corpo["resultados"]], ["inserido", "inserido", "duplicado",
+                                                                      "invalido"])
+        self.assertNotIn("interrompido", corpo)
+
+    def test_leitura_interrompida_retorna_as_linhas_gravadas(self):
+        # o texto inválido fica além do primeiro bloco lido do stream
+        corpo = ndjson("E1", "E2", "E3") + b"\n" * 10000 + b"\xff\xfe\n" + ndjson("E4")
+        resposta = self.envia(corpo)
+        self.assertEqual(resposta.status_code, 400)
+        corpo = resposta.get_json()
+        self.assertTrue(corpo["interrompido"])
+        self.assertEqual(corpo["linha_interrompida"], 3)
+        self.assertIn("mesage", corpo)
+        self.assertEqual([(r["linha"], r["status"]) for r in corpo["resultados"]],
+                         [(1, "inserido"), (2, "inserido")])
+        self.assertEqual(self.nomes(), ["E1", "E2"])
+
+    def test_gravacao_interrompida_retorna_as_linhas_gravadas(self):
+        chamadas = []
+
+        def falha_no_segundo_lote(session, operacao):
+            chamadas.append(1)
+            if len(chamadas) == 2:
+                raise RuntimeError("disco cheio")
+            return executa_escrita(session, operacao)
+
+        with mock.patch("model.carga.executa_escrita", falha_no_segundo_lote):
+            resposta = self.envia(ndjson("E1", "E2", "E3", "E4", "E5"))
+        self.assertEqual(resposta.status_code, 500)
+        corpo = resposta.get_json()
+        self.assertEqual((corpo["interrompido"], corpo["linha_interrompida"], corpo["inseridos"]), (True, 3, 2))
+        self.assertEqual(self.nomes(), ["E1", "E2"])
+        # a carga reenviada a partir da linha interrompida completa o cadastro
+        corpo = self.envia(ndjson("E3", "E4", "E5")).get_json()
+        self.assertEqual(corpo["inseridos"], 3)
+        self.assertEqual(self.nomes(), ["E1", "E2", "E3", "E4", "E5"])
@@ -0,0 +1,99 @@
+from unittest import mock
+import csv
+import io
+import json
+
+from sqlalchemy import event
+
+from model import Session, arquiva_manutencoes, obtem_engine_leitura
+from tests.base import TesteApi
+
+
+class TestaExportacao(TesteApi):
+
+    def setUp(self):
+        super().setUp()
+        self.cria_equipamento("E2", setor="S2")
+        self.cria_equipamento("E1", setor="S1")
+        self.cria_tecnico("T1")
+        self.arquivada = self.cria_manutencao(status="Pronto", dias=400)
+        self.ativas = [self.cria_manutencao(comentario='vírgula, "aspas"'), self.cria_manutencao()]
+        arquiva_manutencoes(Session(), lote=10, pausa=0)
+        Session.remove()
+
+    def exporta(self, consulta):
+        resposta = self.cliente.get(consulta)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta
+
+    def test_csv_de_equipamentos(self):
+        resposta = self.exporta("/equipamentos/export")
+        self.assertEqual(resposta.mimetype, "text/csv")
+        self.assertIn('filename="equipamentos.csv"', resposta.headers["Content-Disposition"])
+        linhas = list(csv.reader(io.StringIO(resposta.get_data(as_text=True))))
+        self.assertEqual(linhas[0], ["nome", "modelo", "setor", "impacto"])
+        self.assertEqual([(linha[0], linha[2]) for linha in linhas[1:]], [("E1", "S1"), ("E2", "S2")])
+
+    def test_csv_de_manutencoes_em_blocos(self):
+        with mock.patch("app.tamanho_bloco_exportacao", 1):
+            resposta = self.exporta("/manutencoes/export?format=csv")
+        linhas = list(csv.DictReader(io.StringIO(resposta.get_data(as_text=True))))
+        self.assertEqual([int(linha["id"]) for linha in linhas], self.ativas)
+        self.assertEqual(linhas[0]["comentario"], 'vírgula, "aspas"')
+        self.assertEqual(linhas[0]["versao"], "1")
+
+    def test_ndjson_com_arquivadas(self):
+        resposta = self.exporta("/manutencoes/export?format=ndjson&include_archived=true")
+        self.assertEqual(resposta.mimetype, "application/x-ndjson")
+        registros = [json.loads(linha) for linha in resposta.get_data(as_text=True).splitlines()]
+        self.assertEqual([registro["id"] for registro in registros], [self.arquivada] + self.ativas)
+        self.assertEqual(registros[0]["status"], "Pronto")
+        self.assertEqual(set(registros[0]), {"id", "versao", "nome_equipamento", "matricula_tecnico", "status",
+                                             "tipo_manutencao", "comentario", "previsao_conclusao"})
+
+    def test_formato_invalido(self):
+        self.assertEqual(self.cliente.get("/equipamentos/export?format=xml").status_code, 422)
+
+    def transacoes(self) -> list:
+        """ Registra os comandos de transação executados no pool de leitura.
+        """
+        comandos = []
+
+        def registra(conn, cursor, sql, *args):
+            if sql in ("BEGIN", "COMMIT", "ROLLBACK"):
+                comandos.append(sql)
+
+        engine = obtem_engine_leitura()
+        event.listen(engine, "before_cursor_execute", registra)
+        self.addCleanup(event.remove, engine, "before_cursor_execute", registra)
+        return comandos
+
+    def test_transacao_efetivada_ao_final(self):
+        comandos = self.transacoes()
+        self.assertIn("E1", self.exporta("/equipamentos/export").get_data(as_text=True))
+        self.assertEqual(comandos, ["BEGIN", "COMMIT"])
+
+    def test_cliente_desconectado_no_meio_do_envio(self):
+        comandos = self.transacoes()
+        with mock.patch("app.tamanho_bloco_exportacao", 1):
+            resposta = self.cliente.get("/manutencoes/export?format=ndjson", buffered=False)
+            trechos = iter(resposta.response)
+            self.assertEqual(json.loads(next(trechos))["id"], self.ativas[0])
+            # o servidor fecha o gerador da resposta quando o cliente desconecta
+            resposta.close()
+        self.assertEqual(comandos, ["BEGIN", "ROLLBACK"])
+        self.assertEqual(obtem_engine_leitura().pool.checkedout(), 0)
+
+    def test_erro_no_meio_do_envio(self):
+        comandos = self.transacoes()
+
+        def falha(blocos, campos, formato):
+            yield "nome\n"
+            raise RuntimeError("falha na leitura")
+
+        with mock.patch("app.exporta_blocos", falha):
+            resposta = self.cliente.get("/equipamentos/export", buffered=False)
+            with self.assertRaises(RuntimeError):
+                b"".join(resposta.response)
+            resposta.close()
+        self.assertEqual(comandos, ["BEGIN", "ROLLBACK"])
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from model import Session, Manutencao
+from tests.base import TesteApi, app
+
+
+def representacao(manutencao: Manutencao) -> dict:
+    """ Representação de uma manutenção montada a partir do objeto do ORM, como
+        nas listagens anteriores às consultas por colunas.
+    """
+    previsao = manutencao.previsao_conclusao
+    return {"id": manutencao.id, "versao": manutencao.versao,
+            "nome_equipamento": manutencao.nome_equipamento, "matricula_tecnico": manutencao.matricula_tecnico,
+            "status": manutencao.status, "tipo_manutencao": manutencao.tipo_manutencao,
+            "comentario": manutencao.comentario,
+            "previsao_conclusao": previsao.strftime("%d/%m/%Y %H:%M") if previsao else None}
+
+
+class TestaListagem(TesteApi):
+
+    def setUp(self):
+        super().setUp()
+        self.cria_equipamento()
+        self.cria_tecnico()
+        session = Session()
+        session.add_all([
+            Manutencao("E1", "T1", "Pendente", "Corretiva", None, None),
+            Manutencao("E1", "T1", "Pendente", "Preventiva", "ç, \"aspas\" e barra \\", None),
+            Manutencao("E1", "T1", "Pendente", "Corretiva", None, datetime(2024, 1, 10, 8, 5, 30, 123456)),
+            Manutencao("E1", "T1", "Pronto", "Corretiva", "", datetime(2024, 12, 31, 23, 59)),
+        ])
+        session.commit()
+        self.manutencoes = session.query(Manutencao).order_by(Manutencao.id).all()
+        Session.remove()
+
+    def compara(self, consulta, manutencoes, limit=100):
+        resposta = self.cliente.get(consulta)
+        self.assertEqual(resposta.status_code, 200)
+        esperado = {"limit": limit, "manutencoes": [representacao(m) for m in manutencoes], "next_cursor": None}
+        self.assertEqual(resposta.get_data(), app.json.response(esperado).get_data(), consulta)
+
+    def test_listagens_identicas_a_representacao_do_orm(self):
+        self.compara("/manutencoes", self.manutencoes)
+        self.compara("/manutencoes?limit=10", self.manutencoes, limit=10)
+        self.compara("/manutencoes/status?status=Pendente", self.manutencoes[:3])
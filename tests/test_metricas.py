@@ -0,0 +1,75 @@
+import re
+import time
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+
+from app import sorteia_logs_debug
+from metricas import Metricas
+from tests.base import TesteApi, app
+
+
+def valor(texto: str, serie: str) -> float:
+    """ Retorna o valor de uma série (nome e rótulos) da exportação, ou 0.
+    """
+    encontrado = re.search("^" + re.escape(serie) + r" (\S+)$", texto, re.MULTILINE)
+    return float(encontrado.group(1)) if encontrado else 0
+
+
+class TestaMetricas(TesteApi):
+
+    def metricas(self) -> str:
+        resposta = self.cliente.get("/metrics")
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.get_data(as_text=True)
+
+    def test_requisicao_e_comandos_sql_por_rota(self):
+        serie = 'http_requests_total{method="GET",route="/equipamentos",status="200"}'
+        comandos = 'http_request_db_statements_sum{method="GET",route="/equipamentos"}'
+        antes = self.metricas()
+        self.cliente.get("/equipamentos?limit=5")
+        depois = self.metricas()
+        self.assertEqual(valor(depois, serie) - valor(antes, serie), 1)
+        self.assertGreater(valor(depois, comandos) - valor(antes, comandos), 0)
+
+    def test_metricas_independentes_da_amostragem_de_logs(self):
+        ganchos = app.before_request_funcs[None]
+        posicao = ganchos.index(sorteia_logs_debug)
+        ganchos.remove(sorteia_logs_debug)
+        try:
+            serie = 'http_request_duration_seconds_count{method="GET",route="/tecnicos"}'
+            antes = self.metricas()
+            self.cliente.get("/tecnicos")
+            self.assertEqual(valor(self.metricas(), serie) - valor(antes, serie), 1)
+        finally:
+            ganchos.insert(posicao, sorteia_logs_debug)
+
+    def test_tipos_exportados(self):
+        texto = self.metricas()
+        for nome in ("http_requests_total", "response_cache_hits", "response_cache_misses",
+                     "reference_cache_hits", "group_commit_batches", "group_commit_rows"):
+            self.assertIn(f"# TYPE {nome} counter", texto)
+        for nome in ("db_pool_checked_out", "db_pool_wait_seconds_max"):
+            self.assertIn(f"# TYPE {nome} gauge", texto)
+
+
+class TestaInstrumentacao(unittest.TestCase):
+
+    def test_comando_com_erro_nao_deixa_estado_na_conexao(self):
+        engine = create_engine("sqlite://")
+        self.addCleanup(engine.dispose)
+        metricas = Metricas()
+        metricas.instrumenta_engine(engine)
+        metricas.inicia_requisicao()
+        with engine.connect() as conn:
+            for _ in range(3):
+                with self.assertRaises(OperationalError):
+                    conn.exec_driver_sql("SELECT * FROM inexistente")
+            inicio = time.perf_counter()
+            conn.exec_driver_sql("SELECT 1").all()
+            decorrido = time.perf_counter() - inicio
+            self.assertFalse(conn.info.get("metricas_inicio"))
+        dados = metricas._requisicao.get()
+        self.assertEqual(dados["comandos"], 1)
+        self.assertLessEqual(dados["tempo_sql"], decorrido)
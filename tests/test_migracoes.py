@@ -0,0 +1,120 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+
+from model import Manutencao
+from model.migracoes import aplica_migracoes, VERSAO_ATUAL
+
+
+# schema original (versão 0), anterior ao controle de versões
+SCHEMA_V0 = """
+CREATE TABLE equipamentos (
+    pk_nome VARCHAR NOT NULL, modelo VARCHAR(140), setor VARCHAR(3), impacto VARCHAR(5) NOT NULL,
+    data_insercao DATETIME, PRIMARY KEY (pk_nome),
+    CONSTRAINT check_impacto CHECK (impacto IN ('Alto', 'Medio', 'Baixo')));
+CREATE TABLE tecnicos (
+    nome VARCHAR(140), pk_matricula VARCHAR(140) NOT NULL, turno VARCHAR(140), PRIMARY KEY (pk_matricula));
+CREATE TABLE manutencao (
+    pk_id INTEGER NOT NULL, nome_equipamento VARCHAR(140), matricula_tecnico VARCHAR(140),
+    status VARCHAR(140), tipo_manutencao VARCHAR(140), comentario VARCHAR(140), previsao_conclusao DATETIME,
+    PRIMARY KEY (pk_id),
+    FOREIGN KEY(nome_equipamento) REFERENCES equipamentos (pk_nome),
+    FOREIGN KEY(matricula_tecnico) REFERENCES tecnicos (pk_matricula));
+INSERT INTO equipamentos VALUES ('E1', 'M', 'S1', 'Alto', '2024-01-01 00:00:00'),
+                                ('E2', 'M', 'S2', 'Baixo', '2024-01-01 00:00:00');
+INSERT INTO tecnicos VALUES ('Técnico', 'T1', 'Manhã');
+INSERT INTO manutencao VALUES (1, 'E1', 'T1', 'Pronto', 'Corretiva', 'troca de garfo', '2024-01-10 08:00:00'),
+                              (2, 'E1', 'T1', 'Pendente', 'Preventiva', 'revisão', '2024-02-10 08:00:00'),
+                              (3, 'E2', 'T1', 'Pendente', 'Corretiva', 'troca de pneu', '2024-03-10 08:00:00');
+"""
+
+
+class TestaMigracoes(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp(prefix="teste_migracoes_")
+        self.addCleanup(shutil.rmtree, self.diretorio, ignore_errors=True)
+        self.arquivo = os.path.join(self.diretorio, "db.sqlite3")
+        banco = sqlite3.connect(self.arquivo)
+        banco.executescript(SCHEMA_V0)
+        banco.close()
+        self.engine = create_engine(f"sqlite:///{self.arquivo}")
+        self.addCleanup(self.engine.dispose)
+
+    def consulta(self, sql):
+        with self.engine.connect() as conn:
+            return conn.exec_driver_sql(sql).all()
+
+    def test_atualiza_banco_da_versao_0(self):
+        aplica_migracoes(self.engine)
+
+        self.assertEqual(self.consulta("PRAGMA user_version")[0][0], VERSAO_ATUAL)
+        self.assertEqual(self.consulta("SELECT pk_id, status FROM manutencao ORDER BY pk_id"),
+                         [(1, "Pronto"), (2, "Pendente"), (3, "Pendente")])
+        indices = {nome for nome, in self.consulta("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertLessEqual({indice.name for indice in Manutencao.__table__.indexes}, indices)
+        self.assertEqual(self.consulta("PRAGMA foreign_key_check"), [])
+
+    def resumo(self) -> dict:
+        return dict(((d, v), q) for d, v, q in self.consulta(
+            "SELECT dimensao, valor, quantidade FROM resumo_manutencao"))
+
+    def test_contadores_do_resumo(self):
+        aplica_migracoes(self.engine)
+        # calculados para as linhas existentes e mantidos pelos triggers
+        resumo = self.resumo()
+        self.assertEqual((resumo[("status", "Pendente")], resumo[("impacto", "Alto")],
+                          resumo[("abertas_tecnico", "T1")]), (2, 2, 2))
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("DELETE FROM manutencao WHERE pk_id = 3")
+            conn.exec_driver_sql("INSERT INTO manutencao (nome_equipamento, matricula_tecnico, status, "
+                                 "tipo_manutencao, comentario) VALUES ('E2', 'T1', 'Pronto', 'Corretiva', 'freio')")
+        resumo = self.resumo()
+        self.assertEqual((resumo[("status", "Pendente")], resumo[("status", "Pronto")]), (1, 2))
+
+    def test_indice_da_busca_textual(self):
+        aplica_migracoes(self.engine)
+        busca = "SELECT rowid FROM fts_manutencao WHERE fts_manutencao MATCH '%s' ORDER BY rowid"
+        self.assertEqual(self.consulta(busca % "troca"), [(1,), (3,)])
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("INSERT INTO manutencao (nome_equipamento, matricula_tecnico, status, "
+                                 "tipo_manutencao, comentario) VALUES ('E2', 'T1', 'Pronto', 'Corretiva', 'freio')")
+        self.assertEqual(self.consulta(busca % "freio"), [(4,)])
+
+    def test_log_de_alteracoes(self):
+        aplica_migracoes(self.engine)
+        # registros existentes entram no log como inserções
+        log = "SELECT chave, operacao FROM alteracoes WHERE tabela = 'manutencao' ORDER BY seq"
+        self.assertEqual(self.consulta(log), [("1", "insert"), ("2", "insert"), ("3", "insert")])
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("DELETE FROM manutencao WHERE pk_id = 3")
+        self.assertEqual(self.consulta(log)[-1], ("3", "delete"))
+
+    def test_ciclos_dos_relatorios(self):
+        aplica_migracoes(self.engine)
+        # um ciclo por manutenção existente, somado às linhas diárias
+        self.assertEqual(self.consulta("SELECT COUNT(*) FROM ciclo_manutencao")[0][0], 3)
+        self.assertTrue(self.consulta("SELECT COUNT(*) FROM relatorio_diario")[0][0])
+
+    def test_ids_nao_reaproveitados_apos_migracao(self):
+        aplica_migracoes(self.engine)
+        # a tabela é recriada com AUTOINCREMENT: o maior id removido (ou
+        # arquivado) não volta a ser usado
+        definicao = self.consulta("SELECT sql FROM sqlite_master WHERE name = 'manutencao'")[0][0]
+        self.assertIn("AUTOINCREMENT", definicao.upper())
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("DELETE FROM manutencao WHERE pk_id = 3")
+            conn.exec_driver_sql("INSERT INTO manutencao (nome_equipamento, matricula_tecnico, status, "
+                                 "tipo_manutencao, comentario) VALUES ('E2', 'T1', 'Pronto', 'Corretiva', 'freio')")
+        self.assertEqual(self.consulta("SELECT MAX(pk_id) FROM manutencao")[0][0], 4)
+
+    def test_reaplicar_nao_altera_o_banco(self):
+        aplica_migracoes(self.engine)
+        schema = self.consulta("SELECT type, name, sql FROM sqlite_master ORDER BY name")
+        aplica_migracoes(self.engine)
+        self.assertEqual(self.consulta("SELECT type, name, sql FROM sqlite_master ORDER BY name"), schema)
+        self.assertEqual(self.consulta("PRAGMA user_version")[0][0], VERSAO_ATUAL)
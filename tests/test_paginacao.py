@@ -0,0 +1,70 @@
+import base64
+import json
+import unittest
+
+from schemas.paginacao import codifica_cursor, decodifica_cursor
+from tests.base import TesteApi
+
+
+def cursor_json(chave) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"k": chave}).encode()).decode()
+
+
+class TestaCursor(unittest.TestCase):
+
+    def test_ida_e_volta(self):
+        for chave in (42, "E1", ["2024-01-01T00:00:00", 7]):
+            self.assertEqual(decodifica_cursor(codifica_cursor(chave), 2 if isinstance(chave, list) else 1),
+                             chave)
+
+    def test_cursor_malformado(self):
+        for cursor in ("nao-e-base64!", base64.urlsafe_b64encode(b"[1]").decode(), cursor_json(None)[:-4]):
+            with self.assertRaises(ValueError, msg=cursor):
+                decodifica_cursor(cursor)
+
+    def test_chave_de_tipo_invalido(self):
+        for chave in ([1, 2], {"a": 1}, None, True, 1.5):
+            with self.assertRaises(ValueError, msg=chave):
+                decodifica_cursor(cursor_json(chave))
+
+    def test_chave_composta_invalida(self):
+        for chave in (7, ["2024-01-01", "7"], ["2024-01-01", 7, 8], [["x"], 7], ["2024-01-01", True]):
+            with self.assertRaises(ValueError, msg=chave):
+                decodifica_cursor(cursor_json(chave), 2)
+
+
+class TestaPaginacao(TesteApi):
+
+    def setUp(self):
+        super().setUp()
+        for indice in range(5):
+            self.cria_equipamento(f"E{indice}")
+            self.cria_tecnico(f"T{indice}")
+        self.ids = [self.cria_manutencao(equipamento=f"E{indice}", tecnico=f"T{indice}") for indice in range(5)]
+
+    def percorre(self, rota, chave, campo):
+        vistos, cursor = [], None
+        while True:
+            separador = "&" if "?" in rota else "?"
+            resposta = self.cliente.get(rota + separador + "limit=2" + (f"&cursor={cursor}" if cursor else ""))
+            self.assertEqual(resposta.status_code, 200)
+            corpo = resposta.get_json()
+            vistos += [item[campo] for item in (corpo.get(chave) or [])]
+            cursor = corpo["next_cursor"]
+            if not cursor:
+                return vistos
+
+    def test_percorre_todas_as_paginas(self):
+        self.assertEqual(self.percorre("/equipamentos", "equipamentos", "nome"), [f"E{i}" for i in range(5)])
+        self.assertEqual(self.percorre("/tecnicos", "tecnicos", "matricula"), [f"T{i}" for i in range(5)])
+        self.assertEqual(self.percorre("/manutencoes", "manutencoes", "id"), self.ids)
+        self.assertEqual(self.percorre("/manutencoes/status?status=Pendente", "manutencoes", "id"), self.ids)
+
+    def test_cursor_malformado_retorna_400(self):
+        cursores = ["nao-e-base64!", cursor_json([1, 2]), cursor_json({"a": 1}), cursor_json(None),
+                    base64.urlsafe_b64encode(b"[1]").decode()]
+        for rota in ("/equipamentos?", "/tecnicos?", "/manutencoes?", "/manutencoes/status?status=Pendente&"):
+            for cursor in cursores:
+                resposta = self.cliente.get(f"{rota}cursor={cursor}")
+                self.assertEqual(resposta.status_code, 400, (rota, cursor, resposta.data))
+                self.assertIn("mesage", resposta.get_json())
@@ -0,0 +1,49 @@
+from tests.base import TesteApi
+
+
+class TestaRemocao(TesteApi):
+
+    def setUp(self):
+        super().setUp()
+        self.cria_equipamento("E1")
+        self.cria_equipamento("E2")
+        self.cria_tecnico("T1")
+        self.cria_tecnico("T2")
+        self.id = self.cria_manutencao(equipamento="E1", tecnico="T1")
+
+    def test_equipamento_com_manutencao_vinculada(self):
+        resposta = self.cliente.delete("/equipamento?nome=E1")
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("manutenção vinculada", resposta.get_json()["mesage"])
+        self.assertEqual(self.cliente.delete("/equipamento?nome=E2").status_code, 200)
+        self.assertEqual(self.cliente.delete("/equipamento?nome=E2").status_code, 404)
+
+        self.assertEqual(self.cliente.delete(f"/manutencao?id={self.id}").status_code, 200)
+        self.assertEqual(self.cliente.delete("/equipamento?nome=E1").status_code, 200)
+        nomes = [e["nome"] for e in self.cliente.get("/equipamentos").get_json()["equipamentos"]]
+        self.assertEqual(nomes, [])
+
+    def test_tecnico_com_manutencao_vinculada(self):
+        resposta = self.cliente.delete("/tecnico?matricula=T1")
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("manutenção vinculada", resposta.get_json()["mesage"])
+        self.assertEqual(self.cliente.delete("/tecnico?matricula=T2").status_code, 200)
+        self.assertEqual(self.cliente.delete("/tecnico?matricula=T2").status_code, 404)
+
+    def test_manutencao_inexistente(self):
+        self.assertEqual(self.cliente.delete(f"/manutencao?id={self.id + 100}").status_code, 404)
+
+    def test_remocao_em_lote(self):
+        resposta = self.cliente.delete("/equipamentos", json={"nomes": ["E1", "E2", "E9"]})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.get_json(), {"removidos": ["E2"], "inexistentes": ["E9"], "bloqueados": ["E1"]})
+
+        resposta = self.cliente.delete("/tecnicos", json={"matriculas": ["T1", "T2"]})
+        self.assertEqual(resposta.get_json(), {"removidos": ["T2"], "inexistentes": [], "bloqueados": ["T1"]})
+
+        resposta = self.cliente.delete("/manutencoes", json={"ids": [self.id, self.id + 100]})
+        self.assertEqual(resposta.get_json(), {"removidos": [self.id], "inexistentes": [self.id + 100],
+                                               "bloqueados": []})
+        self.assertEqual(self.cliente.get("/manutencoes/resumo").get_json()["total"], 0)
+        resposta = self.cliente.delete("/equipamentos", json={"nomes": ["E1"]})
+        self.assertEqual(resposta.get_json()["removidos"], ["E1"])
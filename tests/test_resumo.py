@@ -0,0 +1,31 @@
+from tests.base import TesteApi
+
+
+class TestaResumo(TesteApi):
+
+    def setUp(self):
+        super().setUp()
+        self.cria_equipamento("E1", impacto="Alto")
+        self.cria_equipamento("E2", impacto="Baixo")
+        self.cria_tecnico()
+        self.ids = [self.cria_manutencao(status="Pendente", equipamento="E1"),
+                    self.cria_manutencao(status="Pendente", equipamento="E1"),
+                    self.cria_manutencao(status="Pronto", equipamento="E2", tipo="Preventiva")]
+
+    def resumo(self):
+        resposta = self.cliente.get("/manutencoes/resumo")
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.get_json()
+
+    def test_contadores_acompanham_as_escritas(self):
+        self.assertEqual(self.resumo(), {"status": {"Pendente": 2, "Pronto": 1},
+                                         "tipo_manutencao": {"Corretiva": 2, "Preventiva": 1},
+                                         "impacto": {"Alto": 2, "Baixo": 1}, "total": 3})
+
+        self.assertEqual(self.cliente.patch(f"/manutencao/{self.ids[0]}", data={"status": "Pronto"}).status_code, 200)
+        self.assertEqual(self.resumo()["status"], {"Pendente": 1, "Pronto": 2})
+
+        self.assertEqual(self.cliente.delete(f"/manutencao?id={self.ids[2]}").status_code, 200)
+        resumo = self.resumo()
+        self.assertEqual((resumo["status"], resumo["impacto"], resumo["total"]),
+                         ({"Pendente": 1, "Pronto": 1}, {"Alto": 2}, 2))
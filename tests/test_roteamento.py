@@ -0,0 +1,17 @@
+from model import Session, Tecnico
+from tests.base import TesteApi
+
+
+class TestaRoteamento(TesteApi):
+
+    def test_consulta_nao_deixa_o_contexto_somente_leitura(self):
+        self.assertEqual(self.cliente.get("/tecnicos").status_code, 200)
+        # uma sessão aberta depois da requisição, no mesmo contexto, precisa escrever
+        session = Session()
+        try:
+            session.add(Tecnico(nome="Fora da requisição", matricula="T9", turno="Noite"))
+            session.commit()
+        finally:
+            Session.remove()
+        matriculas = [t["matricula"] for t in self.cliente.get("/tecnicos").get_json()["tecnicos"]]
+        self.assertEqual(matriculas, ["T9"])
@@ -0,0 +1,75 @@
+from unittest import mock
+import os
+import sqlite3
+
+from sqlalchemy.exc import OperationalError
+
+from model import executa_escrita
+from tests.base import TesteApi, DIRETORIO
+
+
+def altera_em_outra_conexao(id, status):
+    """ Simula outro worker: altera a manutenção por uma conexão própria.
+    """
+    banco = sqlite3.connect(os.path.join(DIRETORIO, "db.sqlite3"))
+    with banco:
+        banco.execute("UPDATE manutencao SET status = ?, versao = versao + 1 WHERE pk_id = ?", (status, id))
+    banco.close()
+
+
+class TestaVersao(TesteApi):
+
+    def setUp(self):
+        super().setUp()
+        self.cria_equipamento()
+        self.cria_tecnico()
+        self.id = self.cria_manutencao(status="Pendente")
+
+    def altera(self, status, **kwargs):
+        return self.cliente.patch(f"/manutencao/{self.id}", data={"status": status}, **kwargs)
+
+    def status_atual(self):
+        return self.cliente.get("/manutencoes").get_json()["manutencoes"][0]
+
+    def test_if_match_da_versao_atual(self):
+        resposta = self.altera("Em manutenção", headers={"If-Match": '"1"'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.headers["ETag"], '"2"')
+        self.assertEqual(resposta.get_json()["versao"], 2)
+
+    def test_versao_desatualizada_retorna_412(self):
+        self.assertEqual(self.altera("Em manutenção").status_code, 200)
+        resposta = self.altera("Pronto", headers={"If-Match": 'W/"1"'})
+        self.assertEqual(resposta.status_code, 412)
+        self.assertEqual(resposta.get_json()["versao"], 2)
+        self.assertEqual(resposta.headers["ETag"], '"2"')
+        self.assertEqual(self.cliente.patch(f"/manutencao/{self.id}",
+                                            data={"status": "Pronto", "versao": 1}).status_code, 412)
+        self.assertEqual(self.status_atual()["status"], "Em manutenção")
+
+    def test_if_match_invalido(self):
+        self.assertEqual(self.altera("Pronto", headers={"If-Match": '"abc"'}).status_code, 400)
+
+    def test_nova_tentativa_compara_a_versao_recarregada(self):
+        """ Outro worker altera a manutenção enquanto a escrita aguarda o banco
+            ocupado: a nova tentativa não pode sobrescrever a alteração.
+        """
+        tentativas = []
+
+        def ocupado_na_primeira_tentativa(session, operacao):
+            def operacao_ocupada(s):
+                if not tentativas:
+                    tentativas.append(1)
+                    altera_em_outra_conexao(self.id, "Aguardando peças")
+                    raise OperationalError("UPDATE manutencao", {}, sqlite3.OperationalError("database is locked"))
+                tentativas.append(1)
+                return operacao(s)
+            return executa_escrita(session, operacao_ocupada)
+
+        with mock.patch("app.executa_escrita", ocupado_na_primeira_tentativa):
+            resposta = self.altera("Pronto", headers={"If-Match": '"1"'})
+        self.assertEqual(len(tentativas), 2)
+        self.assertEqual(resposta.status_code, 412)
+        self.assertEqual(resposta.get_json()["versao"], 2)
+        manutencao = self.status_atual()
+        self.assertEqual((manutencao["status"], manutencao["versao"]), ("Aguardando peças", 2))